@@ -0,0 +1,124 @@
+"""
+Batch quoting of many products and quantities.
+
+Every (exchange, product) order book is fetched once however many times the
+product is requested. Each book is truncated to the levels the largest quantity
+of its product can reach. Fetches run on one executor per exchange, sized by the
+adapter's concurrency and paced by its token bucket rate limiter, so a slow or
+strictly limited venue never holds up requests to the others. The quotes of a
+product are yielded as soon as all of its exchange books are in.
+"""
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from orderbooks.books import MergedSide
+from orderbooks.integrations.adapters import enabled_adapters
+from orderbooks.integrations.constants import COINROUTES_GET_PRICE_CHOICES, KRAKEN
+from orderbooks.utils import DepthIndex, fetch_order_book
+
+
+def parse_batch(lines):
+    """Parse lines of `PRODUCT QUANTITY[,QUANTITY...]` into the quantities to price
+    per product, in the order products first appear.
+
+    Blank lines and `#` comments are skipped. Repeated products are merged into
+    one request and repeated quantities priced once. Raises a ValueError naming
+    the line of any malformed request or unsupported product.
+    """
+    requests = {}
+    for line_number, line in enumerate(lines, start=1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        try:
+            product, quantities = line.split()
+            quantities = [float(quantity) for quantity in quantities.split(",")]
+        except ValueError:
+            raise ValueError(
+                f"Line {line_number}: expected PRODUCT QUANTITY[,QUANTITY...], got {line!r}"
+            )
+        if product not in COINROUTES_GET_PRICE_CHOICES:
+            raise ValueError(f"Line {line_number}: unsupported product {product}")
+        product_quantities = requests.setdefault(product, [])
+        product_quantities.extend(
+            quantity for quantity in quantities if quantity not in product_quantities
+        )
+    return requests
+
+
+def quote_books(exchange_books, quantities):
+    """Price quantities from the (bids, offers) of each exchange, in exchange order."""
+    offer_index = DepthIndex(
+        MergedSide((offers for _, offers in exchange_books), bid=False)
+    )
+    bid_index = DepthIndex(MergedSide((bids for bids, _ in exchange_books), bid=True))
+    return [
+        (*offer_index.quote(quantity), *bid_index.quote(quantity))
+        for quantity in quantities
+    ]
+
+
+def quote_batch(requests, kraken=False, stats=None, cache=None):
+    """Quote the quantities of every product of `requests`, a dict as returned by
+    `parse_batch`, yielding results as products complete.
+
+    Yields (product, quantities, prices, missing) tuples where prices holds the
+    buy cost, remaining buy amount, sell cost and remaining sell amount of each
+    quantity, or is None when no exchange book could be fetched, and missing
+    maps each exchange left out of the quote to the reason.
+    """
+    adapters = enabled_adapters(optional=[KRAKEN] if kraken else [])
+    executors = {
+        adapter.EXCHANGE: ThreadPoolExecutor(
+            max_workers=adapter.MAX_CONCURRENCY,
+            thread_name_prefix=f"batch-{adapter.EXCHANGE.lower()}",
+        )
+        for adapter in adapters
+    }
+    # Submitting product by product interleaves the exchanges, whose queues then
+    # drain in parallel at their own rates.
+    futures = {}
+    for product in requests:
+        for adapter in adapters:
+            if adapter.symbol(product) is None:
+                continue
+            future = executors[adapter.EXCHANGE].submit(
+                fetch_order_book,
+                adapter,
+                product,
+                stats=stats,
+                cache=cache,
+                rate_limit=True,
+                max_quantity=max(requests[product]),
+            )
+            futures[future] = (product, adapter)
+
+    pending = Counter(product for product, _ in futures.values())
+    exchange_books = {product: {} for product in requests}
+    missing = {product: {} for product in requests}
+    try:
+        for product in requests:
+            if not pending[product]:
+                yield product, requests[product], None, missing[product]
+
+        for future in as_completed(futures):
+            product, adapter = futures[future]
+            try:
+                exchange_books[product][adapter] = future.result()
+            except Exception as err:
+                missing[product][adapter.EXCHANGE] = str(err)
+            pending[product] -= 1
+            if pending[product]:
+                continue
+
+            books = [
+                exchange_books[product][adapter]
+                for adapter in adapters
+                if adapter in exchange_books[product]
+            ]
+            prices = quote_books(books, requests[product]) if books else None
+            yield product, requests[product], prices, missing[product]
+            del exchange_books[product]
+    finally:
+        for executor in executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
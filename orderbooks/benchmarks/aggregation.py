@@ -0,0 +1,90 @@
+"""Measure how aggregating level-3 orders into price levels speeds up quoting.
+
+A synthetic Coinbase level-3 book is normalized with every order as its own
+level and with the orders aggregated per price, then both sides are merged
+with a Gemini book and walked in full, sorting a list of levels as the list
+based order books do and with the fixed-point engine. Run with
+``python -m orderbooks.benchmarks.aggregation --prices 5000 --orders-per-price 4``.
+"""
+import timeit
+
+import click
+
+from orderbooks.benchmarks.helpers import (synthetic_level3_records,
+                                           synthetic_records)
+from orderbooks.books import MergedSide, product_decimals
+from orderbooks.integrations.constants import (COINBASE, COINROUTES_BTC_USD,
+                                               GEMINI)
+from orderbooks.utils import (execute_market_order,
+                              execute_market_order_fixed_point,
+                              transform_exchange_data)
+
+
+@click.command()
+@click.option("--prices", type=int, default=5000)
+@click.option("--orders-per-price", type=int, default=4)
+@click.option("--repeat", type=int, default=5)
+def benchmark(prices, orders_per_price, repeat):
+    price_decimals, size_decimals = product_decimals(COINROUTES_BTC_USD)
+    coinbase_book = {
+        "bids": synthetic_level3_records(prices, orders_per_price, bid=True),
+        "asks": synthetic_level3_records(prices, orders_per_price),
+    }
+    gemini_book = transform_exchange_data(
+        {"bids": synthetic_records(prices, seed=1, bid=True), "asks": synthetic_records(prices, seed=1)},
+        GEMINI,
+        price_decimals=price_decimals,
+        size_decimals=size_decimals,
+    )
+    records = len(coinbase_book["bids"]) + len(coinbase_book["asks"])
+    # Larger than the books so every level is walked.
+    quantity = records * 2
+
+    timings = {}
+    for aggregate in (False, True):
+        name = "aggregated" if aggregate else "per order"
+
+        def normalize():
+            return transform_exchange_data(
+                coinbase_book,
+                COINBASE,
+                price_decimals=price_decimals,
+                size_decimals=size_decimals,
+                aggregate=aggregate,
+            )
+
+        normalize_seconds = min(timeit.repeat(normalize, number=1, repeat=repeat))
+        bids, offers = normalize()
+        offer_book = MergedSide([gemini_book[1], offers])
+        levels = len(bids) + len(offers)
+
+        sort_walk_seconds = min(
+            timeit.repeat(
+                lambda: execute_market_order(quantity, list(offer_book)),
+                number=1,
+                repeat=repeat,
+            )
+        )
+        fixed_point_seconds = min(
+            timeit.repeat(
+                lambda: execute_market_order_fixed_point(quantity, offer_book),
+                number=1,
+                repeat=repeat,
+            )
+        )
+        timings[aggregate] = (sort_walk_seconds, fixed_point_seconds)
+        click.echo(
+            f"{name}: {levels} Coinbase levels from {records} orders,"
+            f" normalized in {normalize_seconds * 1000:.1f} ms,"
+            f" offers sorted and walked in {sort_walk_seconds * 1000:.1f} ms,"
+            f" walked fixed point in {fixed_point_seconds * 1000:.1f} ms"
+        )
+
+    click.echo(
+        f"Aggregation speedup: {timings[False][0] / timings[True][0]:.2f}x sort and walk,"
+        f" {timings[False][1] / timings[True][1]:.2f}x fixed point walk"
+    )
+
+
+if __name__ == "__main__":
+    benchmark()
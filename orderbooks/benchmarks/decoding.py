@@ -0,0 +1,126 @@
+"""Compare the time from response bytes to a normalized book per exchange.
+
+Synthetic full depth payloads in the format of each exchange, Coinbase level-3
+orders with their ids, Gemini levels with timestamps and Kraken levels with
+timestamps, are decoded then normalized into order book sides. Decoding with
+`json.loads` and the garbage collector enabled, as `Response.json` does, is
+compared with `decoding.loads` using the standard library and, when
+installed, `orjson`. Run with
+``python -m orderbooks.benchmarks.decoding --prices 50000 --orders-per-price 4``.
+"""
+import gc
+import json
+import time
+import uuid
+
+import click
+
+from orderbooks.benchmarks.helpers import (synthetic_level3_records,
+                                           synthetic_records)
+from orderbooks.books import product_decimals
+from orderbooks.integrations import decoding
+from orderbooks.integrations.adapters import get_adapter
+from orderbooks.integrations.constants import (COINBASE, COINROUTES_BTC_USD,
+                                               GEMINI, KRAKEN)
+from orderbooks.utils import transform_exchange_data
+
+TIMESTAMP = 1706044291
+
+
+def coinbase_payload(prices, orders_per_price):
+    def side(bid):
+        records = synthetic_level3_records(prices, orders_per_price, bid=bid)
+        return [
+            [price, size, str(uuid.UUID(int=order))]
+            for order, (price, size, _) in enumerate(records)
+        ]
+
+    return {
+        "bids": side(True),
+        "asks": side(False),
+        "sequence": 1,
+        "time": "2024-01-23T21:11:31Z",
+    }
+
+
+def gemini_payload(prices):
+    def side(bid):
+        return [
+            {"price": price, "amount": size, "timestamp": str(TIMESTAMP)}
+            for price, size, _ in synthetic_records(prices, seed=1, bid=bid)
+        ]
+
+    return {"bids": side(True), "asks": side(False)}
+
+
+def kraken_payload(prices):
+    def side(bid):
+        return [
+            [price, size, TIMESTAMP]
+            for price, size, _ in synthetic_records(prices, seed=2, bid=bid)
+        ]
+
+    return {
+        "error": [],
+        "result": {"XXBTZUSD": {"bids": side(True), "asks": side(False)}},
+    }
+
+
+def stdlib_loads_paused(content):
+    with decoding.gc_paused():
+        return json.loads(content)
+
+
+@click.command()
+@click.option("--prices", type=int, default=50000)
+@click.option("--orders-per-price", type=int, default=4)
+@click.option("--repeat", type=int, default=3)
+def benchmark(prices, orders_per_price, repeat):
+    price_decimals, size_decimals = product_decimals(COINROUTES_BTC_USD)
+    payloads = (
+        (COINBASE, "BTC-USD", coinbase_payload(prices, orders_per_price)),
+        (GEMINI, "BTCUSD", gemini_payload(prices)),
+        (KRAKEN, "XBTUSD", kraken_payload(prices)),
+    )
+    decoders = [
+        ("json.loads", json.loads),
+        ("loads stdlib", stdlib_loads_paused),
+    ]
+    if decoding.orjson is not None:
+        decoders.append(("loads orjson", decoding.loads))
+    else:
+        click.echo("orjson is not installed, only the standard library is measured.")
+
+    for exchange, symbol, payload in payloads:
+        adapter = get_adapter(exchange)
+        content = json.dumps(payload).encode()
+        click.echo(f"{exchange}: {len(content) / 1e6:.1f} MB")
+        books = {}
+        for name, loads in decoders:
+            decode_seconds = total_seconds = float("inf")
+            for _ in range(repeat):
+                gc.collect()
+                start = time.perf_counter()
+                order_book = adapter.order_book(loads(content), symbol)
+                decoded = time.perf_counter()
+                bids, offers = transform_exchange_data(
+                    order_book,
+                    exchange,
+                    dict_datatype=adapter.DICT_DATATYPE,
+                    price_decimals=price_decimals,
+                    size_decimals=size_decimals,
+                    aggregate=adapter.AGGREGATE_LEVELS,
+                )
+                end = time.perf_counter()
+                decode_seconds = min(decode_seconds, decoded - start)
+                total_seconds = min(total_seconds, end - start)
+            books[name] = (list(bids), list(offers))
+            click.echo(
+                f"  {name}: decode {decode_seconds * 1000:.0f} ms,"
+                f" bytes to book {total_seconds * 1000:.0f} ms"
+            )
+        assert all(book == books["json.loads"] for book in books.values())
+
+
+if __name__ == "__main__":
+    benchmark()
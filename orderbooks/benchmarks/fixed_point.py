@@ -0,0 +1,38 @@
+"""Compare the Decimal and fixed-point market order engines.
+
+Run with ``python -m orderbooks.benchmarks.fixed_point --levels 50000``.
+"""
+import timeit
+
+import click
+
+from orderbooks.benchmarks.helpers import synthetic_records
+from orderbooks.books import OrderBookSide, product_decimals
+from orderbooks.integrations.constants import COINBASE, COINROUTES_BTC_USD
+from orderbooks.utils import (execute_market_order,
+                              execute_market_order_fixed_point)
+
+
+@click.command()
+@click.option("--levels", type=int, default=50000)
+@click.option("--repeat", type=int, default=5)
+def benchmark(levels, repeat):
+    price_decimals, size_decimals = product_decimals(COINROUTES_BTC_USD)
+    order_book = OrderBookSide.from_records(
+        synthetic_records(levels), COINBASE, False, price_decimals, size_decimals
+    )
+    # Larger than the book so every level is walked.
+    quantity = levels * 2
+
+    for name, execute in (
+        ("decimal", execute_market_order),
+        ("fixed point", execute_market_order_fixed_point),
+    ):
+        seconds = min(
+            timeit.repeat(lambda: execute(quantity, order_book), number=1, repeat=repeat)
+        )
+        click.echo(f"{name}: {seconds * 1000:.1f} ms, {seconds / levels * 1e9:.0f} ns per level")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,29 @@
+import random
+
+
+def synthetic_records(levels, seed=0, bid=False):
+    """Level-3 style Coinbase levels: [price, size, order id] strings in price order."""
+    rng = random.Random(seed)
+    price = 40000.0
+    step = -1 if bid else 1
+    records = []
+    for level in range(levels):
+        price += rng.choice([0, 0, 0.01, 0.02]) * step
+        records.append([f"{price:.2f}", f"{rng.uniform(0.0001, 2):.8f}", f"order-{level}"])
+    return records
+
+
+def synthetic_level3_records(prices, orders_per_price=4, seed=0, bid=False):
+    """Level-3 Coinbase levels with on average `orders_per_price` orders resting at
+    each of `prices` distinct prices, in price order."""
+    rng = random.Random(seed)
+    price = 40000.0
+    step = -1 if bid else 1
+    records = []
+    for _ in range(prices):
+        price += rng.choice([0.01, 0.02]) * step
+        for _ in range(rng.randint(1, 2 * orders_per_price - 1)):
+            records.append(
+                [f"{price:.2f}", f"{rng.uniform(0.0001, 2):.8f}", f"order-{len(records)}"]
+            )
+    return records
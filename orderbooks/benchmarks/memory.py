@@ -0,0 +1,47 @@
+"""Compare the memory used per level by the tuple list and `OrderBookSide` books.
+
+Run with ``python -m orderbooks.benchmarks.memory --levels 50000``.
+"""
+import tracemalloc
+
+import click
+
+from orderbooks.benchmarks.helpers import synthetic_records
+from orderbooks.books import OrderBookSide, product_decimals
+from orderbooks.integrations.constants import COINBASE, COINROUTES_BTC_USD
+from orderbooks.utils import iter_exchange_levels
+
+
+def measure(build):
+    tracemalloc.start()
+    book = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return book, size
+
+
+@click.command()
+@click.option("--levels", type=int, default=50000)
+def benchmark(levels):
+    records = synthetic_records(levels)
+    price_decimals, size_decimals = product_decimals(COINROUTES_BTC_USD)
+
+    _, tuples_bytes = measure(
+        lambda: list(
+            iter_exchange_levels(records, COINBASE, False, price_decimals, size_decimals)
+        )
+    )
+    side, side_bytes = measure(
+        lambda: OrderBookSide.from_records(
+            records, COINBASE, False, price_decimals, size_decimals
+        )
+    )
+
+    click.echo(f"levels: {levels}")
+    click.echo(f"tuple list: {tuples_bytes / levels:.1f} bytes per level")
+    click.echo(f"OrderBookSide: {side_bytes / levels:.1f} bytes per level")
+    click.echo(f"OrderBookSide arrays: {side.nbytes() / levels:.1f} bytes per level")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,68 @@
+"""Compare pricing many orders on a prepared `MergedBook` with re-merging per order.
+
+Three synthetic exchange books are priced for a ladder of buy quantities by
+sorting a list of their levels for every order, by heap merging their runs for
+every order and by walking a `MergedBook` prepared once. The preparation is
+timed separately from the orders. Run with
+``python -m orderbooks.benchmarks.merged_book --levels 50000 --quantities 20``.
+"""
+import time
+
+import click
+
+from orderbooks.benchmarks.helpers import synthetic_records
+from orderbooks.books import MergedBook, MergedSide, OrderBookSide, product_decimals
+from orderbooks.integrations.constants import (COINBASE, COINROUTES_BTC_USD,
+                                               GEMINI, KRAKEN)
+from orderbooks.utils import (execute_market_order,
+                              execute_market_order_fixed_point)
+
+
+@click.command()
+@click.option("--levels", type=int, default=50000)
+@click.option("--quantities", type=int, default=20)
+def benchmark(levels, quantities):
+    price_decimals, size_decimals = product_decimals(COINROUTES_BTC_USD)
+    offers = MergedSide(
+        OrderBookSide.from_records(
+            synthetic_records(levels, seed=seed),
+            exchange,
+            False,
+            price_decimals,
+            size_decimals,
+        )
+        for seed, exchange in enumerate((GEMINI, COINBASE, KRAKEN))
+    )
+    bids = MergedSide([], bid=True)
+    levels_list = [level for run in offers.runs for level in run]
+    # Spread over the whole depth, the combined books hold about 3 * levels.
+    ladder = [3 * levels * (step + 1) / quantities for step in range(quantities)]
+
+    start = time.perf_counter()
+    book = MergedBook.prepare(bids, offers)
+    prepare_seconds = time.perf_counter() - start
+    click.echo(f"prepare merged book: {prepare_seconds * 1000:.1f} ms")
+
+    results = {}
+    for name, execute in (
+        ("sort per order", lambda quantity: execute_market_order(quantity, levels_list)),
+        (
+            "merge per order",
+            lambda quantity: execute_market_order_fixed_point(quantity, offers),
+        ),
+        (
+            "merged book",
+            lambda quantity: execute_market_order_fixed_point(quantity, book.offers),
+        ),
+    ):
+        start = time.perf_counter()
+        results[name] = [tuple(execute(quantity)) for quantity in ladder]
+        seconds = time.perf_counter() - start
+        click.echo(
+            f"{name}: {seconds * 1000:.1f} ms, {seconds / quantities * 1000:.2f} ms per order"
+        )
+    assert results["sort per order"] == results["merge per order"] == results["merged book"]
+
+
+if __name__ == "__main__":
+    benchmark()
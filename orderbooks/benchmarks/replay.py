@@ -0,0 +1,84 @@
+"""Measure the replay speed of columnar snapshot files of synthetic books.
+
+Each file holds snapshots of three merged exchange books, every snapshot
+shifted in price so no two are alike. Files are replayed one per worker
+process. Run with ``python -m orderbooks.benchmarks.replay --snapshots 5000``.
+"""
+import os
+import tempfile
+import time
+
+import click
+
+from orderbooks.benchmarks.helpers import synthetic_records
+from orderbooks.books import MergedSide, product_decimals
+from orderbooks.integrations.constants import COINBASE, GEMINI, KRAKEN
+from orderbooks.replay import SnapshotWriter, replay_file, replay_files
+from orderbooks.utils import transform_exchange_data
+
+
+def write_synthetic_file(path, snapshots, levels, product="BTCUSD"):
+    price_decimals, size_decimals = product_decimals(product)
+    books = [
+        transform_exchange_data(
+            {
+                "bids": synthetic_records(levels, seed=seed, bid=True),
+                "asks": synthetic_records(levels, seed=seed),
+            },
+            exchange,
+            price_decimals=price_decimals,
+            size_decimals=size_decimals,
+        )
+        for seed, exchange in enumerate((GEMINI, COINBASE, KRAKEN))
+    ]
+    bids = list(MergedSide((bids for bids, _ in books), bid=True).iter_ticks())
+    offers = list(MergedSide((offers for _, offers in books)).iter_ticks())
+    tick = 10**price_decimals // 100
+    with SnapshotWriter(path, product) as writer:
+        for snapshot in range(snapshots):
+            shift = (snapshot % 100 - 50) * tick
+            writer.write(
+                float(snapshot),
+                [(exchange, price + shift, size) for exchange, price, size in bids],
+                [(exchange, price + shift, size) for exchange, price, size in offers],
+            )
+
+
+@click.command()
+@click.option("--snapshots", type=int, default=5000)
+@click.option("--levels", type=int, default=250)
+@click.option("--quantity", type=float, multiple=True, default=[1.0, 10.0])
+@click.option("--files", type=int, default=os.cpu_count())
+def benchmark(snapshots, levels, quantity, files):
+    with tempfile.TemporaryDirectory() as directory:
+        paths = [os.path.join(directory, f"snapshots-{index}.obs") for index in range(files)]
+        start = time.perf_counter()
+        for path in paths:
+            write_synthetic_file(path, snapshots, levels)
+        click.echo(
+            f"Wrote {files} files of {snapshots} snapshots of {6 * levels} levels"
+            f" in {time.perf_counter() - start:.2f} s,"
+            f" {os.path.getsize(paths[0]) / 2**20:.1f} MiB each"
+        )
+
+        quotes = snapshots * len(quantity)
+        start = time.perf_counter()
+        replay_file(paths[0], quantity)
+        seconds = time.perf_counter() - start
+        click.echo(
+            f"In process: {quotes} snapshot quotes in {seconds:.2f} s,"
+            f" {quotes / seconds:.0f} per second"
+        )
+
+        start = time.perf_counter()
+        for _ in replay_files(paths, quantity, processes=files):
+            pass
+        seconds = time.perf_counter() - start
+        click.echo(
+            f"{files} files on {files} worker processes: {files * quotes} snapshot quotes"
+            f" in {seconds:.2f} s, {files * quotes / seconds:.0f} per second"
+        )
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,64 @@
+"""Measure the quote throughput and latency of the quote server on a cached book.
+
+Run with ``python -m orderbooks.benchmarks.server --levels 50000 --quotes 5000``.
+"""
+import threading
+import time
+
+import click
+
+from orderbooks.benchmarks.helpers import synthetic_records
+from orderbooks.books import MergedSide, OrderBookSide, product_decimals
+from orderbooks.integrations.constants import COINBASE, COINROUTES_BTC_USD
+from orderbooks.server import QuoteClient, QuoteServer, QuoteService
+
+
+@click.command()
+@click.option("--levels", type=int, default=50000)
+@click.option("--quotes", type=int, default=5000)
+def benchmark(levels, quotes):
+    price_decimals, size_decimals = product_decimals(COINROUTES_BTC_USD)
+
+    def fetch(product, kraken):
+        bids, offers = (
+            OrderBookSide.from_records(
+                synthetic_records(levels, bid=bid),
+                COINBASE,
+                price_decimals=price_decimals,
+                size_decimals=size_decimals,
+            )
+            for bid in (True, False)
+        )
+        return MergedSide([bids], bid=True), MergedSide([offers])
+
+    service = QuoteService(fetch=fetch)
+    server = QuoteServer(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = QuoteClient(f"http://127.0.0.1:{server.server_port}")
+    # Warm the book cache and the keep-alive connection.
+    client.get_buy_and_sell_price(10, COINROUTES_BTC_USD)
+
+    start = time.perf_counter()
+    for quote in range(quotes):
+        client.get_buy_and_sell_price(1 + quote % 100, COINROUTES_BTC_USD)
+    seconds = time.perf_counter() - start
+
+    prepared_book = service.books[COINROUTES_BTC_USD]
+    start = time.perf_counter()
+    for quote in range(quotes):
+        prepared_book.quote(1 + quote % 100)
+    in_process_seconds = time.perf_counter() - start
+
+    server.shutdown()
+    click.echo(
+        f"HTTP: {quotes / seconds:.0f} quotes per second,"
+        f" {seconds / quotes * 1e6:.0f} us per quote"
+    )
+    click.echo(
+        f"In process: {quotes / in_process_seconds:.0f} quotes per second,"
+        f" {in_process_seconds / quotes * 1e6:.1f} us per quote"
+    )
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,74 @@
+"""Measure how sharded quoting scales with worker processes on synthetic books.
+
+Every product is normalized from raw Coinbase style records and both of its
+sides walked in full with `execute_market_order`, which is the CPU bound part
+of quoting. Run with ``python -m orderbooks.benchmarks.sharding --products 32``.
+"""
+import os
+import time
+from functools import partial
+
+import click
+
+from orderbooks.benchmarks.helpers import synthetic_records
+from orderbooks.books import MergedSide
+from orderbooks.integrations.constants import COINBASE, GEMINI, KRAKEN
+from orderbooks.sharding import quote_sharded
+from orderbooks.utils import execute_market_order, transform_exchange_data
+
+
+def synthetic_quote_shard(requests, kraken=False, levels=5000):
+    results = []
+    for product, quantities in requests.items():
+        books = [
+            transform_exchange_data(
+                {
+                    "bids": synthetic_records(levels, seed=seed, bid=True),
+                    "asks": synthetic_records(levels, seed=seed),
+                },
+                exchange,
+            )
+            for seed, exchange in enumerate((GEMINI, COINBASE, KRAKEN))
+        ]
+        bids = MergedSide((bids for bids, _ in books), bid=True)
+        offers = MergedSide((offers for _, offers in books))
+        prices = [
+            (
+                *execute_market_order(quantity, offers),
+                *execute_market_order(quantity, bids, bid=True),
+            )
+            for quantity in quantities
+        ]
+        results.append((product, quantities, prices, {}))
+    return results, 0, 0
+
+
+@click.command()
+@click.option("--products", type=int, default=32)
+@click.option("--levels", type=int, default=5000)
+@click.option("--max-processes", type=int, default=os.cpu_count())
+def benchmark(products, levels, max_processes):
+    # Larger than the books so every level is walked.
+    requests = {f"PRODUCT{index}": [levels * 10.0] for index in range(products)}
+    quote = partial(synthetic_quote_shard, levels=levels)
+
+    start = time.perf_counter()
+    quote(requests)
+    serial_seconds = time.perf_counter() - start
+    click.echo(f"In process: {serial_seconds:.2f} s")
+
+    processes = 1
+    while processes <= max_processes:
+        start = time.perf_counter()
+        results = list(quote_sharded(requests, processes=processes, quote=quote))
+        seconds = time.perf_counter() - start
+        assert len(results) == products
+        click.echo(
+            f"{processes} worker processes: {seconds:.2f} s,"
+            f" {serial_seconds / seconds:.1f}x the in process speed"
+        )
+        processes *= 2
+
+
+if __name__ == "__main__":
+    benchmark()
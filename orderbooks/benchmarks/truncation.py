@@ -0,0 +1,64 @@
+"""Measure what truncating exchange books to the quantity saves.
+
+Three synthetic exchange books are normalized, merged and indexed for a
+quantity, in full and truncated to the levels the quantity can reach. Run with
+``python -m orderbooks.benchmarks.truncation --levels 50000 --quantity 10``.
+"""
+import time
+import tracemalloc
+
+import click
+
+from orderbooks.benchmarks.helpers import synthetic_records
+from orderbooks.books import MergedSide, product_decimals
+from orderbooks.integrations.constants import (COINBASE, COINROUTES_BTC_USD,
+                                               GEMINI, KRAKEN)
+from orderbooks.utils import (DepthIndex, transform_exchange_data,
+                              truncate_records)
+
+
+def quote(exchange_books, quantity, max_quantity=None):
+    price_decimals, size_decimals = product_decimals(COINROUTES_BTC_USD)
+    books = []
+    for exchange, book in exchange_books.items():
+        if max_quantity is not None:
+            book = {side: truncate_records(book[side], max_quantity) for side in book}
+        books.append(
+            transform_exchange_data(
+                book, exchange, price_decimals=price_decimals, size_decimals=size_decimals
+            )
+        )
+    offer_index = DepthIndex(MergedSide(offers for _, offers in books))
+    return offer_index, offer_index.quote(quantity)
+
+
+@click.command()
+@click.option("--levels", type=int, default=50000)
+@click.option("--quantity", type=float, default=10.0)
+def benchmark(levels, quantity):
+    exchange_books = {
+        exchange: {"bids": [], "asks": synthetic_records(levels, seed=seed)}
+        for seed, exchange in enumerate((GEMINI, COINBASE, KRAKEN))
+    }
+
+    results = {}
+    for name, max_quantity in (("full books", None), ("truncated", quantity)):
+        start = time.perf_counter()
+        offer_index, result = quote(exchange_books, quantity, max_quantity)
+        seconds = time.perf_counter() - start
+        # Traced separately as tracing slows down allocations.
+        tracemalloc.start()
+        quote(exchange_books, quantity, max_quantity)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = result
+        click.echo(
+            f"{name}: {len(offer_index)} of {3 * levels} offers kept,"
+            f" quoted in {seconds * 1000:.1f} ms,"
+            f" peak {peak_bytes / 2**20:.2f} MiB"
+        )
+    assert results["full books"] == results["truncated"]
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,69 @@
+"""Compare pricing many quantities against deep books with and without NumPy.
+
+Three synthetic exchange books are merged and a ladder of quantities priced
+against them with repeated fixed-point walks, a `DepthIndex` and a
+`VectorizedIndex` in exact and float mode. Run with
+``python -m orderbooks.benchmarks.vectorized --levels 50000 --quantities 100``.
+"""
+import time
+
+import click
+
+from orderbooks.benchmarks.helpers import synthetic_records
+from orderbooks.books import MergedSide, OrderBookSide, product_decimals
+from orderbooks.integrations.constants import (COINBASE, COINROUTES_BTC_USD,
+                                               GEMINI, KRAKEN)
+from orderbooks.utils import DepthIndex, execute_market_order_fixed_point
+from orderbooks.vectorized import VectorizedIndex, np
+
+
+def fixed_point_quotes(order_book, quantities):
+    return [
+        tuple(execute_market_order_fixed_point(quantity, order_book))
+        for quantity in quantities
+    ]
+
+
+@click.command()
+@click.option("--levels", type=int, default=50000)
+@click.option("--quantities", type=int, default=100)
+def benchmark(levels, quantities):
+    if np is None:
+        click.echo("NumPy is not installed, the vectorized engine is unavailable.")
+        return
+    price_decimals, size_decimals = product_decimals(COINROUTES_BTC_USD)
+    order_book = MergedSide(
+        OrderBookSide.from_records(
+            synthetic_records(levels, seed=seed),
+            exchange,
+            False,
+            price_decimals,
+            size_decimals,
+        )
+        for seed, exchange in enumerate((GEMINI, COINBASE, KRAKEN))
+    )
+    # Spread over the whole depth, the combined books hold about 3 * levels.
+    ladder = [3 * levels * (step + 1) / quantities for step in range(quantities)]
+
+    results = {}
+    for name, price in (
+        ("fixed point walks", fixed_point_quotes),
+        ("depth index", lambda book, ladder: DepthIndex(book).quote_many(ladder)),
+        ("vectorized", lambda book, ladder: VectorizedIndex(book).quote_many(ladder)),
+        (
+            "vectorized float",
+            lambda book, ladder: VectorizedIndex(book, exact=False).quote_many(ladder),
+        ),
+    ):
+        start = time.perf_counter()
+        results[name] = price(order_book, ladder)
+        seconds = time.perf_counter() - start
+        click.echo(
+            f"{name}: {seconds * 1000:.1f} ms,"
+            f" {seconds / quantities * 1e6:.0f} us per quantity"
+        )
+    assert results["vectorized"] == results["depth index"] == results["fixed point walks"]
+
+
+if __name__ == "__main__":
+    benchmark()
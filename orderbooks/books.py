@@ -0,0 +1,247 @@
+import heapq
+import threading
+from array import array
+from decimal import Decimal
+from itertools import groupby
+from operator import itemgetter
+
+from orderbooks.integrations.constants import (COINBASE, DEFAULT_PRICE_DECIMALS,
+                                               DEFAULT_SIZE_DECIMALS, GEMINI,
+                                               KRAKEN, PRODUCT_PRICE_DECIMALS,
+                                               PRODUCT_SIZE_DECIMALS)
+
+price_key = itemgetter(1)
+
+# Exchanges are stored in order books by their index in this list.
+EXCHANGES = [COINBASE, GEMINI, KRAKEN]
+_exchanges_lock = threading.Lock()
+
+
+def exchange_id(exchange: str) -> int:
+    """Return the small integer id of an exchange, assigning one on first use."""
+    try:
+        return EXCHANGES.index(exchange)
+    except ValueError:
+        with _exchanges_lock:
+            if exchange not in EXCHANGES:
+                EXCHANGES.append(exchange)
+            return EXCHANGES.index(exchange)
+
+
+def product_decimals(product: str):
+    """Return the (price, size) decimal places used to store a product's levels."""
+    return (
+        PRODUCT_PRICE_DECIMALS.get(product, DEFAULT_PRICE_DECIMALS),
+        PRODUCT_SIZE_DECIMALS.get(product, DEFAULT_SIZE_DECIMALS),
+    )
+
+
+def to_ticks(value, decimals: int) -> int:
+    """Scale a price or size to an integer number of 10**-decimals ticks.
+
+    Raises a ValueError if the value cannot be represented exactly.
+    """
+    if isinstance(value, str) and "e" not in value and "E" not in value:
+        whole, _, fraction = value.partition(".")
+        if len(fraction) > decimals:
+            if fraction[decimals:].strip("0"):
+                raise ValueError(f"{value} has more than {decimals} decimal places")
+            fraction = fraction[:decimals]
+        return int(whole + fraction.ljust(decimals, "0"))
+
+    scaled = Decimal(value).scaleb(decimals)
+    if scaled != scaled.to_integral_value():
+        raise ValueError(f"{value} has more than {decimals} decimal places")
+    return int(scaled)
+
+
+def from_ticks(ticks: int, decimals: int) -> Decimal:
+    return Decimal(ticks).scaleb(-decimals)
+
+
+class OrderBookSide:
+    """
+    One price ordered side of an order book stored in contiguous arrays of
+    scaled integer prices and sizes plus the small integer id of the exchange
+    of each level.
+
+    Iterating yields the same (exchange, price, amount) tuples, with Decimal
+    price and amount, as the list based order books.
+    """
+
+    __slots__ = ("prices", "sizes", "exchange_ids", "price_decimals", "size_decimals")
+
+    def __init__(
+        self,
+        prices=None,
+        sizes=None,
+        exchange_ids=None,
+        price_decimals=DEFAULT_PRICE_DECIMALS,
+        size_decimals=DEFAULT_SIZE_DECIMALS,
+    ):
+        self.prices = prices if prices is not None else array("q")
+        self.sizes = sizes if sizes is not None else array("q")
+        self.exchange_ids = exchange_ids if exchange_ids is not None else array("B")
+        self.price_decimals = price_decimals
+        self.size_decimals = size_decimals
+
+    @classmethod
+    def from_records(
+        cls,
+        records,
+        exchange,
+        dict_datatype=False,
+        price_decimals=DEFAULT_PRICE_DECIMALS,
+        size_decimals=DEFAULT_SIZE_DECIMALS,
+        aggregate=False,
+    ):
+        """Build a side from the raw price ordered levels of an exchange. With
+        `aggregate` consecutive records quoting the same price, such as the
+        individual orders of a level-3 book, are merged into one level."""
+        if aggregate:
+            price_field, amount_field = ("price", "amount") if dict_datatype else (0, 1)
+            prices, sizes = array("q"), array("q")
+            for price, level in groupby(records, key=itemgetter(price_field)):
+                prices.append(to_ticks(price, price_decimals))
+                sizes.append(
+                    sum([to_ticks(record[amount_field], size_decimals) for record in level])
+                )
+        elif dict_datatype:
+            prices = array(
+                "q", [to_ticks(record.get("price"), price_decimals) for record in records]
+            )
+            sizes = array(
+                "q", [to_ticks(record.get("amount"), size_decimals) for record in records]
+            )
+        else:
+            prices = array("q", [to_ticks(record[0], price_decimals) for record in records])
+            sizes = array("q", [to_ticks(record[1], size_decimals) for record in records])
+        exchange_ids = array("B", [exchange_id(exchange)]) * len(prices)
+        return cls(prices, sizes, exchange_ids, price_decimals, size_decimals)
+
+    def append(self, exchange_index: int, price_ticks: int, size_ticks: int):
+        self.exchange_ids.append(exchange_index)
+        self.prices.append(price_ticks)
+        self.sizes.append(size_ticks)
+
+    def __len__(self):
+        return len(self.prices)
+
+    def __getitem__(self, index):
+        return (
+            EXCHANGES[self.exchange_ids[index]],
+            from_ticks(self.prices[index], self.price_decimals),
+            from_ticks(self.sizes[index], self.size_decimals),
+        )
+
+    def __iter__(self):
+        price_decimals = -self.price_decimals
+        size_decimals = -self.size_decimals
+        for exchange, price, size in zip(self.exchange_ids, self.prices, self.sizes):
+            yield (
+                EXCHANGES[exchange],
+                Decimal(price).scaleb(price_decimals),
+                Decimal(size).scaleb(size_decimals),
+            )
+
+    def iter_ticks(self):
+        """Iterate the (exchange id, price ticks, size ticks) of every level."""
+        return zip(self.exchange_ids, self.prices, self.sizes)
+
+    def nbytes(self):
+        """Bytes used by the level arrays."""
+        return sum(
+            len(column) * column.itemsize
+            for column in (self.prices, self.sizes, self.exchange_ids)
+        )
+
+
+class MergedSide:
+    """
+    One side (bids or offers) of the combined order book kept as the price
+    ordered run of levels returned by each exchange.
+
+    Iterating merges the runs lazily with a heap based k-way merge, so a market
+    order only pays for the levels it actually consumes. Levels at equal prices
+    keep the order of the runs, which matches a stable sort of the runs
+    concatenated one after another.
+    """
+
+    def __init__(self, runs, bid=False):
+        self.runs = list(runs)
+        self.bid = bid
+
+    def __iter__(self):
+        return heapq.merge(*self.runs, key=price_key, reverse=self.bid)
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+    def iter_ticks(self):
+        """Merge the scaled integer levels of runs that are `OrderBookSide`s."""
+        return heapq.merge(
+            *(run.iter_ticks() for run in self.runs), key=price_key, reverse=self.bid
+        )
+
+    @property
+    def price_decimals(self):
+        return self._common_decimals("price_decimals", DEFAULT_PRICE_DECIMALS)
+
+    @property
+    def size_decimals(self):
+        return self._common_decimals("size_decimals", DEFAULT_SIZE_DECIMALS)
+
+    def _common_decimals(self, name, default):
+        decimals = {getattr(run, name) for run in self.runs}
+        if len(decimals) > 1:
+            raise ValueError(f"Order book runs have different {name}: {decimals}")
+        return decimals.pop() if decimals else default
+
+
+class MergedBook:
+    """
+    Both sides of the combined order book, each merged once into a single
+    price ordered `OrderBookSide` whose columns are read-only views. Any number
+    of buy and sell orders can then walk the sides, without merging the
+    exchange runs again and without any caller being able to reorder them.
+    """
+
+    __slots__ = ("bids", "offers")
+
+    def __init__(self, bids, offers):
+        self.bids = bids
+        self.offers = offers
+
+    @classmethod
+    def prepare(cls, bid_order_book, offer_order_book):
+        """Merge the bid and offer `OrderBookSide`s, or `MergedSide`s of them."""
+        return cls(merge_runs(bid_order_book), merge_runs(offer_order_book))
+
+
+def merge_runs(order_book):
+    """Merge an `OrderBookSide`, or the `OrderBookSide` runs of a `MergedSide`,
+    into one read-only side in the order `MergedSide` iterates them."""
+    runs = order_book.runs if isinstance(order_book, MergedSide) else [order_book]
+    if not all(isinstance(run, OrderBookSide) for run in runs):
+        raise TypeError("Only eagerly normalized OrderBookSide runs can be merged")
+    prices, sizes, exchange_ids = array("q"), array("q"), array("B")
+    for run in runs:
+        prices.extend(run.prices)
+        sizes.extend(run.sizes)
+        exchange_ids.extend(run.exchange_ids)
+    if len(runs) > 1:
+        # Sorting is stable, so equal prices keep the order of the runs like the
+        # heap merge, and merging the already ordered runs is done by the sort.
+        order = sorted(
+            range(len(prices)), key=prices.__getitem__, reverse=order_book.bid
+        )
+        prices = array("q", map(prices.__getitem__, order))
+        sizes = array("q", map(sizes.__getitem__, order))
+        exchange_ids = array("B", map(exchange_ids.__getitem__, order))
+    return OrderBookSide(
+        memoryview(prices).toreadonly(),
+        memoryview(sizes).toreadonly(),
+        memoryview(exchange_ids).toreadonly(),
+        order_book.price_decimals,
+        order_book.size_decimals,
+    )
@@ -0,0 +1,99 @@
+"""
+Snapshot cache of raw exchange order books, keyed by (exchange, product, depth).
+
+Snapshots live in an in-memory LRU tier for long-lived processes and, when a
+directory is given, in an on-disk tier shared by back-to-back CLI invocations.
+A snapshot older than the max-age is never returned.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import quote
+
+from orderbooks.integrations.constants import SNAPSHOT_CACHE_MAX_ENTRIES
+
+FULL_DEPTH = "full"
+
+
+def depth_key(params=None):
+    """The depth part of a cache key for the request params of a depth ladder step."""
+    if not params:
+        return FULL_DEPTH
+    return "&".join(f"{name}={value}" for name, value in sorted(params.items()))
+
+
+class SnapshotCache:
+    """
+    TTL cache of raw order book snapshots. `get` returns a snapshot and its age
+    in seconds, or None when there is no snapshot younger than `max_age`.
+    """
+
+    def __init__(self, max_age, directory=None, max_entries=SNAPSHOT_CACHE_MAX_ENTRIES):
+        self.max_age = max_age
+        self.directory = directory
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, quote("_".join(key), safe="") + ".json")
+
+    def get(self, key, max_age=None):
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None and self.directory is not None:
+            entry = self._read(key)
+            if entry is not None:
+                self._remember(key, entry)
+        if entry is None:
+            return None
+
+        fetched_at, snapshot = entry
+        age = max(time.time() - fetched_at, 0.0)
+        if age > max_age:
+            return None
+        return snapshot, age
+
+    def put(self, key, snapshot, fetched_at=None):
+        entry = (time.time() if fetched_at is None else fetched_at, snapshot)
+        self._remember(key, entry)
+        if self.directory is not None:
+            self._write(key, entry)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _read(self, key):
+        try:
+            with open(self.path(key)) as snapshot_file:
+                stored = json.load(snapshot_file)
+            return stored["fetched_at"], stored["snapshot"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write(self, key, entry):
+        # Written aside then renamed so a concurrent reader never sees half a file.
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as snapshot_file:
+                json.dump({"fetched_at": entry[0], "snapshot": entry[1]}, snapshot_file)
+            os.replace(tmp_path, self.path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
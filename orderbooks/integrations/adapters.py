@@ -0,0 +1,187 @@
+"""
+Registry of exchange adapters.
+
+An adapter declares everything needed to fetch and read the order book of one
+exchange: its client, product symbols, payload shape, depth parameters and how
+many of its requests may run at once. Order books are fetched from every
+enabled adapter, in registration order, so supporting a new venue only takes
+an adapter class decorated with `register_adapter`.
+"""
+import threading
+
+from orderbooks.integrations.constants import (
+    COINBASE, COINBASE_DEPTH_LADDER, COINROUTES_SYMBOL_TO_COINBASE_SYMBOL,
+    COINROUTES_SYMBOL_TO_GEMINI_SYMBOL, COINROUTES_SYMBOL_TO_KRAKEN_SYMBOL,
+    DEFAULT_POOL_SIZE, DEFAULT_REQUEST_BURST, DEFAULT_REQUESTS_PER_SECOND,
+    EXCHANGE_POOL_SIZES, EXCHANGE_REQUEST_BURSTS, EXCHANGE_REQUESTS_PER_SECOND,
+    GEMINI, GEMINI_DEPTH_LADDER, KRAKEN, KRAKEN_DEPTH_LADDER,
+    KRAKEN_REQUEST_SYMBOL_TO_RESULTS_SYMBOL)
+from orderbooks.integrations.exchanges import (CoinBaseClient, GeminiClient,
+                                               KrakenClient)
+from orderbooks.integrations.feeds import CoinbaseFeed, GeminiFeed, KrakenFeed
+from orderbooks.integrations.ratelimit import TokenBucket
+
+_adapters = {}
+_adapters_lock = threading.Lock()
+
+
+class ExchangeAdapter:
+    """
+    Base adapter of an exchange. `SYMBOLS` maps products to exchange symbols,
+    `FULL_DEPTH_PARAMS` are the request params of the full order book (None to
+    send none) and `DEPTH_LADDER` the depths tried when fetching adaptively.
+    `DICT_DATATYPE` tells whether levels are {"price", "amount"} dicts rather
+    than [price, amount, ...] lists. With `AGGREGATE_LEVELS` the records at the
+    same price, e.g. the individual orders of a level-3 book, are merged into
+    one level when normalizing. At most `MAX_CONCURRENCY` requests to the
+    exchange run at once, and schedulers sending many requests keep under
+    `REQUESTS_PER_SECOND` with bursts of `REQUEST_BURST` through `rate_limiter`.
+    `OPTIONAL` exchanges are only fetched on request. `FEED` is the websocket
+    feed streaming the exchange's order book, None when it cannot be streamed.
+    """
+
+    EXCHANGE = None
+    CLIENT = None
+    SYMBOLS = {}
+    FULL_DEPTH_PARAMS = None
+    DEPTH_LADDER = []
+    DICT_DATATYPE = False
+    AGGREGATE_LEVELS = False
+    MAX_CONCURRENCY = DEFAULT_POOL_SIZE
+    REQUESTS_PER_SECOND = DEFAULT_REQUESTS_PER_SECOND
+    REQUEST_BURST = DEFAULT_REQUEST_BURST
+    OPTIONAL = False
+    FEED = None
+
+    def __init__(self):
+        self.concurrency = threading.BoundedSemaphore(self.MAX_CONCURRENCY)
+        self.rate_limiter = TokenBucket(self.REQUESTS_PER_SECOND, self.REQUEST_BURST)
+
+    def symbol(self, product: str):
+        return self.SYMBOLS.get(product)
+
+    def create_client(self, deadline=None, rate_limit=False):
+        """A client of the exchange, its requests bounded by `deadline` when given
+        and each taking a token of `rate_limiter` first with `rate_limit`."""
+        return self.CLIENT(
+            deadline=deadline, rate_limiter=self.rate_limiter if rate_limit else None
+        )
+
+    def get_order_book(self, client, symbol: str, params=None):
+        """Request the raw order book payload at the depth of `params`."""
+        if params is None:
+            return client.get_order_book(symbol)
+        return client.get_order_book(symbol, params=dict(params))
+
+    def order_book(self, payload, symbol: str):
+        """Return the order book holding the "bids" and "asks" of a raw payload."""
+        return payload
+
+    def snapshot_fields(self, payload):
+        """Return the exchange's (sequence number, time) of a raw payload, None for
+        those it does not send."""
+        return None, None
+
+
+def register_adapter(adapter_class):
+    """Class decorator registering an adapter under its exchange name."""
+    with _adapters_lock:
+        _adapters[adapter_class.EXCHANGE] = adapter_class()
+    return adapter_class
+
+
+def unregister_adapter(exchange: str):
+    with _adapters_lock:
+        _adapters.pop(exchange, None)
+
+
+def get_adapter(exchange: str) -> ExchangeAdapter:
+    return _adapters[exchange]
+
+
+def registered_exchanges():
+    """The names of every registered exchange, in registration order."""
+    with _adapters_lock:
+        return list(_adapters)
+
+
+def enabled_adapters(optional=()):
+    """The registered adapters to fetch, in registration order: every adapter
+    which is not optional and the optional ones named in `optional`."""
+    with _adapters_lock:
+        return [
+            adapter
+            for adapter in _adapters.values()
+            if not adapter.OPTIONAL or adapter.EXCHANGE in optional
+        ]
+
+
+@register_adapter
+class GeminiAdapter(ExchangeAdapter):
+    EXCHANGE = GEMINI
+    CLIENT = GeminiClient
+    FEED = GeminiFeed
+    SYMBOLS = COINROUTES_SYMBOL_TO_GEMINI_SYMBOL
+    DEPTH_LADDER = GEMINI_DEPTH_LADDER
+    DICT_DATATYPE = True
+    MAX_CONCURRENCY = EXCHANGE_POOL_SIZES[GEMINI]
+    REQUESTS_PER_SECOND = EXCHANGE_REQUESTS_PER_SECOND[GEMINI]
+    REQUEST_BURST = EXCHANGE_REQUEST_BURSTS[GEMINI]
+
+    def snapshot_fields(self, payload):
+        # Only the levels are timestamped, the latest is the time of the book.
+        timestamps = [
+            int(level["timestamp"])
+            for side in ("bids", "asks")
+            for level in payload.get(side, [])
+            if "timestamp" in level
+        ]
+        return None, max(timestamps, default=None)
+
+
+@register_adapter
+class CoinBaseAdapter(ExchangeAdapter):
+    EXCHANGE = COINBASE
+    CLIENT = CoinBaseClient
+    FEED = CoinbaseFeed
+    SYMBOLS = COINROUTES_SYMBOL_TO_COINBASE_SYMBOL
+    FULL_DEPTH_PARAMS = {"level": "3"}
+    DEPTH_LADDER = COINBASE_DEPTH_LADDER
+    # The full depth level-3 book lists every resting order, often many per price.
+    AGGREGATE_LEVELS = True
+    MAX_CONCURRENCY = EXCHANGE_POOL_SIZES[COINBASE]
+    REQUESTS_PER_SECOND = EXCHANGE_REQUESTS_PER_SECOND[COINBASE]
+    REQUEST_BURST = EXCHANGE_REQUEST_BURSTS[COINBASE]
+
+    def snapshot_fields(self, payload):
+        return payload.get("sequence"), payload.get("time")
+
+
+@register_adapter
+class KrakenAdapter(ExchangeAdapter):
+    EXCHANGE = KRAKEN
+    CLIENT = KrakenClient
+    FEED = KrakenFeed
+    SYMBOLS = COINROUTES_SYMBOL_TO_KRAKEN_SYMBOL
+    DEPTH_LADDER = KRAKEN_DEPTH_LADDER
+    MAX_CONCURRENCY = EXCHANGE_POOL_SIZES[KRAKEN]
+    REQUESTS_PER_SECOND = EXCHANGE_REQUESTS_PER_SECOND[KRAKEN]
+    REQUEST_BURST = EXCHANGE_REQUEST_BURSTS[KRAKEN]
+    OPTIONAL = True
+
+    def order_book(self, payload, symbol: str):
+        # Kraken nests the book under its own name of the pair.
+        return payload.get("result").get(
+            KRAKEN_REQUEST_SYMBOL_TO_RESULTS_SYMBOL.get(symbol)
+        )
+
+    def snapshot_fields(self, payload):
+        # Levels are [price, volume, timestamp], the latest is the time of the book.
+        timestamps = [
+            level[2]
+            for order_book in payload.get("result", {}).values()
+            for side in ("bids", "asks")
+            for level in order_book.get(side, [])
+            if len(level) > 2
+        ]
+        return None, max(timestamps, default=None)
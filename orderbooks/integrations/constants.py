@@ -1,18 +1,62 @@
+import os
+import tempfile
+
 GEMINI_BTC_USD_SYMBOL = "BTCUSD"
 COINBASE_BTC_USD_SYMBOL = "BTC-USD"
 KRAKEN_BTC_USD_SYMBOL = "XBTUSD"
 COINROUTES_BTC_USD = "BTCUSD"
 
+GEMINI_ETH_USD_SYMBOL = "ETHUSD"
+COINBASE_ETH_USD_SYMBOL = "ETH-USD"
+KRAKEN_ETH_USD_SYMBOL = "ETHUSD"
+COINROUTES_ETH_USD = "ETHUSD"
+
+GEMINI_LTC_USD_SYMBOL = "LTCUSD"
+COINBASE_LTC_USD_SYMBOL = "LTC-USD"
+KRAKEN_LTC_USD_SYMBOL = "LTCUSD"
+COINROUTES_LTC_USD = "LTCUSD"
+
+GEMINI_SOL_USD_SYMBOL = "SOLUSD"
+COINBASE_SOL_USD_SYMBOL = "SOL-USD"
+KRAKEN_SOL_USD_SYMBOL = "SOLUSD"
+COINROUTES_SOL_USD = "SOLUSD"
+
 KRAKEN_BTC_USD_RESULTS_SYMBOL = "XXBTZUSD"
+KRAKEN_ETH_USD_RESULTS_SYMBOL = "XETHZUSD"
+KRAKEN_LTC_USD_RESULTS_SYMBOL = "XLTCZUSD"
+KRAKEN_SOL_USD_RESULTS_SYMBOL = "SOLUSD"
 
-COINROUTES_GET_PRICE_CHOICES = [COINROUTES_BTC_USD]
+COINROUTES_GET_PRICE_CHOICES = [
+    COINROUTES_BTC_USD,
+    COINROUTES_ETH_USD,
+    COINROUTES_LTC_USD,
+    COINROUTES_SOL_USD,
+]
 
-COINROUTES_SYMBOL_TO_GEMINI_SYMBOL = {COINROUTES_BTC_USD: GEMINI_BTC_USD_SYMBOL}
-COINROUTES_SYMBOL_TO_COINBASE_SYMBOL = {COINROUTES_BTC_USD: COINBASE_BTC_USD_SYMBOL}
-COINROUTES_SYMBOL_TO_KRAKEN_SYMBOL = {COINROUTES_BTC_USD: KRAKEN_BTC_USD_SYMBOL}
+COINROUTES_SYMBOL_TO_GEMINI_SYMBOL = {
+    COINROUTES_BTC_USD: GEMINI_BTC_USD_SYMBOL,
+    COINROUTES_ETH_USD: GEMINI_ETH_USD_SYMBOL,
+    COINROUTES_LTC_USD: GEMINI_LTC_USD_SYMBOL,
+    COINROUTES_SOL_USD: GEMINI_SOL_USD_SYMBOL,
+}
+COINROUTES_SYMBOL_TO_COINBASE_SYMBOL = {
+    COINROUTES_BTC_USD: COINBASE_BTC_USD_SYMBOL,
+    COINROUTES_ETH_USD: COINBASE_ETH_USD_SYMBOL,
+    COINROUTES_LTC_USD: COINBASE_LTC_USD_SYMBOL,
+    COINROUTES_SOL_USD: COINBASE_SOL_USD_SYMBOL,
+}
+COINROUTES_SYMBOL_TO_KRAKEN_SYMBOL = {
+    COINROUTES_BTC_USD: KRAKEN_BTC_USD_SYMBOL,
+    COINROUTES_ETH_USD: KRAKEN_ETH_USD_SYMBOL,
+    COINROUTES_LTC_USD: KRAKEN_LTC_USD_SYMBOL,
+    COINROUTES_SOL_USD: KRAKEN_SOL_USD_SYMBOL,
+}
 
 KRAKEN_REQUEST_SYMBOL_TO_RESULTS_SYMBOL = {
-    KRAKEN_BTC_USD_SYMBOL: KRAKEN_BTC_USD_RESULTS_SYMBOL
+    KRAKEN_BTC_USD_SYMBOL: KRAKEN_BTC_USD_RESULTS_SYMBOL,
+    KRAKEN_ETH_USD_SYMBOL: KRAKEN_ETH_USD_RESULTS_SYMBOL,
+    KRAKEN_LTC_USD_SYMBOL: KRAKEN_LTC_USD_RESULTS_SYMBOL,
+    KRAKEN_SOL_USD_SYMBOL: KRAKEN_SOL_USD_RESULTS_SYMBOL,
 }
 
 
@@ -20,3 +64,105 @@ COINBASE = "COINBASE"
 KRAKEN = "KRAKEN"
 GEMINI = "GEMINI"
 
+# None starts one worker per enabled exchange so every book is fetched at once.
+DEFAULT_MAX_WORKERS = None
+
+# Connection pool size kept alive per exchange host.
+EXCHANGE_POOL_SIZES = {COINBASE: 4, GEMINI: 4, KRAKEN: 2}
+DEFAULT_POOL_SIZE = 2
+
+# (connect, read) timeouts in seconds applied to every exchange request.
+REQUEST_TIMEOUT = (3.05, 10)
+
+# Depths tried in order when fetching adaptively. Each step holds the request params
+# and the most levels per side the exchange returns for them (None for the full book).
+COINBASE_DEPTH_LADDER = [({"level": "2"}, 50), ({"level": "3"}, None)]
+GEMINI_DEPTH_LADDER = [
+    ({"limit_bids": "50", "limit_asks": "50"}, 50),
+    ({"limit_bids": "500", "limit_asks": "500"}, 500),
+    ({"limit_bids": "0", "limit_asks": "0"}, None),
+]
+KRAKEN_DEPTH_LADDER = [({"count": "100"}, 100), ({"count": "500"}, 500)]
+
+# Decimal places kept when prices and sizes are stored as scaled integers (ticks).
+# Every supported product is listed, with at least the decimal places any of the
+# exchanges quotes it in: a level with more cannot be stored and fails the fetch.
+DEFAULT_PRICE_DECIMALS = 8
+DEFAULT_SIZE_DECIMALS = 8
+PRODUCT_PRICE_DECIMALS = {
+    COINROUTES_BTC_USD: 5,
+    COINROUTES_ETH_USD: 8,
+    COINROUTES_LTC_USD: 8,
+    COINROUTES_SOL_USD: 8,
+}
+PRODUCT_SIZE_DECIMALS = {
+    COINROUTES_BTC_USD: 8,
+    COINROUTES_ETH_USD: 8,
+    COINROUTES_LTC_USD: 8,
+    COINROUTES_SOL_USD: 8,
+}
+
+COINBASE_WEBSOCKET_URL = "wss://ws-feed.exchange.coinbase.com"
+GEMINI_WEBSOCKET_URL = "wss://api.gemini.com/v1/marketdata/{}"
+KRAKEN_WEBSOCKET_URL = "wss://ws.kraken.com"
+KRAKEN_BTC_USD_WEBSOCKET_SYMBOL = "XBT/USD"
+KRAKEN_ETH_USD_WEBSOCKET_SYMBOL = "ETH/USD"
+KRAKEN_LTC_USD_WEBSOCKET_SYMBOL = "LTC/USD"
+KRAKEN_SOL_USD_WEBSOCKET_SYMBOL = "SOL/USD"
+COINROUTES_SYMBOL_TO_KRAKEN_WEBSOCKET_SYMBOL = {
+    COINROUTES_BTC_USD: KRAKEN_BTC_USD_WEBSOCKET_SYMBOL,
+    COINROUTES_ETH_USD: KRAKEN_ETH_USD_WEBSOCKET_SYMBOL,
+    COINROUTES_LTC_USD: KRAKEN_LTC_USD_WEBSOCKET_SYMBOL,
+    COINROUTES_SOL_USD: KRAKEN_SOL_USD_WEBSOCKET_SYMBOL,
+}
+# Levels per side of the Kraken book feed, levels beyond it must be dropped locally.
+KRAKEN_WEBSOCKET_DEPTH = 1000
+# Levels per side of the Kraken book covered by the checksum of its updates.
+KRAKEN_CHECKSUM_DEPTH = 10
+# Seconds between resubscriptions of the Coinbase level-2 feed, which has neither
+# sequence numbers nor checksums to detect a missed update with.
+COINBASE_RESYNC_INTERVAL = 60.0
+# A dropped feed connection is reopened after a random (full jitter) delay of up
+# to STREAM_RECONNECT_BASE_DELAY * 2 ** attempt seconds, capped at the max delay.
+STREAM_RECONNECT_BASE_DELAY = 0.5
+STREAM_RECONNECT_MAX_DELAY = 30.0
+
+QUOTE_SERVER_HOST = "127.0.0.1"
+QUOTE_SERVER_PORT = 8765
+# Seconds between refreshes of the books kept warm by the quote server.
+QUOTE_SERVER_REFRESH_INTERVAL = 1.0
+
+# Order book snapshots kept by the in-memory tier of the snapshot cache.
+SNAPSHOT_CACHE_MAX_ENTRIES = 32
+SNAPSHOT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "orderbooks-snapshots")
+
+# Retries of a failed exchange request, waiting a random (full jitter) delay of up
+# to RETRY_BASE_DELAY * 2 ** attempt seconds, capped at RETRY_MAX_DELAY.
+EXCHANGE_MAX_RETRIES = 2
+RETRY_BASE_DELAY = 0.1
+RETRY_MAX_DELAY = 1.0
+# A rate limited or unavailable exchange may ask for a longer wait in the
+# Retry-After header of its response, which is honoured up to this many seconds.
+# The request fails rather than waiting longer.
+RETRY_AFTER_MAX_DELAY = 60.0
+# Consecutive failures opening the circuit breaker of an exchange, and seconds
+# before an open breaker lets a request through again.
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = 5
+CIRCUIT_BREAKER_RESET_TIMEOUT = 30.0
+# A hedged duplicate request is sent once a request is slower than this percentile
+# of the recent request latencies, when at least HEDGE_MIN_SAMPLES were recorded.
+HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_LATENCY_SAMPLES = 100
+HEDGE_MAX_WORKERS = 8
+
+# Public REST request rates (per second) and bursts allowed by each exchange, which
+# the batch quoting scheduler keeps under with a token bucket per exchange.
+EXCHANGE_REQUESTS_PER_SECOND = {COINBASE: 10, GEMINI: 1, KRAKEN: 1}
+EXCHANGE_REQUEST_BURSTS = {COINBASE: 15, GEMINI: 5, KRAKEN: 2}
+DEFAULT_REQUESTS_PER_SECOND = 1
+DEFAULT_REQUEST_BURST = 1
+
+# Snapshots written per gzip member by the recorder, and seconds it waits for more.
+RECORDING_BATCH_SIZE = 256
+RECORDING_FLUSH_INTERVAL = 0.5
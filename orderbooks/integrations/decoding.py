@@ -0,0 +1,56 @@
+"""
+Decoding of exchange response bodies.
+
+An order book payload decodes into hundreds of thousands of small lists and
+dicts, e.g. one per Coinbase level-3 order. None of them can form a reference
+cycle, but each allocation counts towards the thresholds of the cyclic garbage
+collector, which then runs repeatedly over the growing payload while it is
+decoded. `loads` pauses the collector for the duration of the decoding. As the
+collector is process wide, overlapping pauses of the fetching threads are
+counted: it is disabled by the first and restored by the last to end.
+
+The optional `orjson` package is used to decode the bytes when installed,
+otherwise the standard library `json` module is.
+"""
+import gc
+import json
+import threading
+from contextlib import contextmanager
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the installed extras
+    orjson = None
+
+
+_pause_lock = threading.Lock()
+_pauses = 0
+_enabled_before_pause = False
+
+
+@contextmanager
+def gc_paused():
+    """Disable the cyclic garbage collector, restoring its previous state once the
+    last of the pauses overlapping with this one, in any thread, exits."""
+    global _pauses, _enabled_before_pause
+    with _pause_lock:
+        if not _pauses:
+            _enabled_before_pause = gc.isenabled()
+            gc.disable()
+        _pauses += 1
+    try:
+        yield
+    finally:
+        with _pause_lock:
+            _pauses -= 1
+            if not _pauses and _enabled_before_pause:
+                gc.enable()
+
+
+def loads(content: bytes):
+    """Decode a JSON response body, like `Response.json` but with the garbage
+    collector paused. Invalid JSON raises `json.JSONDecodeError`."""
+    with gc_paused():
+        if orjson is not None:
+            return orjson.loads(content)
+        return json.loads(content)
@@ -0,0 +1,44 @@
+class ExchangeError(Exception):
+    """Base class of the errors raised by the exchange clients. `retryable` tells
+    whether the same request may succeed when sent again, and `retry_after` the
+    seconds the exchange asked to wait before that, when it did."""
+
+    retryable = False
+    retry_after = None
+
+
+class ExchangeConnectionError(ExchangeError):
+    retryable = True
+
+
+class ExchangeTimeoutError(ExchangeError):
+    retryable = True
+
+
+class ExchangeHTTPError(ExchangeError):
+    pass
+
+
+class ExchangeRequestError(ExchangeError):
+    pass
+
+
+class ExchangeResponseError(ExchangeError):
+    """An exchange answered with an unexpected status code."""
+
+    def __init__(self, message, status_code, retry_after=None):
+        super().__init__(message, status_code)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self):
+        return self.status_code == 429 or self.status_code >= 500
+
+
+class CircuitOpenError(ExchangeError):
+    """The circuit breaker of an exchange is open, no request was sent."""
+
+
+class ExchangeDeadlineError(ExchangeError):
+    """The deadline of a fetch passed before a request could be sent or retried."""
@@ -1,3 +1,6 @@
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from http import HTTPStatus
 from typing import Dict
 from urllib.parse import urljoin
@@ -5,6 +8,19 @@ from urllib.parse import urljoin
 import requests
 from requests.models import Response as RequestResponse
 
+from orderbooks.integrations.constants import (COINBASE, GEMINI, KRAKEN,
+                                               REQUEST_TIMEOUT)
+from orderbooks.integrations.decoding import loads
+from orderbooks.integrations.errors import (ExchangeConnectionError,
+                                            ExchangeDeadlineError,
+                                            ExchangeError, ExchangeHTTPError,
+                                            ExchangeRequestError,
+                                            ExchangeResponseError,
+                                            ExchangeTimeoutError)
+from orderbooks.integrations.ratelimit import TokenBucket
+from orderbooks.integrations.resilience import ExchangePolicy, get_policy
+from orderbooks.integrations.sessions import get_session
+
 
 def validate_response(
     response: RequestResponse, expected_status: int, method_name: str, class_name: str
@@ -12,18 +28,149 @@ def validate_response(
     if response.status_code == expected_status:
         return
 
-    raise Exception(
+    raise ExchangeResponseError(
         f"{class_name} {method_name} error, error code: {response.status_code} error message: {response.reason}",
         response.status_code,
+        retry_after=retry_after(response),
     )
 
 
-class CoinBaseClient:
+def retry_after(response: RequestResponse):
+    """The seconds to wait before retrying asked for by the Retry-After header of
+    a response, given in seconds or as an HTTP date, or None without a valid one."""
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max((date - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def wire_size(response: RequestResponse):
+    """The size of a response body as sent: its Content-Length, which is the
+    compressed size of a compressed body, or the size of the decoded body when
+    it was sent without one e.g. chunked."""
+    content_length = response.headers.get("Content-Length")
+    if content_length is not None and content_length.isdigit():
+        return int(content_length)
+    return len(response.content)
+
+
+class ExchangeClient:
+    """
+    Base client holding the pooled keep-alive session used to reach an exchange.
+    A session can be injected e.g. for tests, otherwise the session shared by
+    every client of the same exchange is used. The size on the wire of every
+    response body received, see `wire_size`, is added up in `bytes_transferred`.
+
+    Requests go through the `ExchangePolicy` of the exchange: they are rejected
+    while its circuit breaker is open, retried with jittered backoff on
+    retryable errors, waiting at least as long as the exchange asked for in the
+    Retry-After header of its response, and optionally hedged. Failures raise
+    `ExchangeError`s. With a `rate_limiter` every request sent, retries and
+    hedged duplicates included, first waits for one of its tokens.
+
+    With a `deadline`, a `time.monotonic()` time, the timeout of every request
+    is cut to the time left before it and no retry is made whose backoff would
+    end past it. No request is sent once it passed: `ExchangeDeadlineError`.
+    """
+
+    EXCHANGE = None
+
+    def __init__(
+        self,
+        session: requests.Session = None,
+        timeout=REQUEST_TIMEOUT,
+        policy: ExchangePolicy = None,
+        deadline: float = None,
+        rate_limiter: TokenBucket = None,
+    ):
+        self.session = session if session is not None else get_session(self.EXCHANGE)
+        self.timeout = timeout
+        self.policy = policy if policy is not None else get_policy(self.EXCHANGE)
+        self.deadline = deadline
+        self.rate_limiter = rate_limiter
+        self.bytes_transferred = 0
+
+    def remaining(self):
+        """Seconds left before the deadline, None without one."""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def request_timeout(self):
+        """The timeout of the next request, each of its connect and read timeouts
+        cut to the time left before the deadline."""
+        remaining = self.remaining()
+        if remaining is None:
+            return self.timeout
+        if remaining <= 0:
+            raise ExchangeDeadlineError(f"{type(self).__name__} deadline exceeded")
+        if isinstance(self.timeout, tuple):
+            return tuple(min(timeout, remaining) for timeout in self.timeout)
+        return remaining if self.timeout is None else min(self.timeout, remaining)
+
+    def _send(self, url: str, params: Dict[str, str]):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        timeout = self.request_timeout()
+        try:
+            return self.session.get(url, params=params, timeout=timeout)
+        except requests.exceptions.ConnectionError as errc:
+            raise ExchangeConnectionError(f"Connection Error: {errc}")
+        except requests.exceptions.Timeout as errt:
+            raise ExchangeTimeoutError(f"Timeout Error: {errt}")
+        except requests.exceptions.HTTPError as errh:
+            raise ExchangeHTTPError(f"Http Error: {errh}")
+        except requests.exceptions.RequestException as err:
+            raise ExchangeRequestError(f"Error: {err}")
+
+    def _get(self, url: str, params: Dict[str, str], method_name: str):
+        breaker = self.policy.breaker
+        breaker.check()
+        attempt = 0
+        while True:
+            try:
+                response = self.policy.call(lambda: self._send(url, dict(params)))
+                self.bytes_transferred += wire_size(response)
+                validate_response(
+                    response=response,
+                    expected_status=HTTPStatus.OK,
+                    method_name=method_name,
+                    class_name=type(self).__name__,
+                )
+            except ExchangeError as err:
+                if not err.retryable:
+                    raise
+                breaker.record_failure()
+                if attempt >= self.policy.max_retries or breaker.open:
+                    raise
+                delay = self.policy.retry_delay(attempt, err)
+                remaining = self.remaining()
+                if delay is None or (remaining is not None and delay >= remaining):
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            breaker.record_success()
+            return loads(response.content)
+
+
+class CoinBaseClient(ExchangeClient):
     """
     Client to make requests to CoinBase Pro API.
     see : https://docs.cloud.coinbase.com/exchange/reference
     """
 
+    EXCHANGE = COINBASE
     COINBASE_BASE_URL = "https://api.exchange.coinbase.com"
     ENDPOINT_GET_ORDER_BOOK = "products/{}/book"
 
@@ -33,37 +180,20 @@ class CoinBaseClient:
         if params is None:
             params = dict()
 
-        try:
-            response = requests.get(
-                urljoin(
-                    self.COINBASE_BASE_URL, self.ENDPOINT_GET_ORDER_BOOK.format(product)
-                ),
-                params=params,
-            )
-        except requests.exceptions.ConnectionError as errc:
-            raise Exception(f"Connection Error: {errc}")
-        except requests.exceptions.Timeout as errt:
-            raise Exception(f"Timeout Error: {errt}")
-        except requests.exceptions.HTTPError as errh:
-            raise Exception(f"Http Error: {errh}")
-        except requests.exceptions.RequestException as err:
-            raise Exception(f"Error: {err}")
-
-        validate_response(
-            response=response,
-            expected_status=HTTPStatus.OK,
+        return self._get(
+            urljoin(self.COINBASE_BASE_URL, self.ENDPOINT_GET_ORDER_BOOK.format(product)),
+            params=params,
             method_name=CoinBaseClient.get_order_book.__name__,
-            class_name=CoinBaseClient.__name__,
         )
-        return response.json()
 
 
-class GeminiClient:
+class GeminiClient(ExchangeClient):
     """
     Client to make requests to Gemini Exchange API.
     see : https://docs.gemini.com/rest-api/
     """
 
+    EXCHANGE = GEMINI
     GEMINI_BASE_URL = "https://api.gemini.com"
     ENDPOINT_GET_ORDER_BOOK = "v1/book/{}"
 
@@ -73,37 +203,20 @@ class GeminiClient:
         if params is None:
             params = dict()
 
-        try:
-            response = requests.get(
-                urljoin(
-                    self.GEMINI_BASE_URL, self.ENDPOINT_GET_ORDER_BOOK.format(product)
-                ),
-                params=params,
-            )
-        except requests.exceptions.ConnectionError as errc:
-            raise Exception(f"Connection Error: {errc}")
-        except requests.exceptions.Timeout as errt:
-            raise Exception(f"Timeout Error: {errt}")
-        except requests.exceptions.HTTPError as errh:
-            raise Exception(f"Http Error: {errh}")
-        except requests.exceptions.RequestException as err:
-            raise Exception(f"Error: {err}")
-
-        validate_response(
-            response=response,
-            expected_status=HTTPStatus.OK,
+        return self._get(
+            urljoin(self.GEMINI_BASE_URL, self.ENDPOINT_GET_ORDER_BOOK.format(product)),
+            params=params,
             method_name=GeminiClient.get_order_book.__name__,
-            class_name=GeminiClient.__name__,
         )
-        return response.json()
 
 
-class KrakenClient:
+class KrakenClient(ExchangeClient):
     """
     Client to make requests to Kraken Exchange API.
     see : https://docs.kraken.com/rest/
     """
 
+    EXCHANGE = KRAKEN
     KRAKEN_BASE_URL = "https://api.kraken.com"
     ENDPOINT_GET_ORDER_BOOK = "0/public/Depth"
 
@@ -114,24 +227,8 @@ class KrakenClient:
             params = dict()
         params["pair"] = product
 
-        try:
-            response = requests.get(
-                urljoin(self.KRAKEN_BASE_URL, self.ENDPOINT_GET_ORDER_BOOK),
-                params=params,
-            )
-        except requests.exceptions.ConnectionError as errc:
-            raise Exception(f"Connection Error: {errc}")
-        except requests.exceptions.Timeout as errt:
-            raise Exception(f"Timeout Error: {errt}")
-        except requests.exceptions.HTTPError as errh:
-            raise Exception(f"Http Error: {errh}")
-        except requests.exceptions.RequestException as err:
-            raise Exception(f"Error: {err}")
-
-        validate_response(
-            response=response,
-            expected_status=HTTPStatus.OK,
+        return self._get(
+            urljoin(self.KRAKEN_BASE_URL, self.ENDPOINT_GET_ORDER_BOOK),
+            params=params,
             method_name=KrakenClient.get_order_book.__name__,
-            class_name=KrakenClient.__name__,
         )
-        return response.json()
@@ -0,0 +1,176 @@
+"""
+Level-2 websocket feeds of the exchanges.
+
+A feed knows the URL and subscribe message of an exchange's book channel and
+how to apply each of its messages to a `LiveOrderBook`, raising a
+`BookOutOfSyncError` once the book can no longer be trusted to match the
+exchange's. Adapters declare their feed as `FEED` to be streamed.
+"""
+import zlib
+
+from orderbooks.integrations.constants import (
+    COINBASE, COINBASE_RESYNC_INTERVAL, COINBASE_WEBSOCKET_URL,
+    COINROUTES_SYMBOL_TO_COINBASE_SYMBOL, COINROUTES_SYMBOL_TO_GEMINI_SYMBOL,
+    COINROUTES_SYMBOL_TO_KRAKEN_WEBSOCKET_SYMBOL, GEMINI, GEMINI_WEBSOCKET_URL,
+    KRAKEN, KRAKEN_CHECKSUM_DEPTH, KRAKEN_WEBSOCKET_DEPTH, KRAKEN_WEBSOCKET_URL)
+
+
+class BookOutOfSyncError(Exception):
+    """A live book no longer matches the exchange's, it needs a fresh snapshot."""
+
+
+class SequenceGapError(BookOutOfSyncError):
+    pass
+
+
+class ChecksumMismatchError(BookOutOfSyncError):
+    pass
+
+
+class CoinbaseFeed:
+    """Coinbase `level2_batch` channel, see https://docs.cloud.coinbase.com/exchange/docs/websocket-channels
+
+    The channel carries no sequence numbers nor checksums, so a missed update
+    goes undetected: the stream is resubscribed every `RESYNC_INTERVAL`
+    seconds to replace the book with a fresh snapshot.
+    """
+
+    EXCHANGE = COINBASE
+    RESYNC_INTERVAL = COINBASE_RESYNC_INTERVAL
+
+    def __init__(self, product):
+        self.symbol = COINROUTES_SYMBOL_TO_COINBASE_SYMBOL.get(product)
+
+    def url(self):
+        return COINBASE_WEBSOCKET_URL
+
+    def subscribe_message(self):
+        return {
+            "type": "subscribe",
+            "product_ids": [self.symbol],
+            "channels": ["level2_batch"],
+        }
+
+    def handle(self, message, book):
+        if message.get("type") == "snapshot":
+            book.apply_snapshot(message["bids"], message["asks"])
+        elif message.get("type") == "l2update":
+            book.apply_updates(
+                (side == "buy", price, size) for side, price, size in message["changes"]
+            )
+
+
+class GeminiFeed:
+    """Gemini v1 market data feed, see https://docs.gemini.com/websocket-api/#market-data"""
+
+    EXCHANGE = GEMINI
+
+    def __init__(self, product):
+        self.symbol = COINROUTES_SYMBOL_TO_GEMINI_SYMBOL.get(product)
+
+    def url(self):
+        return GEMINI_WEBSOCKET_URL.format(self.symbol)
+
+    def subscribe_message(self):
+        return None
+
+    def handle(self, message, book):
+        sequence = message.get("socket_sequence")
+        if message.get("type") != "update":
+            # Heartbeats are numbered too, so they still advance the sequence.
+            book.apply_updates([], sequence)
+            return
+        changes = [
+            (event["side"] == "bid", event["price"], event["remaining"])
+            for event in message["events"]
+            if event.get("type") == "change"
+        ]
+        if any(event.get("reason") == "initial" for event in message["events"]):
+            book.apply_snapshot(
+                [(price, size) for bid, price, size in changes if bid],
+                [(price, size) for bid, price, size in changes if not bid],
+                sequence,
+            )
+        else:
+            book.apply_updates(changes, sequence)
+
+
+class KrakenFeed:
+    """Kraken book channel, see https://docs.kraken.com/websockets/#message-book
+
+    Updates carry a CRC32 checksum of the best `KRAKEN_CHECKSUM_DEPTH` levels,
+    which is verified against the book once they are applied.
+    """
+
+    EXCHANGE = KRAKEN
+    MAX_DEPTH = KRAKEN_WEBSOCKET_DEPTH
+
+    def __init__(self, product):
+        self.symbol = COINROUTES_SYMBOL_TO_KRAKEN_WEBSOCKET_SYMBOL.get(product)
+        # The (price, volume) decimal places Kraken formats the levels with.
+        self.wire_decimals = None
+
+    def url(self):
+        return KRAKEN_WEBSOCKET_URL
+
+    def subscribe_message(self):
+        return {
+            "event": "subscribe",
+            "pair": [self.symbol],
+            "subscription": {"name": "book", "depth": self.MAX_DEPTH},
+        }
+
+    def handle(self, message, book):
+        # Book messages are [channel id, payload..., channel name, pair], events are dicts.
+        if not isinstance(message, list):
+            return
+        changes = []
+        checksum = None
+        for payload in message[1:-2]:
+            if "as" in payload or "bs" in payload:
+                self._read_decimals(payload.get("as", []) + payload.get("bs", []))
+                book.apply_snapshot(
+                    [level[:2] for level in payload.get("bs", [])],
+                    [level[:2] for level in payload.get("as", [])],
+                )
+                continue
+            self._read_decimals(payload.get("a", []) + payload.get("b", []))
+            changes += [(False, *level[:2]) for level in payload.get("a", [])]
+            changes += [(True, *level[:2]) for level in payload.get("b", [])]
+            checksum = payload.get("c", checksum)
+        if changes:
+            book.apply_updates(changes)
+        if checksum is not None and self.wire_decimals is not None:
+            expected = int(checksum)
+            if self.checksum(book) != expected:
+                book.ready = False
+                raise ChecksumMismatchError(
+                    f"{KRAKEN} book does not match its checksum {expected}"
+                )
+
+    def checksum(self, book):
+        """The CRC32 Kraken computes over the price and volume of its best asks
+        then best bids, formatted without decimal point nor leading zeros."""
+        price_decimals, size_decimals = self.wire_decimals
+        asks, bids = book.top_levels(KRAKEN_CHECKSUM_DEPTH)
+        text = "".join(
+            f"{rescale(price, book.price_decimals, price_decimals)}"
+            f"{rescale(size, book.size_decimals, size_decimals)}"
+            for price, size in asks + bids
+        )
+        return zlib.crc32(text.encode())
+
+    def _read_decimals(self, levels):
+        if self.wire_decimals is None and levels:
+            price, volume = levels[0][:2]
+            self.wire_decimals = (
+                len(price.partition(".")[2]),
+                len(volume.partition(".")[2]),
+            )
+
+
+def rescale(ticks, decimals, to_decimals):
+    """Convert ticks of 10**-decimals to ticks of 10**-to_decimals, dropping digits."""
+    if to_decimals >= decimals:
+        return ticks * 10 ** (to_decimals - decimals)
+    return ticks // 10 ** (decimals - to_decimals)
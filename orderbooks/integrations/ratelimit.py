@@ -0,0 +1,78 @@
+import multiprocessing
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter: `rate` tokens are added per second up to
+    `capacity`, and `acquire` blocks until enough tokens are available. A full
+    bucket lets a burst of `capacity` requests through at once.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self, tokens=1):
+        """Take `tokens` if available now, returning whether they were taken."""
+        with self._lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1):
+        """Take `tokens`, waiting for the bucket to refill if needed. Returns the
+        seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                wait = (tokens - self.tokens) / self.rate
+            self.sleep(wait)
+            waited += wait
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    Token bucket shared by processes. Its tokens live in shared memory behind a
+    process lock, so the processes it is handed to at start, e.g. as the
+    initializer arguments of a process pool, keep under one rate and capacity
+    together rather than each under its own.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self._state = multiprocessing.RawArray("d", 2)
+        super().__init__(rate, capacity, clock=clock, sleep=sleep)
+        self._lock = multiprocessing.Lock()
+
+    @property
+    def tokens(self):
+        return self._state[0]
+
+    @tokens.setter
+    def tokens(self, tokens):
+        self._state[0] = tokens
+
+    @property
+    def updated_at(self):
+        return self._state[1]
+
+    @updated_at.setter
+    def updated_at(self, updated_at):
+        self._state[1] = updated_at
@@ -0,0 +1,207 @@
+"""
+Resilience policies of the exchange clients.
+
+Each exchange has one process wide `ExchangePolicy`, shared like its session,
+holding a circuit breaker, the recent request latencies and the retry settings.
+"""
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from orderbooks.integrations.constants import (
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD, CIRCUIT_BREAKER_RESET_TIMEOUT,
+    EXCHANGE_MAX_RETRIES, HEDGE_LATENCY_SAMPLES, HEDGE_MAX_WORKERS,
+    HEDGE_MIN_SAMPLES, HEDGE_PERCENTILE, RETRY_AFTER_MAX_DELAY, RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY)
+from orderbooks.integrations.errors import CircuitOpenError
+
+
+class CircuitBreaker:
+    """
+    Fail fast on an unhealthy exchange. After `failure_threshold` consecutive
+    failures the breaker opens and rejects requests for `reset_timeout` seconds,
+    then lets requests through again: the next success closes it, the next
+    failure opens it for another `reset_timeout`.
+    """
+
+    def __init__(
+        self,
+        name,
+        failure_threshold=CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout=CIRCUIT_BREAKER_RESET_TIMEOUT,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def open(self):
+        with self._lock:
+            return (
+                self.opened_at is not None
+                and time.monotonic() - self.opened_at < self.reset_timeout
+            )
+
+    def check(self):
+        """Raise `CircuitOpenError` while the breaker rejects requests."""
+        if self.open:
+            raise CircuitOpenError(f"Circuit open for {self.name}")
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """The latencies in seconds of the most recent successful requests."""
+
+    def __init__(self, samples=HEDGE_LATENCY_SAMPLES):
+        self.latencies = deque(maxlen=samples)
+        self._lock = threading.Lock()
+
+    def record(self, latency):
+        with self._lock:
+            self.latencies.append(latency)
+
+    def percentile(self, percentile, min_samples=HEDGE_MIN_SAMPLES):
+        """The latency below which `percentile` of the samples fall, or None while
+        there are fewer than `min_samples` samples."""
+        with self._lock:
+            if len(self.latencies) < max(min_samples, 1):
+                return None
+            latencies = sorted(self.latencies)
+        return latencies[min(int(len(latencies) * percentile), len(latencies) - 1)]
+
+
+class ExchangePolicy:
+    """Circuit breaker, retry and hedging settings of the requests to one exchange."""
+
+    def __init__(
+        self,
+        name,
+        max_retries=EXCHANGE_MAX_RETRIES,
+        base_delay=RETRY_BASE_DELAY,
+        max_delay=RETRY_MAX_DELAY,
+        hedge=False,
+        breaker=None,
+        max_retry_after=RETRY_AFTER_MAX_DELAY,
+    ):
+        self.name = name
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.hedge = hedge
+        self.breaker = breaker if breaker is not None else CircuitBreaker(name)
+        self.latency = LatencyTracker()
+
+    def backoff(self, attempt):
+        """A full jitter delay before retrying after the failed `attempt` (from 0)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def retry_delay(self, attempt, error):
+        """The delay before retrying after the failed `attempt` raised `error`: the
+        backoff, or the wait the exchange asked for when longer. None when that
+        is longer than `max_retry_after` and the request should not be retried."""
+        delay = self.backoff(attempt)
+        if error.retry_after is None or error.retry_after <= delay:
+            return delay
+        if error.retry_after > self.max_retry_after:
+            return None
+        return error.retry_after
+
+    def hedge_delay(self):
+        """Seconds to wait for a request before sending a hedged duplicate, or None
+        when requests are not hedged."""
+        if not self.hedge:
+            return None
+        return self.latency.percentile(HEDGE_PERCENTILE)
+
+    def call(self, send):
+        """Call `send()`, sending a hedged duplicate once it is slower than the
+        hedge delay, and return the first successful result."""
+        delay = self.hedge_delay()
+        if delay is None:
+            return self._timed(send)
+
+        executor = _hedge_executor()
+        primary = executor.submit(self._timed, send)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        pending = {primary, executor.submit(self._timed, send)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+        return primary.result()
+
+    def _timed(self, send):
+        start = time.perf_counter()
+        result = send()
+        self.latency.record(time.perf_counter() - start)
+        return result
+
+
+_policies = {}
+_policies_lock = threading.Lock()
+_hedge_requests = False
+_executor = None
+
+
+def _hedge_executor():
+    global _executor
+    with _policies_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="hedge"
+            )
+        return _executor
+
+
+def get_policy(exchange: str) -> ExchangePolicy:
+    """Return the process wide policy of an exchange, creating it on first use so
+    its breaker and latencies are shared by every client of the exchange."""
+    with _policies_lock:
+        policy = _policies.get(exchange)
+        if policy is None:
+            policy = ExchangePolicy(exchange, hedge=_hedge_requests)
+            _policies[exchange] = policy
+        return policy
+
+
+def set_policy(exchange: str, policy: ExchangePolicy):
+    """Replace the shared policy of an exchange e.g. to inject one in tests."""
+    with _policies_lock:
+        _policies[exchange] = policy
+
+
+def enable_hedging(enabled=True):
+    """Turn hedged requests on or off for every exchange."""
+    global _hedge_requests
+    with _policies_lock:
+        _hedge_requests = enabled
+        for policy in _policies.values():
+            policy.hedge = enabled
+
+
+def reset_policies():
+    """Forget every shared policy, with its breaker state and latencies."""
+    global _hedge_requests
+    with _policies_lock:
+        _policies.clear()
+        _hedge_requests = False
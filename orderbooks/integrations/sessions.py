@@ -0,0 +1,46 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from orderbooks.integrations.constants import (DEFAULT_POOL_SIZE,
+                                               EXCHANGE_POOL_SIZES)
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def create_session(pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    """Create a keep-alive session whose connection pool holds `pool_size` connections."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(exchange: str) -> requests.Session:
+    """Return the process wide session shared by every client of an exchange,
+    creating it on first use so repeated fetches reuse warm connections."""
+    with _sessions_lock:
+        session = _sessions.get(exchange)
+        if session is None:
+            session = create_session(
+                EXCHANGE_POOL_SIZES.get(exchange, DEFAULT_POOL_SIZE)
+            )
+            _sessions[exchange] = session
+        return session
+
+
+def set_session(exchange: str, session: requests.Session):
+    """Replace the shared session of an exchange e.g. to inject one in tests."""
+    with _sessions_lock:
+        _sessions[exchange] = session
+
+
+def close_sessions():
+    """Close and forget every shared session."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
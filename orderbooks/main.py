@@ -3,21 +3,154 @@ from decimal import Decimal
 
 import click
 
-from orderbooks.integrations.constants import COINROUTES_GET_PRICE_CHOICES
-from orderbooks.utils import get_buy_and_sell_price
+from orderbooks.batch import parse_batch, quote_batch
+from orderbooks.cache import SnapshotCache
+from orderbooks.integrations.constants import (COINROUTES_GET_PRICE_CHOICES,
+                                               DEFAULT_MAX_WORKERS,
+                                               SNAPSHOT_CACHE_DIR)
+from orderbooks.integrations.resilience import enable_hedging
+from orderbooks.params import LimitPrice, QuantityList
+from orderbooks.recording import start_recording, stop_recording
+from orderbooks.server import QuoteClient
+from orderbooks.sharding import quote_sharded
+from orderbooks.utils import (DepthIndex, FetchStats, display_amount,
+                              get_buy_and_sell_price, get_buy_and_sell_prices,
+                              get_max_fillable_quantities, render_fill_json,
+                              render_fill_text, render_fills)
+
+
+def reject_options(mode, *options):
+    """Fail on the first of the (option, used) pairs used, which `mode` ignores."""
+    for option, used in options:
+        if used:
+            raise click.BadParameter(
+                f"{option} is not supported with {mode}", param_hint=mode
+            )
+
+
+def echo_prices(
+    quantity, product, buy_price, remaining_buy_amount, sell_price, remaining_sell_amount
+):
+    if remaining_buy_amount:
+        click.echo(
+            f"Buy order of {quantity} {product} partially filled."
+            f" Remaining: {display_amount(remaining_buy_amount)} {product}."
+            f" Price of {display_amount(Decimal(quantity) - remaining_buy_amount)} {product}"
+            f" is {buy_price}."
+        )
+    else:
+        click.echo(f"Buy price for {quantity} {product} is {buy_price}.")
+
+    if remaining_sell_amount:
+        click.echo(
+            f"Sell order of {quantity} {product} partially filled."
+            f" Remaining: {display_amount(remaining_sell_amount)} {product}."
+            f" Price of {display_amount(Decimal(quantity) - remaining_sell_amount)} {product}"
+            f" is {sell_price}."
+        )
+    else:
+        click.echo(f"Sell price for {quantity} {product} is {sell_price}.")
+
+
+def echo_fill_reports(fill_report, quantity, product, buy_report, sell_report):
+    for side, report in (("buy", buy_report), ("sell", sell_report)):
+        if fill_report == "json":
+            click.echo(
+                render_fill_json(report, side=side, product=product, quantity=quantity)
+            )
+        else:
+            click.echo(f"{side.capitalize()} fills: {render_fill_text(report)}")
+
+
+def echo_recorded():
+    recorder = stop_recording()
+    click.echo(f"Recorded {recorder.recorded} order book snapshots to {recorder.path}.")
 
 
 @click.command()
 @click.option("--add-kraken-exchange", is_flag=True)
-@click.option("--quantity", required=False, type=float, default=16)
+@click.option("--quantity", required=False, type=QuantityList(), default="16")
 @click.option("--product", required=False, type=str, default="BTCUSD")
-def get_prices(add_kraken_exchange, quantity, product):
+@click.option(
+    "--max-workers", required=False, type=click.IntRange(min=1), default=DEFAULT_MAX_WORKERS
+)
+@click.option("--adaptive-depth", is_flag=True)
+@click.option("--fixed-point", is_flag=True)
+@click.option("--vectorized", is_flag=True)
+@click.option("--fill-report", required=False, type=click.Choice(["text", "json"]))
+@click.option("--buy-limit-price", required=False, type=LimitPrice())
+@click.option("--sell-limit-price", required=False, type=LimitPrice())
+@click.option("--max-slippage-bps", required=False, type=click.FloatRange(min=0))
+@click.option("--server", required=False, type=str)
+@click.option("--cache-max-age", required=False, type=click.FloatRange(min=0))
+@click.option("--cache-dir", required=False, type=str, default=SNAPSHOT_CACHE_DIR)
+@click.option("--no-disk-cache", is_flag=True)
+@click.option("--deadline-ms", required=False, type=click.IntRange(min=1))
+@click.option("--hedge-requests", is_flag=True)
+@click.option("--batch", required=False, type=click.File("r"))
+@click.option("--processes", required=False, type=click.IntRange(min=1))
+@click.option("--record", required=False, type=click.Path(dir_okay=False))
+def get_prices(
+    add_kraken_exchange,
+    quantity,
+    product,
+    max_workers,
+    adaptive_depth,
+    fixed_point,
+    vectorized,
+    fill_report,
+    buy_limit_price,
+    sell_limit_price,
+    max_slippage_bps,
+    server,
+    cache_max_age,
+    cache_dir,
+    no_disk_cache,
+    deadline_ms,
+    hedge_requests,
+    batch,
+    processes,
+    record,
+):
     """Program that fetches the order books from CoinBase Pro, Gemini and Kraken(optional)
     and prints out the price to buy and sell a specified quantity of a product.
 
     :param add_kraken_exchange: Fetch order books from the Kraken Exchange as well.
-    :param quantity: The amount of the product for which to get the buy and sell prices.
+    :param quantity: The amount of the product for which to get the buy and sell prices,
+    or a comma separated ladder of amounts priced from a single fetch.
     :param product: The product that you want to buy/sell on the stock exchanges e.g. BTCUSD.
+    :param max_workers: The number of exchange order books to fetch concurrently.
+    :param adaptive_depth: Fetch shallow order books first, only requesting deeper
+    books while they cannot fill the quantity.
+    :param fixed_point: Price the orders with the exact integer fixed-point engine.
+    :param vectorized: Price the quantities with the NumPy engine, all at once per
+    side. The results are exact, the same as those of the other engines.
+    :param fill_report: Print the amount filled per exchange, last price, VWAP and
+    levels consumed of the buy and sell orders, as text or JSON lines.
+    :param buy_limit_price: Instead of pricing the quantity, print the largest amount
+    that can be bought at an average price up to this price.
+    :param sell_limit_price: Instead of pricing the quantity, print the largest amount
+    that can be sold at an average price down to this price.
+    :param max_slippage_bps: Instead of pricing the quantity, print the largest amounts
+    that can be bought and sold at an average price within this many basis points
+    of the best price.
+    :param server: URL of a running quote server (`python -m orderbooks.server`) to
+    get the prices from instead of fetching the order books.
+    :param cache_max_age: Reuse order book snapshots fetched at most this many
+    seconds ago instead of fetching them again.
+    :param cache_dir: Directory of the on-disk snapshot cache shared by invocations.
+    :param no_disk_cache: Only cache snapshots in memory for this invocation.
+    :param deadline_ms: Quote from the exchanges whose order books were fetched
+    within this many milliseconds, leaving out the slower ones.
+    :param hedge_requests: Send a duplicate of an exchange request slower than the
+    95th percentile of the recent requests to that exchange. Only with `batch`,
+    as a single quote makes too few requests to know the percentile.
+    :param batch: File of `PRODUCT QUANTITY[,QUANTITY...]` lines, or - for stdin,
+    to quote instead of `product` and `quantity`. Results are printed per
+    product as soon as its order books are fetched.
+    :param processes: Quote the `batch` products on this many worker processes.
+    :param record: Append every order book fetched, with its fetch time, latency
+    and exchange sequence number and time, to the gzip snapshot store at this path.
     """
 
     if product not in COINROUTES_GET_PRICE_CHOICES:
@@ -26,30 +159,191 @@ def get_prices(add_kraken_exchange, quantity, product):
         )
         sys.exit()
 
-    (
-        buy_price,
-        remaining_buy_amount,
-        sell_price,
-        remaining_sell_amount,
-    ) = get_buy_and_sell_price(
-        quantity=quantity, product=product, kraken_exchange=add_kraken_exchange
-    )
-
-    if remaining_buy_amount:
-        click.echo(
-            f"Buy order of {quantity} {product} partially filled. Remaining: {remaining_buy_amount} {product}."
-            f" Price of {Decimal(quantity) - remaining_buy_amount} {product} is {buy_price}."
+    if fill_report is not None and (
+        batch is not None
+        or server is not None
+        or len(quantity) > 1
+        or vectorized
+        or buy_limit_price is not None
+        or sell_limit_price is not None
+        or max_slippage_bps is not None
+    ):
+        raise click.BadParameter(
+            "fill reports are only available when pricing a single --quantity",
+            param_hint="--fill-report",
+        )
+    if batch is not None:
+        reject_options(
+            "--batch",
+            ("--adaptive-depth", adaptive_depth),
+            ("--deadline-ms", deadline_ms is not None),
+            ("--fixed-point", fixed_point),
+            ("--vectorized", vectorized),
+            ("--buy-limit-price", buy_limit_price is not None),
+            ("--sell-limit-price", sell_limit_price is not None),
+            ("--max-slippage-bps", max_slippage_bps is not None),
+            ("--server", server is not None),
+        )
+    elif server is not None:
+        # The server decides the exchanges, depth and engine of its quotes.
+        reject_options(
+            "--server",
+            ("--add-kraken-exchange", add_kraken_exchange),
+            ("--max-workers", max_workers != DEFAULT_MAX_WORKERS),
+            ("--adaptive-depth", adaptive_depth),
+            ("--fixed-point", fixed_point),
+            ("--vectorized", vectorized),
+            ("--buy-limit-price", buy_limit_price is not None),
+            ("--sell-limit-price", sell_limit_price is not None),
+            ("--max-slippage-bps", max_slippage_bps is not None),
+            ("--cache-max-age", cache_max_age is not None),
+            ("--deadline-ms", deadline_ms is not None),
+            ("--processes", processes is not None),
+            ("--record", record is not None),
+        )
+    if processes is not None and cache_max_age is not None:
+        raise click.BadParameter(
+            "the snapshot cache is not supported with --processes",
+            param_hint="--cache-max-age",
+        )
+    if hedge_requests and batch is None:
+        raise click.BadParameter(
+            "hedged requests are only available with --batch",
+            param_hint="--hedge-requests",
+        )
+    if record is not None:
+        if processes is not None:
+            raise click.BadParameter(
+                "recording is not supported with --processes", param_hint="--record"
+            )
+        start_recording(record)
+        click.get_current_context().call_on_close(echo_recorded)
+    if hedge_requests:
+        enable_hedging()
+    stats = FetchStats()
+    cache = None
+    if cache_max_age is not None:
+        cache = SnapshotCache(
+            cache_max_age, directory=None if no_disk_cache else cache_dir
         )
+    deadline = None if deadline_ms is None else deadline_ms / 1000
+    if batch is not None:
+        try:
+            requests = parse_batch(batch)
+        except ValueError as err:
+            raise click.BadParameter(str(err), param_hint="--batch")
+        if processes is None:
+            results = quote_batch(
+                requests, kraken=add_kraken_exchange, stats=stats, cache=cache
+            )
+        else:
+            results = quote_sharded(
+                requests,
+                processes=processes,
+                kraken=add_kraken_exchange,
+                stats=stats,
+                hedge=hedge_requests,
+            )
+        for batch_product, quantities, prices, missing in results:
+            for exchange, reason in sorted(missing.items()):
+                click.echo(
+                    f"Quoted {batch_product} without the {exchange} order book: {reason}."
+                )
+            if prices is None:
+                click.echo(f"No order book fetched for {batch_product}.")
+                continue
+            for batch_quantity, batch_prices in zip(quantities, prices):
+                echo_prices(batch_quantity, batch_product, *batch_prices)
+    elif (
+        buy_limit_price is not None
+        or sell_limit_price is not None
+        or max_slippage_bps is not None
+    ):
+        buy, sell = get_max_fillable_quantities(
+            product=product,
+            kraken_exchange=add_kraken_exchange,
+            buy_limit_price=buy_limit_price,
+            sell_limit_price=sell_limit_price,
+            max_slippage_bps=max_slippage_bps,
+            max_workers=max_workers,
+            stats=stats,
+            cache=cache,
+            deadline=deadline,
+        )
+        if buy is not None:
+            click.echo(
+                f"Can buy {display_amount(buy[0])} {product} within the price limits"
+                f" for {buy[1]}. Per exchange: {render_fills(buy[2])}."
+            )
+        if sell is not None:
+            click.echo(
+                f"Can sell {display_amount(sell[0])} {product} within the price limits"
+                f" for {sell[1]}. Per exchange: {render_fills(sell[2])}."
+            )
+    elif server is not None:
+        prices = QuoteClient(server).get_buy_and_sell_prices(quantity, product)
+        for ladder_quantity, ladder_prices in zip(quantity, prices):
+            echo_prices(ladder_quantity, product, *ladder_prices)
+    elif len(quantity) > 1 or vectorized:
+        index = DepthIndex
+        if vectorized:
+            # Imported on demand, importing NumPy would slow down every other run.
+            from orderbooks.vectorized import quote_index as index
+        prices = get_buy_and_sell_prices(
+            quantities=quantity,
+            product=product,
+            kraken_exchange=add_kraken_exchange,
+            max_workers=max_workers,
+            adaptive_depth=adaptive_depth,
+            stats=stats,
+            cache=cache,
+            deadline=deadline,
+            index=index,
+        )
+        for ladder_quantity, ladder_prices in zip(quantity, prices):
+            echo_prices(ladder_quantity, product, *ladder_prices)
     else:
-        click.echo(f"Buy price for {quantity} {product} is {buy_price}.")
+        quantity = quantity[0]
+        buy_report, sell_report = get_buy_and_sell_price(
+            quantity=quantity,
+            product=product,
+            kraken_exchange=add_kraken_exchange,
+            max_workers=max_workers,
+            adaptive_depth=adaptive_depth,
+            stats=stats,
+            cache=cache,
+            deadline=deadline,
+            fixed_point=fixed_point,
+        )
+        echo_prices(quantity, product, *buy_report, *sell_report)
+        if fill_report is not None:
+            echo_fill_reports(fill_report, quantity, product, buy_report, sell_report)
 
-    if remaining_sell_amount:
+    if adaptive_depth:
         click.echo(
-            f"Sell order of {quantity} {product} partially filled. Remaining: {remaining_sell_amount} {product}."
-            f" Price of {Decimal(quantity) - remaining_sell_amount} {product} is {sell_price}."
+            f"Fetched {stats.bytes_transferred} bytes with {stats.escalations} depth escalations."
+        )
+    for exchange, reason in sorted(stats.missing_exchanges.items()):
+        click.echo(f"Quoted without the {exchange} order book: {reason}.")
+    for exchange, age in sorted(stats.cache_ages.items()):
+        click.echo(f"Used the cached {exchange} order book, {age:.1f} seconds old.")
+    for exchange, (records, kept) in sorted(stats.truncated_records.items()):
+        if records > kept:
+            click.echo(
+                f"Pruned {records - kept} of {records} {exchange} order book records"
+                " beyond the reach of the quantity."
+            )
+    for exchange, (records, levels) in sorted(stats.aggregated_levels.items()):
+        if records > levels:
+            click.echo(
+                f"Aggregated {records} {exchange} order book records into {levels} price levels."
+            )
+    if stats.quotes:
+        click.echo(
+            f"Prepared the merged order book in {stats.prepare_seconds * 1000:.2f} ms,"
+            f" then priced {stats.quotes} orders in {stats.quote_seconds * 1000:.2f} ms"
+            f" ({stats.quote_seconds / stats.quotes * 1e6:.1f} us per order)."
         )
-    else:
-        click.echo(f"Sell price for {quantity} {product} is {sell_price}.")
 
 
 if __name__ == "__main__":
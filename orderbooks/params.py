@@ -0,0 +1,42 @@
+"""
+Click parameter types shared by the command line programs.
+"""
+import math
+from decimal import Decimal, InvalidOperation
+
+import click
+
+
+class QuantityList(click.ParamType):
+    """A comma separated list of positive quantities e.g. 1,5,10."""
+
+    name = "quantities"
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, list):
+            return value
+        try:
+            quantities = [float(quantity) for quantity in str(value).split(",")]
+        except ValueError:
+            self.fail(f"{value!r} is not a comma separated list of quantities", param, ctx)
+        for quantity in quantities:
+            if not math.isfinite(quantity) or quantity <= 0:
+                self.fail(f"{value!r} holds a quantity that is not positive", param, ctx)
+        return quantities
+
+
+class LimitPrice(click.ParamType):
+    """A positive decimal price e.g. 40000.50, converted to a Decimal."""
+
+    name = "price"
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, Decimal):
+            return value
+        try:
+            price = Decimal(str(value))
+        except InvalidOperation:
+            self.fail(f"{value!r} is not a decimal price", param, ctx)
+        if not price.is_finite() or price <= 0:
+            self.fail(f"{value!r} is not a positive price", param, ctx)
+        return price
@@ -0,0 +1,126 @@
+"""
+Recording of the raw order books returned by the exchanges.
+
+While recording, every fetched book is queued with its fetch time and latency,
+and a background thread appends it as one JSON line to a gzip store together
+with the exchange's own sequence number and time. The fetching threads only
+pay for putting a tuple on a queue. Each batch of snapshots is written as a
+separate gzip member, so an interrupted recording keeps every complete batch.
+"""
+import gzip
+import json
+import queue
+import threading
+
+from orderbooks.integrations.adapters import get_adapter
+from orderbooks.integrations.constants import (RECORDING_BATCH_SIZE,
+                                               RECORDING_FLUSH_INTERVAL)
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+class SnapshotRecorder:
+    """Append raw order book snapshots to the gzip store at `path` from a
+    background thread. `record` never blocks on the disk."""
+
+    def __init__(
+        self,
+        path,
+        batch_size=RECORDING_BATCH_SIZE,
+        flush_interval=RECORDING_FLUSH_INTERVAL,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.recorded = 0
+        self._queue = queue.SimpleQueue()
+        self._stopped = object()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def record(self, exchange, product, params, payload, fetched_at, latency):
+        self._queue.put((exchange, product, params, payload, fetched_at, latency))
+
+    def stop(self):
+        """Write every queued snapshot and stop the background thread."""
+        self._queue.put(self._stopped)
+        self._thread.join()
+
+    def run(self):
+        stopped = False
+        while not stopped:
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+                while item is not self._stopped:
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    item = self._queue.get_nowait()
+                else:
+                    stopped = True
+            except queue.Empty:
+                pass
+            if batch:
+                self.write(batch)
+
+    def write(self, batch):
+        lines = [json.dumps(snapshot_record(*item)) for item in batch]
+        with gzip.open(self.path, "at", encoding="utf-8") as store:
+            store.write("\n".join(lines) + "\n")
+        self.recorded += len(batch)
+
+
+def snapshot_record(exchange, product, params, payload, fetched_at, latency):
+    sequence, exchange_time = get_adapter(exchange).snapshot_fields(payload)
+    return {
+        "exchange": exchange,
+        "product": product,
+        "params": params,
+        "fetched_at": fetched_at,
+        "latency": latency,
+        "sequence": sequence,
+        "exchange_time": exchange_time,
+        "payload": payload,
+    }
+
+
+def read_snapshots(path, exchange=None, product=None):
+    """Iterate the records of a snapshot store in recording order, optionally only
+    those of one exchange and/or product."""
+    with gzip.open(path, "rt", encoding="utf-8") as store:
+        for line in store:
+            record = json.loads(line)
+            if exchange is not None and record["exchange"] != exchange:
+                continue
+            if product is not None and record["product"] != product:
+                continue
+            yield record
+
+
+def get_recorder():
+    return _recorder
+
+
+def start_recording(path, **kwargs):
+    """Record every order book fetched from now on to the store at `path`."""
+    global _recorder
+    with _recorder_lock:
+        if _recorder is not None:
+            _recorder.stop()
+        _recorder = SnapshotRecorder(path, **kwargs).start()
+        return _recorder
+
+
+def stop_recording():
+    """Stop recording, once every queued snapshot is written. Returns the recorder."""
+    global _recorder
+    with _recorder_lock:
+        recorder, _recorder = _recorder, None
+    if recorder is not None:
+        recorder.stop()
+    return recorder
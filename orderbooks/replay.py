@@ -0,0 +1,366 @@
+"""
+Columnar snapshot files and fast replay of historical order books.
+
+A snapshot file holds the combined order books of one product over time. The
+levels of each snapshot are stored as three columns, the price ticks and size
+ticks as int64 and the exchange ids as uint8, bids from the best price down
+followed by offers from the best price up. An index of the time, offset and
+bid and offer counts of every snapshot is written after the last one, followed
+by the JSON metadata of the file and a footer locating both, so files are
+written in one streaming pass and any snapshot is found without reading the
+others.
+
+Replaying memory-maps the file and prices market orders directly on views of
+the columns, with no parsing and no copy of the levels:
+
+    with SnapshotFile("btcusd.obs") as snapshots:
+        for timestamp, bids, offers in snapshots:
+            ...
+
+Layout, little endian, every column padded to 8 bytes:
+
+    magic
+    per snapshot: prices int64[n], sizes int64[n], exchange ids uint8[n]
+    index: times float64[count], offsets uint64[count],
+           bid counts uint32[count], offer counts uint32[count]
+    JSON metadata {product, price_decimals, size_decimals, exchanges}
+    footer: index offset (uint64), snapshot count (uint64),
+            metadata length (uint64), magic
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import click
+
+from orderbooks.books import (EXCHANGES, MergedSide, OrderBookSide, exchange_id,
+                              product_decimals)
+from orderbooks.integrations.adapters import get_adapter, registered_exchanges
+from orderbooks.params import QuantityList
+from orderbooks.recording import read_snapshots
+from orderbooks.utils import market_order_cost, transform_exchange_data
+
+if sys.byteorder != "little":  # pragma: no cover
+    raise ImportError("Columnar snapshot files are only supported on little endian hosts")
+
+MAGIC = b"OBSNAP1\x00"
+FOOTER = struct.Struct("<QQQ8s")
+
+
+def _padding(length):
+    return b"\x00" * (-length % 8)
+
+
+def _padded(length):
+    return length + (-length % 8)
+
+
+class SnapshotWriter:
+    """Write the combined order books of a product to a columnar snapshot file.
+
+    Levels are streamed to disk snapshot by snapshot, only the index is kept in
+    memory until `close` writes it. Snapshots must be written in time order.
+    """
+
+    def __init__(self, path, product):
+        self.path = path
+        self.product = product
+        self.price_decimals, self.size_decimals = product_decimals(product)
+        self.times = array("d")
+        self.offsets = array("Q")
+        self.bid_counts = array("I")
+        self.offer_counts = array("I")
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.times)
+
+    def write(self, timestamp, bids, offers):
+        """Append a snapshot from the (exchange id, price ticks, size ticks) levels
+        of its bids and offers, each in price order, e.g. `MergedSide.iter_ticks()`."""
+        if self.times and timestamp < self.times[-1]:
+            raise ValueError(
+                f"Snapshot at {timestamp} written after one at {self.times[-1]}"
+            )
+        levels = list(bids)
+        bid_count = len(levels)
+        levels.extend(offers)
+        exchange_ids, prices, sizes = zip(*levels) if levels else ((), (), ())
+
+        self.times.append(timestamp)
+        self.offsets.append(self._file.tell())
+        self.bid_counts.append(bid_count)
+        self.offer_counts.append(len(levels) - bid_count)
+        self._file.write(array("q", prices))
+        self._file.write(array("q", sizes))
+        self._file.write(array("B", exchange_ids))
+        self._file.write(_padding(len(levels)))
+
+    def close(self):
+        if self._file.closed:
+            return
+        index_offset = self._file.tell()
+        for column in (self.times, self.offsets, self.bid_counts, self.offer_counts):
+            self._file.write(column)
+            self._file.write(_padding(len(column) * column.itemsize))
+        # Written last as exchanges may have been assigned ids while writing.
+        metadata = json.dumps(
+            {
+                "product": self.product,
+                "price_decimals": self.price_decimals,
+                "size_decimals": self.size_decimals,
+                "exchanges": EXCHANGES,
+            }
+        ).encode()
+        self._file.write(metadata)
+        self._file.write(
+            FOOTER.pack(index_offset, len(self.times), len(metadata), MAGIC)
+        )
+        self._file.close()
+
+
+class SnapshotFile:
+    """
+    A memory-mapped columnar snapshot file. Iterating yields the (timestamp,
+    bids, offers) of every snapshot, the sides being `OrderBookSide`s whose
+    columns are views of the file. They are only valid while the file is open,
+    and must be released before closing it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size < len(MAGIC) + FOOTER.size:
+                raise ValueError(f"{path} is not a columnar snapshot file")
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open()
+        except Exception:
+            self.close()
+            raise
+
+    def _open(self):
+        length = len(self._mmap)
+        if self._mmap[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not a columnar snapshot file")
+        index_offset, count, metadata_length, magic = FOOTER.unpack_from(
+            self._mmap, length - FOOTER.size
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is truncated, its index was never written")
+
+        metadata = json.loads(
+            self._mmap[length - FOOTER.size - metadata_length : length - FOOTER.size]
+        )
+        self.product = metadata["product"]
+        self.price_decimals = metadata["price_decimals"]
+        self.size_decimals = metadata["size_decimals"]
+
+        self._view = memoryview(self._mmap)
+        columns = []
+        offset = index_offset
+        for format, itemsize in (("d", 8), ("Q", 8), ("I", 4), ("I", 4)):
+            columns.append(self._view[offset : offset + count * itemsize].cast(format))
+            offset += _padded(count * itemsize)
+        self.times, self.offsets, self.bid_counts, self.offer_counts = columns
+
+        # Exchange ids are stored as assigned by the writing process, translate
+        # them in the rare case this process numbers the exchanges differently.
+        ids = bytes(exchange_id(exchange) for exchange in metadata["exchanges"])
+        self._translation = None
+        if ids != bytes(range(len(ids))):
+            self._translation = ids.ljust(256, b"\x00")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.times)
+
+    def __getitem__(self, index):
+        """The (timestamp, bids, offers) of the snapshot at `index`."""
+        offset = self.offsets[index]
+        bid_count = self.bid_counts[index]
+        levels = bid_count + self.offer_counts[index]
+        prices = self._view[offset : offset + 8 * levels].cast("q")
+        sizes = self._view[offset + 8 * levels : offset + 16 * levels].cast("q")
+        exchange_ids = self._view[offset + 16 * levels : offset + 17 * levels]
+        if self._translation is not None:
+            exchange_ids = exchange_ids.tobytes().translate(self._translation)
+        return (
+            self.times[index],
+            OrderBookSide(
+                prices[:bid_count],
+                sizes[:bid_count],
+                exchange_ids[:bid_count],
+                self.price_decimals,
+                self.size_decimals,
+            ),
+            OrderBookSide(
+                prices[bid_count:],
+                sizes[bid_count:],
+                exchange_ids[bid_count:],
+                self.price_decimals,
+                self.size_decimals,
+            ),
+        )
+
+    def __iter__(self):
+        return self.between()
+
+    def between(self, start=None, end=None):
+        """Iterate the snapshots taken from `start` (inclusive) until `end`
+        (exclusive), both in seconds since the epoch."""
+        first = 0 if start is None else bisect_left(self.times, start)
+        last = len(self) if end is None else bisect_left(self.times, end)
+        for index in range(first, last):
+            yield self[index]
+
+    def close(self):
+        for column in ("times", "offsets", "bid_counts", "offer_counts", "_view"):
+            view = self.__dict__.pop(column, None)
+            if view is not None:
+                view.release()
+        self._mmap.close()
+
+
+def convert_recording(recording, path, product):
+    """Convert the snapshots of `product` in a recording made with `--record` to
+    a columnar snapshot file, returning the number of snapshots written.
+
+    Each recorded exchange book gives one snapshot combining it with the latest
+    book of every other exchange, in exchange registration order. A snapshot is
+    timestamped when the last of its books was received.
+    """
+    price_decimals, size_decimals = product_decimals(product)
+    books = {}
+    timestamp = 0.0
+    with SnapshotWriter(path, product) as writer:
+        for record in read_snapshots(recording, product=product):
+            adapter = get_adapter(record["exchange"])
+            order_book = adapter.order_book(record["payload"], adapter.symbol(product))
+            books[adapter.EXCHANGE] = transform_exchange_data(
+                order_book,
+                adapter.EXCHANGE,
+                adapter.DICT_DATATYPE,
+                price_decimals=price_decimals,
+                size_decimals=size_decimals,
+                aggregate=adapter.AGGREGATE_LEVELS,
+            )
+            timestamp = max(timestamp, record["fetched_at"] + record["latency"])
+            exchange_books = [
+                books[exchange] for exchange in registered_exchanges() if exchange in books
+            ]
+            writer.write(
+                timestamp,
+                MergedSide((bids for bids, _ in exchange_books), bid=True).iter_ticks(),
+                MergedSide((offers for _, offers in exchange_books)).iter_ticks(),
+            )
+        return len(writer)
+
+
+def replay(snapshots, quantities):
+    """Yield the timestamp of every (timestamp, bids, offers) snapshot with the
+    buy cost, remaining buy amount, sell cost and remaining sell amount of each
+    quantity, the same as `utils.get_buy_and_sell_prices` on that book."""
+    for timestamp, bids, offers in snapshots:
+        yield timestamp, [
+            (
+                *market_order_cost(quantity, offers),
+                *market_order_cost(quantity, bids),
+            )
+            for quantity in quantities
+        ]
+
+
+def replay_file(path, quantities, start=None, end=None):
+    """Replay the snapshots of a file between `start` and `end` into a list."""
+    with SnapshotFile(path) as snapshots:
+        return list(replay(snapshots.between(start, end), quantities))
+
+
+def replay_files(paths, quantities, processes=None, start=None, end=None):
+    """Replay snapshot files in parallel on a pool of worker processes, one file
+    per task. Yields (path, results) in the order of `paths`, the results being
+    those of `replay`."""
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        yield from zip(
+            paths,
+            executor.map(
+                replay_file, paths, repeat(quantities), repeat(start), repeat(end)
+            ),
+        )
+
+
+@click.group()
+def cli():
+    """Convert recorded order books to columnar snapshot files and replay them."""
+
+
+@cli.command()
+@click.argument("recording", type=click.Path(exists=True, dir_okay=False))
+@click.argument("path", type=click.Path(dir_okay=False))
+@click.option("--product", required=False, type=str, default="BTCUSD")
+def convert(recording, path, product):
+    """Convert the order books of a product recorded with `--record` to a columnar
+    snapshot file.
+
+    :param recording: The recording made with `orderbooks.main --record`.
+    :param path: The snapshot file to write.
+    :param product: The product whose order books to convert.
+    """
+    count = convert_recording(recording, path, product)
+    click.echo(f"Wrote {count} {product} snapshots to {path}.")
+
+
+@cli.command()
+@click.argument("paths", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option("--quantity", required=False, type=QuantityList(), default="16")
+@click.option("--processes", required=False, type=click.IntRange(min=1))
+@click.option("--start", required=False, type=float)
+@click.option("--end", required=False, type=float)
+def run(paths, quantity, processes, start, end):
+    """Print the buy and sell prices of every quantity on every snapshot of the
+    files as CSV lines of timestamp, quantity, buy cost, remaining buy amount,
+    sell cost and remaining sell amount.
+
+    :param paths: The snapshot files to replay, in parallel.
+    :param quantity: The comma separated amounts to price on every snapshot.
+    :param processes: The number of worker processes (default is one per CPU).
+    :param start: Only replay snapshots taken at or after this epoch time.
+    :param end: Only replay snapshots taken before this epoch time.
+    """
+    quotes = 0
+    started = time.perf_counter()
+    for _, results in replay_files(paths, quantity, processes, start, end):
+        for timestamp, prices in results:
+            for amount, quote in zip(quantity, prices):
+                click.echo(",".join(str(value) for value in (timestamp, amount, *quote)))
+            quotes += len(prices)
+    seconds = time.perf_counter() - started
+    click.echo(
+        f"Replayed {quotes} snapshot quotes in {seconds:.2f} s"
+        f" ({quotes / seconds:.0f} per second).",
+        err=True,
+    )
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,336 @@
+"""
+Long-running quote server keeping order books warm in memory.
+
+Books are refreshed in the background, over REST or from the streaming feeds,
+and prepared into a `DepthIndex` per side so each buy/sell quote is a binary
+search. REST snapshots can be reused from a `SnapshotCache`, its memory tier
+sparing the server the disk reads of the snapshots shared with other processes. Quotes are served over a local HTTP API, which `QuoteClient` queries:
+
+    GET /quote?product=BTCUSD&quantity=1,5,10
+"""
+import json
+import threading
+import time
+from decimal import Decimal
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import click
+import requests
+
+from orderbooks.cache import SnapshotCache
+from orderbooks.integrations.constants import (COINROUTES_GET_PRICE_CHOICES,
+                                               QUOTE_SERVER_HOST,
+                                               QUOTE_SERVER_PORT,
+                                               QUOTE_SERVER_REFRESH_INTERVAL,
+                                               REQUEST_TIMEOUT,
+                                               SNAPSHOT_CACHE_DIR)
+from orderbooks.integrations.resilience import enable_hedging
+from orderbooks.streaming import StreamingOrderBooks
+from orderbooks.utils import DepthIndex, FetchStats, get_exchange_data
+
+
+class PreparedBook:
+    """The depth indexes of both sides of a product's merged order book, whose
+    oldest snapshot is `age` seconds old."""
+
+    __slots__ = ("offer_index", "bid_index", "fetched_at")
+
+    def __init__(self, bid_order_book, offer_order_book, age=0.0):
+        self.offer_index = DepthIndex(offer_order_book)
+        self.bid_index = DepthIndex(bid_order_book)
+        self.fetched_at = time.monotonic() - age
+
+    def quote(self, quantity):
+        return (*self.offer_index.quote(quantity), *self.bid_index.quote(quantity))
+
+
+class BookUnavailableError(Exception):
+    pass
+
+
+class QuoteService:
+    """
+    Keep the prepared books of every quoted product warm, refreshing them every
+    `refresh_interval` seconds on a background thread. A product is loaded on
+    its first quote and refreshed from then on, one load at a time per product.
+
+    Streamed books are only prepared once every exchange stream holds a current
+    snapshot. Otherwise loading raises a `BookUnavailableError` and the
+    product's prepared book is dropped, so quotes fail rather than being priced
+    from empty, stale or partial books.
+
+    REST books reuse the snapshots of `cache` when given, a book's age being
+    that of its oldest snapshot.
+    """
+
+    def __init__(
+        self,
+        kraken=False,
+        refresh_interval=QUOTE_SERVER_REFRESH_INTERVAL,
+        stream=False,
+        fetch=get_exchange_data,
+        connect=None,
+        cache=None,
+    ):
+        self.kraken = kraken
+        self.refresh_interval = refresh_interval
+        self.stream = stream
+        self.fetch = fetch
+        self.connect = connect
+        self.cache = cache
+        self.books = {}
+        self.streams = {}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def load(self, product, timeout=REQUEST_TIMEOUT[1]):
+        """Fetch and prepare the book of a product, waiting up to `timeout`
+        seconds for the snapshots of its streams when streaming."""
+        if self.stream:
+            with self._lock:
+                if product not in self.streams:
+                    self.streams[product] = StreamingOrderBooks(
+                        product, kraken=self.kraken, connect=self.connect
+                    ).start()
+            order_books = self.streams[product]
+            if not order_books.wait_until_ready(timeout=timeout):
+                self.books.pop(product, None)
+                reasons = "; ".join(
+                    f"{exchange}: {reason}"
+                    for exchange, reason in sorted(order_books.not_ready().items())
+                )
+                raise BookUnavailableError(
+                    f"The {product} order book streams are not ready, {reasons}"
+                )
+            bid_order_book, offer_order_book = order_books.get_exchange_data()
+            age = 0.0
+        else:
+            stats = FetchStats()
+            bid_order_book, offer_order_book = self.fetch(
+                product=product, kraken=self.kraken, stats=stats, cache=self.cache
+            )
+            age = max(stats.cache_ages.values(), default=0.0)
+        book = PreparedBook(bid_order_book, offer_order_book, age=age)
+        self.books[product] = book
+        return book
+
+    def quote(self, product, quantity):
+        """Return the buy cost, remaining buy amount, sell cost and remaining sell
+        amount of a quantity, together with the age of the book in seconds."""
+        book = self.books.get(product)
+        if book is None:
+            with self._load_lock(product):
+                # A concurrent first quote may have loaded it meanwhile.
+                book = self.books.get(product)
+                if book is None:
+                    book = self.load(product)
+        return book.quote(quantity), time.monotonic() - book.fetched_at
+
+    def refresh(self):
+        """Reload every loaded product, without waiting for streams that are not
+        ready. Raises the first failure once every product was tried."""
+        failure = None
+        for product in list(self.books):
+            try:
+                with self._load_lock(product):
+                    self.load(product, timeout=0)
+            except Exception as err:
+                failure = failure or err
+        if failure is not None:
+            raise failure
+
+    def run(self):
+        while not self._stopped.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as err:
+                click.echo(f"Refreshing order books failed: {err}", err=True)
+
+    def _load_lock(self, product):
+        with self._lock:
+            return self._load_locks.setdefault(product, threading.Lock())
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        for order_books in self.streams.values():
+            order_books.stop()
+
+
+class QuoteRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, Nagle would hold the body back
+    # until the client's delayed ACK on every keep-alive request.
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/quote":
+            return self.send_json(HTTPStatus.NOT_FOUND, {"error": "Not found"})
+
+        query = parse_qs(url.query)
+        product = query.get("product", ["BTCUSD"])[0]
+        if product not in COINROUTES_GET_PRICE_CHOICES:
+            return self.send_json(
+                HTTPStatus.BAD_REQUEST, {"error": f"Unsupported product {product}"}
+            )
+        try:
+            quantities = [
+                Decimal(quantity) for quantity in query["quantity"][0].split(",")
+            ]
+        except (KeyError, ArithmeticError):
+            return self.send_json(
+                HTTPStatus.BAD_REQUEST, {"error": "A valid quantity is required"}
+            )
+        if not all(quantity.is_finite() and quantity > 0 for quantity in quantities):
+            return self.send_json(
+                HTTPStatus.BAD_REQUEST, {"error": "Quantities must be positive"}
+            )
+
+        quotes = []
+        try:
+            for quantity in quantities:
+                prices, age = self.server.service.quote(product, quantity)
+                quotes.append([str(value) for value in prices])
+        except Exception as err:
+            return self.send_json(HTTPStatus.BAD_GATEWAY, {"error": str(err)})
+        self.send_json(
+            HTTPStatus.OK, {"product": product, "quotes": quotes, "age": age}
+        )
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class QuoteServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, service, host=QUOTE_SERVER_HOST, port=QUOTE_SERVER_PORT):
+        super().__init__((host, port), QuoteRequestHandler)
+        self.service = service
+
+
+class QuoteClient:
+    """Thin client of a running quote server, reusing one keep-alive connection."""
+
+    def __init__(self, url, session=None, timeout=REQUEST_TIMEOUT):
+        self.url = url.rstrip("/")
+        self.session = session or requests.Session()
+        self.timeout = timeout
+
+    def get_buy_and_sell_prices(self, quantities, product):
+        """Return the buy cost, remaining buy amount, sell cost and remaining
+        sell amount of every quantity, like `utils.get_buy_and_sell_prices`."""
+        response = self.session.get(
+            f"{self.url}/quote",
+            params={
+                "product": product,
+                "quantity": ",".join(str(quantity) for quantity in quantities),
+            },
+            timeout=self.timeout,
+        )
+        if response.status_code != HTTPStatus.OK:
+            raise Exception(
+                f"Quote server error, error code: {response.status_code}"
+                f" error message: {response.json().get('error')}",
+                response.status_code,
+            )
+        return [
+            tuple(Decimal(value) for value in quote)
+            for quote in response.json()["quotes"]
+        ]
+
+    def get_buy_and_sell_price(self, quantity, product):
+        return self.get_buy_and_sell_prices([quantity], product)[0]
+
+
+@click.command()
+@click.option("--add-kraken-exchange", is_flag=True)
+@click.option("--host", required=False, type=str, default=QUOTE_SERVER_HOST)
+@click.option("--port", required=False, type=int, default=QUOTE_SERVER_PORT)
+@click.option(
+    "--refresh-interval",
+    required=False,
+    type=click.FloatRange(min=0, min_open=True),
+    default=QUOTE_SERVER_REFRESH_INTERVAL,
+)
+@click.option("--stream", is_flag=True)
+@click.option("--hedge-requests", is_flag=True)
+@click.option("--cache-max-age", required=False, type=click.FloatRange(min=0))
+@click.option("--cache-dir", required=False, type=str, default=SNAPSHOT_CACHE_DIR)
+@click.option("--no-disk-cache", is_flag=True)
+def serve(
+    add_kraken_exchange,
+    host,
+    port,
+    refresh_interval,
+    stream,
+    hedge_requests,
+    cache_max_age,
+    cache_dir,
+    no_disk_cache,
+):
+    """Quote server keeping the order books of CoinBase Pro, Gemini and Kraken(optional)
+    warm in memory and answering buy and sell price queries over HTTP.
+
+    :param add_kraken_exchange: Fetch order books from the Kraken Exchange as well.
+    :param host: The host to listen on.
+    :param port: The port to listen on.
+    :param refresh_interval: Seconds between order book refreshes.
+    :param stream: Maintain the order books from the exchanges websocket feeds
+    instead of REST snapshots.
+    :param hedge_requests: Send a duplicate of an exchange request slower than the
+    95th percentile of the recent requests to that exchange.
+    :param cache_max_age: Reuse order book snapshots fetched at most this many
+    seconds ago, e.g. by another server sharing `cache_dir`, instead of fetching
+    them again.
+    :param cache_dir: Directory of the on-disk snapshot cache shared by processes.
+    :param no_disk_cache: Only cache snapshots in the memory of this server.
+    """
+    if stream and cache_max_age is not None:
+        raise click.BadParameter(
+            "the snapshot cache is not supported with --stream",
+            param_hint="--cache-max-age",
+        )
+    if hedge_requests:
+        enable_hedging()
+    cache = None
+    if cache_max_age is not None:
+        cache = SnapshotCache(
+            cache_max_age, directory=None if no_disk_cache else cache_dir
+        )
+    service = QuoteService(
+        kraken=add_kraken_exchange,
+        refresh_interval=refresh_interval,
+        stream=stream,
+        cache=cache,
+    ).start()
+    server = QuoteServer(service, host=host, port=port)
+    click.echo(f"Serving quotes on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,91 @@
+"""
+Multi-process sharded quoting.
+
+Normalizing and walking order books is CPU bound, so one process saturates a
+single core when refreshing many products. Products are split into shards
+quoted by a pool of worker processes, each doing its own fetches,
+normalization and order walking, while the requests of all the workers to an
+exchange take tokens from one shared rate limiter. Only the compact price
+summaries of a shard travel back to the parent process, never the order books.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from orderbooks.batch import quote_batch
+from orderbooks.integrations.adapters import enabled_adapters
+from orderbooks.integrations.constants import KRAKEN
+from orderbooks.integrations.ratelimit import SharedTokenBucket
+from orderbooks.integrations.resilience import enable_hedging
+from orderbooks.utils import FetchStats
+
+
+def shard_requests(requests, shards):
+    """Split a dict of quantities per product into at most `shards` dicts of
+    products, dealt round-robin so every shard gets a similar share."""
+    products = list(requests)
+    return [
+        {product: requests[product] for product in products[shard::shards]}
+        for shard in range(min(shards, len(products)))
+    ]
+
+
+def shared_rate_limiters():
+    """A rate limiter per exchange to share between worker processes, with the
+    rate and burst a single process keeps to."""
+    return {
+        adapter.EXCHANGE: SharedTokenBucket(
+            adapter.REQUESTS_PER_SECOND, adapter.REQUEST_BURST
+        )
+        for adapter in enabled_adapters(optional=[KRAKEN])
+    }
+
+
+def init_worker(rate_limiters, hedge=False):
+    """Hand every exchange adapter of a worker process its shared rate limiter
+    from `rate_limiters`, so the pool as a whole stays under the limits a single
+    process keeps to, bursts included, and turn on hedged requests in the
+    worker when `hedge` is set."""
+    if hedge:
+        enable_hedging()
+    for adapter in enabled_adapters(optional=[KRAKEN]):
+        adapter.rate_limiter = rate_limiters[adapter.EXCHANGE]
+
+
+def quote_shard(requests, kraken=False):
+    """Quote a shard in a worker process, returning the `quote_batch` results with
+    the bytes transferred and depth escalations made."""
+    stats = FetchStats()
+    results = list(quote_batch(requests, kraken=kraken, stats=stats))
+    return results, stats.bytes_transferred, stats.escalations
+
+
+def quote_sharded(
+    requests,
+    processes=None,
+    kraken=False,
+    shard_size=1,
+    stats=None,
+    quote=quote_shard,
+    hedge=False,
+):
+    """Quote the quantities of every product of `requests` on a process pool.
+
+    Products are split into shards of about `shard_size` products, each quoted
+    by `quote(shard, kraken)` in a worker process. Yields the same
+    (product, quantities, prices, missing) tuples as `quote_batch`, shard by
+    shard as they complete, and records the workers fetches on `stats`. With
+    `hedge` the workers send hedged requests.
+    """
+    processes = processes or os.cpu_count() or 1
+    shards = shard_requests(requests, max(-(-len(requests) // shard_size), 1))
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        initializer=init_worker,
+        initargs=(shared_rate_limiters(), hedge),
+    ) as executor:
+        futures = [executor.submit(quote, shard, kraken) for shard in shards]
+        for future in as_completed(futures):
+            results, bytes_transferred, escalations = future.result()
+            if stats is not None:
+                stats.record(bytes_transferred, escalations)
+            yield from results
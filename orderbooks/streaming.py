@@ -0,0 +1,350 @@
+"""
+Streaming ingestion of level-2 order book feeds into in-memory books.
+
+Each exchange feed sends an initial snapshot followed by incremental level
+updates, which are applied to a `LiveOrderBook` so quotes can be served from
+it without any REST round trip. The exchanges streamed are the enabled
+adapters, through the feeds of `orderbooks.integrations.feeds` they declare.
+The integrity of each book is kept as far as its feed allows:
+
+- Gemini numbers its messages, a sequence gap resubscribes to get a fresh
+  snapshot.
+- Kraken sends a checksum of the top of the book with its updates, a book not
+  matching it resubscribes the same way.
+- Coinbase's level-2 channel has neither, so a missed update cannot be
+  detected. Its book is resynced from a fresh snapshot every
+  `COINBASE_RESYNC_INTERVAL` seconds instead.
+
+A dropped connection or any other error of the transport reconnects after a
+jittered exponential backoff.
+
+The websocket transport uses the optional `websockets` package. Any callable
+returning a connection with `send`, `recv` and `close`, such as
+`ReplayConnection`, can be used instead e.g. to replay recorded streams offline.
+"""
+import heapq
+import json
+import random
+import threading
+import time
+
+from orderbooks.books import (MergedSide, OrderBookSide, exchange_id,
+                              product_decimals, to_ticks)
+from orderbooks.integrations.adapters import enabled_adapters
+from orderbooks.integrations.constants import (KRAKEN,
+                                               STREAM_RECONNECT_BASE_DELAY,
+                                               STREAM_RECONNECT_MAX_DELAY)
+from orderbooks.integrations.feeds import BookOutOfSyncError, SequenceGapError
+
+try:
+    from websockets.sync.client import connect as websocket_connect
+except ImportError:  # pragma: no cover - depends on the installed extras
+    websocket_connect = None
+
+
+class LiveOrderBook:
+    """
+    An exchange order book maintained from a snapshot and incremental updates,
+    with prices and sizes kept as integer ticks keyed by price.
+    """
+
+    def __init__(self, exchange, price_decimals, size_decimals, max_depth=None):
+        self.exchange = exchange
+        self.price_decimals = price_decimals
+        self.size_decimals = size_decimals
+        self.max_depth = max_depth
+        self.bids = {}
+        self.asks = {}
+        self.sequence = None
+        self.ready = False
+        self.version = 0
+        self._sides = None
+        self._lock = threading.Lock()
+
+    def apply_snapshot(self, bids, asks, sequence=None):
+        """Replace the book with (price, size) bids and asks."""
+        with self._lock:
+            self.bids = self._levels(bids)
+            self.asks = self._levels(asks)
+            self.sequence = sequence
+            self.ready = True
+            self._changed()
+
+    def apply_updates(self, changes, sequence=None):
+        """Apply (bid, price, size) changes, a size of zero removes the level."""
+        with self._lock:
+            self.check_sequence(sequence)
+            for bid, price, size in changes:
+                levels = self.bids if bid else self.asks
+                price_ticks = to_ticks(price, self.price_decimals)
+                size_ticks = to_ticks(size, self.size_decimals)
+                if size_ticks:
+                    levels[price_ticks] = size_ticks
+                else:
+                    levels.pop(price_ticks, None)
+            if self.max_depth is not None:
+                self._truncate(self.bids, bid=True)
+                self._truncate(self.asks, bid=False)
+            self._changed()
+
+    def check_sequence(self, sequence):
+        if sequence is None:
+            return
+        if self.sequence is not None and sequence != self.sequence + 1:
+            self.ready = False
+            raise SequenceGapError(
+                f"{self.exchange} expected sequence {self.sequence + 1} got {sequence}"
+            )
+        self.sequence = sequence
+
+    def top_levels(self, depth):
+        """Return the best `depth` (price, size) levels in ticks of the asks and
+        of the bids, each from the best price."""
+        with self._lock:
+            asks = heapq.nsmallest(depth, self.asks.items())
+            bids = heapq.nlargest(depth, self.bids.items())
+        return asks, bids
+
+    def sides(self):
+        """Return the bids and offers as price ordered `OrderBookSide`s."""
+        with self._lock:
+            if self._sides is None:
+                self._sides = (
+                    self._side(self.bids, bid=True),
+                    self._side(self.asks, bid=False),
+                )
+            return self._sides
+
+    def _levels(self, levels):
+        book = {}
+        for price, size in levels:
+            size_ticks = to_ticks(size, self.size_decimals)
+            if size_ticks:
+                book[to_ticks(price, self.price_decimals)] = size_ticks
+        return book
+
+    def _truncate(self, levels, bid):
+        if len(levels) > self.max_depth:
+            for price in sorted(levels, reverse=not bid)[
+                : len(levels) - self.max_depth
+            ]:
+                del levels[price]
+
+    def _side(self, levels, bid):
+        side = OrderBookSide(
+            price_decimals=self.price_decimals, size_decimals=self.size_decimals
+        )
+        exchange_index = exchange_id(self.exchange)
+        for price in sorted(levels, reverse=bid):
+            side.append(exchange_index, price, levels[price])
+        return side
+
+    def _changed(self):
+        self.version += 1
+        self._sides = None
+
+
+class ReplayConnection:
+    """
+    Local stand-in for a websocket connection that replays recorded messages,
+    either given as a list or read from a file with one JSON message per line.
+    Subscribe messages sent to it are kept in `sent`.
+    """
+
+    def __init__(self, messages):
+        if isinstance(messages, str):
+            with open(messages) as recording:
+                messages = [line.strip() for line in recording if line.strip()]
+        self.messages = list(messages)
+        self.sent = []
+        self.closed = False
+
+    def send(self, message):
+        self.sent.append(message)
+
+    def recv(self):
+        if self.closed or not self.messages:
+            raise EOFError("End of the recorded stream")
+        message = self.messages.pop(0)
+        return message if isinstance(message, str) else json.dumps(message)
+
+    def close(self):
+        self.closed = True
+
+
+class BookStream:
+    """
+    Keep a `LiveOrderBook` up to date from an exchange feed on a background thread.
+
+    A book out of sync with the exchange resubscribes at once. Any other error,
+    such as the connection dropping, reconnects after a full jitter delay of up
+    to `base_delay * 2 ** attempt` seconds capped at `max_delay`, the attempts
+    counting from the last snapshot received, as do repeated resubscriptions. The last error is kept in
+    `last_error`. Feeds with a `RESYNC_INTERVAL` are resubscribed that often,
+    the current book being served until the fresh snapshot replaces it.
+    """
+
+    def __init__(
+        self,
+        feed,
+        product,
+        connect=None,
+        base_delay=STREAM_RECONNECT_BASE_DELAY,
+        max_delay=STREAM_RECONNECT_MAX_DELAY,
+    ):
+        self.feed = feed
+        self.connect = connect or websocket_connect
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        price_decimals, size_decimals = product_decimals(product)
+        self.book = LiveOrderBook(
+            feed.EXCHANGE,
+            price_decimals,
+            size_decimals,
+            max_depth=getattr(feed, "MAX_DEPTH", None),
+        )
+        self.last_error = None
+        self._connection = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def backoff(self, attempt):
+        """A full jitter delay before reconnecting after failed `attempt` (from 0)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def run(self):
+        """Consume the feed until stopped or a replayed stream ends, resubscribing
+        on gaps and reconnecting on errors."""
+        if self.connect is None:
+            raise RuntimeError(
+                "Streaming requires the websockets package, install it with "
+                "`pip install websockets`."
+            )
+        resync_interval = getattr(self.feed, "RESYNC_INTERVAL", None)
+        attempt = 0
+        while not self._stopped.is_set():
+            delay = 0
+            resync = False
+            self._connection = None
+            try:
+                self._connection = self.connect(self.feed.url())
+                subscribe_message = self.feed.subscribe_message()
+                if subscribe_message is not None:
+                    self._connection.send(json.dumps(subscribe_message))
+                resync_at = (
+                    None
+                    if resync_interval is None
+                    else time.monotonic() + resync_interval
+                )
+                while not self._stopped.is_set():
+                    self.feed.handle(json.loads(self._connection.recv()), self.book)
+                    if self.book.ready:
+                        attempt = 0
+                    if (
+                        resync_at is not None
+                        and self.book.ready
+                        and time.monotonic() >= resync_at
+                    ):
+                        resync = True
+                        break
+            except BookOutOfSyncError as err:
+                # Resubscribe to start again from a fresh snapshot, at once unless
+                # the book fell out of sync again before that snapshot arrived.
+                self.last_error = err
+                delay = self.backoff(attempt - 1) if attempt else 0
+                attempt += 1
+            except EOFError:
+                return
+            except Exception as err:
+                if self._stopped.is_set():
+                    return
+                self.last_error = err
+                delay = self.backoff(attempt)
+                attempt += 1
+            finally:
+                if self._connection is not None:
+                    self._connection.close()
+                if not resync:
+                    self.book.ready = False
+            if delay:
+                self._stopped.wait(delay)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._connection is not None:
+            self._connection.close()
+
+    @property
+    def running(self):
+        """Whether the stream thread is still consuming or reconnecting to the feed."""
+        return self._thread is not None and self._thread.is_alive()
+
+
+class StreamingOrderBooks:
+    """
+    Live order books of every enabled exchange for a product, served in the same
+    shape as `orderbooks.utils.get_exchange_data`. Every enabled adapter must
+    declare the `FEED` streaming its book.
+    """
+
+    def __init__(self, product, kraken=False, connect=None):
+        adapters = enabled_adapters([KRAKEN] if kraken else [])
+        unstreamable = [adapter.EXCHANGE for adapter in adapters if adapter.FEED is None]
+        if unstreamable:
+            raise ValueError(
+                f"No streaming feed for the enabled exchanges {', '.join(unstreamable)}"
+            )
+        self.streams = [
+            BookStream(adapter.FEED(product), product, connect) for adapter in adapters
+        ]
+
+    def start(self):
+        for stream in self.streams:
+            stream.start()
+        return self
+
+    def stop(self):
+        for stream in self.streams:
+            stream.stop()
+
+    @property
+    def ready(self):
+        return all(stream.book.ready for stream in self.streams)
+
+    def not_ready(self):
+        """Why the book of every exchange without a current snapshot is not ready,
+        its stream's last error if any."""
+        return {
+            stream.feed.EXCHANGE: (
+                "no snapshot received"
+                if stream.last_error is None
+                else f"no snapshot since {stream.last_error!r}"
+            )
+            for stream in self.streams
+            if not stream.book.ready
+        }
+
+    def wait_until_ready(self, timeout, interval=0.05):
+        """Wait up to `timeout` seconds for every book to receive its snapshot,
+        giving up early once a stream whose book is not ready has ended."""
+        deadline = time.monotonic() + timeout
+        while (
+            not self.ready
+            and time.monotonic() < deadline
+            and all(stream.running for stream in self.streams if not stream.book.ready)
+        ):
+            time.sleep(interval)
+        return self.ready
+
+    def get_exchange_data(self):
+        """Return the live bids and offers as `MergedSide`s."""
+        sides = [stream.book.sides() for stream in self.streams]
+        return (
+            MergedSide((bids for bids, _ in sides), bid=True),
+            MergedSide((offers for _, offers in sides), bid=False),
+        )
@@ -0,0 +1,11 @@
+import pytest
+
+from orderbooks.integrations.resilience import reset_policies
+
+
+@pytest.fixture(autouse=True)
+def exchange_policies():
+    """Start every test with fresh exchange circuit breakers and latencies."""
+    reset_policies()
+    yield
+    reset_policies()
@@ -1,3 +1,9 @@
+from decimal import Decimal
+
+from orderbooks.books import MergedSide, OrderBookSide
+from orderbooks.integrations.constants import COINBASE, GEMINI, KRAKEN
+
+
 def successful_kraken_response():
     return {
         "error": [],
@@ -44,3 +50,205 @@ def successful_coinbase_response():
         "auction": None,
         "time": "2024-01-24T15:47:18.850950Z",
     }
+
+
+def coinbase_level2_stream():
+    return [
+        {"type": "subscriptions", "channels": [{"name": "level2_batch"}]},
+        {
+            "type": "snapshot",
+            "product_id": "BTC-USD",
+            "bids": [["40071.98", "0.5"], ["40071.97", "1.2"]],
+            "asks": [["40072.71", "0.3"], ["40075.55", "2.0"]],
+        },
+        {
+            "type": "l2update",
+            "product_id": "BTC-USD",
+            "changes": [["buy", "40071.98", "0"], ["sell", "40072.50", "0.1"]],
+            "time": "2024-01-24T15:47:18.850950Z",
+        },
+    ]
+
+
+def gemini_market_data_stream():
+    return [
+        {
+            "type": "update",
+            "eventId": 1,
+            "socket_sequence": 0,
+            "events": [
+                {
+                    "type": "change",
+                    "reason": "initial",
+                    "price": "39150.97",
+                    "delta": "0.5",
+                    "remaining": "0.5",
+                    "side": "bid",
+                },
+                {
+                    "type": "change",
+                    "reason": "initial",
+                    "price": "39150.36",
+                    "delta": "1",
+                    "remaining": "1",
+                    "side": "bid",
+                },
+                {
+                    "type": "change",
+                    "reason": "initial",
+                    "price": "39155.01",
+                    "delta": "0.2",
+                    "remaining": "0.2",
+                    "side": "ask",
+                },
+            ],
+        },
+        {"type": "heartbeat", "socket_sequence": 1},
+        {
+            "type": "update",
+            "eventId": 2,
+            "socket_sequence": 2,
+            "events": [
+                {
+                    "type": "change",
+                    "reason": "place",
+                    "price": "39150.36",
+                    "delta": "0.5",
+                    "remaining": "1.5",
+                    "side": "bid",
+                },
+                {
+                    "type": "trade",
+                    "price": "39155.01",
+                    "amount": "0.1",
+                    "makerSide": "ask",
+                },
+                {
+                    "type": "change",
+                    "reason": "trade",
+                    "price": "39155.01",
+                    "delta": "-0.1",
+                    "remaining": "0.1",
+                    "side": "ask",
+                },
+            ],
+        },
+    ]
+
+
+def kraken_book_stream():
+    return [
+        {"event": "systemStatus", "status": "online"},
+        {"event": "subscriptionStatus", "status": "subscribed", "pair": "XBT/USD"},
+        [
+            336,
+            {
+                "as": [
+                    ["39163.70000", "1.53900000", "1706044374.1"],
+                    ["39166.60000", "0.02000000", "1706044372.1"],
+                ],
+                "bs": [
+                    ["39163.60000", "8.18700000", "1706044373.1"],
+                    ["39162.80000", "0.76800000", "1706044375.1"],
+                ],
+            },
+            "book-1000",
+            "XBT/USD",
+        ],
+        [
+            336,
+            {"a": [["39163.70000", "0.00000000", "1706044376.1"]], "c": "2919453536"},
+            "book-1000",
+            "XBT/USD",
+        ],
+        [
+            336,
+            {"a": [["39164.00000", "0.50000000", "1706044377.1"]]},
+            {"b": [["39163.65000", "1.00000000", "1706044377.2", "r"]], "c": "1419103556"},
+            "book-1000",
+            "XBT/USD",
+        ],
+        {"event": "heartbeat"},
+    ]
+
+
+def random_run(rng, exchange, bid, levels):
+    prices = sorted(
+        {Decimal(rng.randint(39000, 39100)) / 10 for _ in range(levels)},
+        reverse=bid,
+    )
+    run = []
+    for price in prices:
+        # Repeat some prices to mimic several level-3 orders resting at one level.
+        for _ in range(rng.choice([1, 1, 2, 3])):
+            run.append((exchange, price, Decimal(rng.randint(1, 5000)) / 1000))
+    return run
+
+
+def tick_runs(rng, bid):
+    return [
+        OrderBookSide.from_records(
+            [(price, amount) for _, price, amount in random_run(rng, exchange, bid, 30)],
+            exchange,
+        )
+        for exchange in (GEMINI, COINBASE, KRAKEN)
+    ]
+
+
+def random_side(rng, exchange, bid, levels, price_decimals=5, size_decimals=8):
+    price = rng.randint(3900000, 4000000)
+    records = []
+    for _ in range(levels):
+        price += rng.choice([0, 1, 7, 100]) * (-1 if bid else 1)
+        size = rng.choice([rng.randint(1, 10**8), rng.randint(1, 10**10), 0])
+        records.append(
+            (
+                str(Decimal(price).scaleb(-2)),
+                str(Decimal(size).scaleb(-size_decimals)),
+            )
+        )
+    return OrderBookSide.from_records(
+        records, exchange, price_decimals=price_decimals, size_decimals=size_decimals
+    )
+
+
+def random_book(rng):
+    bid = rng.choice([True, False])
+    exchanges = rng.sample([GEMINI, COINBASE, KRAKEN], rng.randint(1, 3))
+    order_book = MergedSide(
+        [random_side(rng, exchange, bid, rng.randint(0, 60)) for exchange in exchanges],
+        bid=bid,
+    )
+    return order_book, bid
+
+
+def random_quantity(rng):
+    return rng.choice(
+        [
+            rng.uniform(0, 300),
+            float(rng.randint(0, 300)),
+            rng.randint(0, 300),
+            Decimal(rng.randint(0, 300 * 10**8)).scaleb(-8),
+            Decimal(str(rng.uniform(0, 300))),
+            0,
+            10**6,
+        ]
+    )
+
+
+def random_payload(rng, dict_datatype=False):
+    book = {}
+    for side, step in (("bids", -1), ("asks", 1)):
+        cents = 4000000
+        records = []
+        for _ in range(rng.randint(0, 30)):
+            cents += rng.randint(1, 100) * step
+            price = f"{cents // 100}.{cents % 100:02}"
+            amount = f"{rng.randint(0, 3)}.{rng.randint(0, 10**8 - 1):08}"
+            records.append(
+                {"price": price, "amount": amount, "timestamp": "1"}
+                if dict_datatype
+                else [price, amount, "_"]
+            )
+        book[side] = records
+    return book
@@ -0,0 +1,145 @@
+import threading
+import time
+from decimal import Decimal
+
+import pytest
+
+from orderbooks.integrations.adapters import (ExchangeAdapter, enabled_adapters,
+                                              get_adapter, register_adapter,
+                                              registered_exchanges,
+                                              unregister_adapter)
+from orderbooks.integrations.constants import COINBASE, GEMINI, KRAKEN
+from orderbooks.tests.helpers import successful_kraken_response
+from orderbooks.utils import (FetchStats, execute_market_order,
+                              get_exchange_data)
+
+TEST_EXCHANGES = [f"TEST_EXCHANGE_{index}" for index in range(4)]
+
+
+class SlowClient:
+    """Answers a one level order book after a short delay, counting the requests
+    running at once."""
+
+    delay = 0.1
+    started = 0
+    running = 0
+    most_running = 0
+    lock = threading.Lock()
+
+    def __init__(self, deadline=None, rate_limiter=None):
+        self.deadline = deadline
+        self.bytes_transferred = 0
+
+    def get_order_book(self, product, params=None):
+        with SlowClient.lock:
+            SlowClient.started += 1
+            SlowClient.running += 1
+            SlowClient.most_running = max(SlowClient.most_running, SlowClient.running)
+        time.sleep(self.delay)
+        with SlowClient.lock:
+            SlowClient.running -= 1
+        return {"data": {"bids": [["99", "1"]], "asks": [["101", "1"]]}}
+
+
+@pytest.fixture
+def test_adapters():
+    for exchange in TEST_EXCHANGES:
+
+        @register_adapter
+        class TestAdapter(ExchangeAdapter):
+            EXCHANGE = exchange
+            CLIENT = SlowClient
+            SYMBOLS = {"BTCUSD": "BTC/USD"}
+            MAX_CONCURRENCY = 1
+
+            def order_book(self, payload, symbol):
+                return payload["data"]
+
+    SlowClient.started = SlowClient.most_running = 0
+    yield
+    for exchange in TEST_EXCHANGES:
+        unregister_adapter(exchange)
+
+
+class TestAdapters:
+    def test_builtin_adapters(self):
+        assert registered_exchanges() == [GEMINI, COINBASE, KRAKEN]
+        assert [adapter.EXCHANGE for adapter in enabled_adapters()] == [GEMINI, COINBASE]
+        assert [adapter.EXCHANGE for adapter in enabled_adapters([KRAKEN])] == [
+            GEMINI,
+            COINBASE,
+            KRAKEN,
+        ]
+
+    def test_kraken_order_book(self):
+        adapter = get_adapter(KRAKEN)
+
+        order_book = adapter.order_book(
+            successful_kraken_response(), adapter.symbol("BTCUSD")
+        )
+
+        assert order_book == successful_kraken_response()["result"]["XXBTZUSD"]
+
+    def test_registered_adapters_fetched_in_parallel(self, mocker, test_adapters):
+        for exchange in (GEMINI, COINBASE):
+            mocker.patch.object(get_adapter(exchange), "OPTIONAL", True)
+
+        start = time.perf_counter()
+        bids, offers = get_exchange_data(product="BTCUSD")
+        seconds = time.perf_counter() - start
+
+        assert seconds < SlowClient.delay * len(TEST_EXCHANGES)
+        assert [exchange for exchange, _, _ in bids] == TEST_EXCHANGES
+        assert execute_market_order(2, offers) == (Decimal("202.00"), 0)
+
+    def test_deadline_fetches_run_on_daemon_threads(self, mocker, test_adapters):
+        for exchange in (GEMINI, COINBASE):
+            mocker.patch.object(get_adapter(exchange), "OPTIONAL", True)
+        fetches = []
+        get_order_book = SlowClient.get_order_book
+
+        def record_fetch(client, product, params=None):
+            fetches.append((threading.current_thread().daemon, client.deadline))
+            return get_order_book(client, product, params)
+
+        mocker.patch.object(SlowClient, "get_order_book", record_fetch)
+        start = time.monotonic()
+
+        bids, _ = get_exchange_data(product="BTCUSD", deadline=1)
+
+        assert [exchange for exchange, _, _ in bids] == TEST_EXCHANGES
+        assert len(fetches) == len(TEST_EXCHANGES)
+        for daemon, deadline in fetches:
+            assert daemon
+            assert start + 1 <= deadline <= time.monotonic() + 1
+
+    def test_deadline_fetches_not_started_in_time_are_dropped(self, mocker, test_adapters):
+        for exchange in (GEMINI, COINBASE):
+            mocker.patch.object(get_adapter(exchange), "OPTIONAL", True)
+        mocker.patch.object(SlowClient, "delay", 0.2)
+        stats = FetchStats()
+
+        bids, _ = get_exchange_data(
+            product="BTCUSD", max_workers=1, stats=stats, deadline=0.3
+        )
+        time.sleep(0.3)
+
+        assert [exchange for exchange, _, _ in bids] == TEST_EXCHANGES[:1]
+        assert set(stats.missing_exchanges) == set(TEST_EXCHANGES[1:])
+        assert SlowClient.most_running == 1
+        assert SlowClient.started == 2
+
+    def test_adapter_concurrency_limit(self, test_adapters):
+        adapter = get_adapter(TEST_EXCHANGES[0])
+
+        def fetch():
+            with adapter.concurrency:
+                adapter.get_order_book(SlowClient(), "BTC/USD")
+
+        threads = [threading.Thread(target=fetch) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert SlowClient.most_running == 1
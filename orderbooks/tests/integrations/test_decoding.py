@@ -0,0 +1,102 @@
+import gc
+import json
+import threading
+
+import pytest
+
+from orderbooks.integrations.decoding import gc_paused, loads
+from orderbooks.tests.helpers import (successful_coinbase_response,
+                                      successful_gemini_response,
+                                      successful_kraken_response)
+
+
+@pytest.fixture
+def gc_enabled():
+    enabled = gc.isenabled()
+    gc.enable()
+    yield
+    if not enabled:
+        gc.disable()
+
+
+class TestDecoding:
+    @pytest.mark.parametrize("orjson_installed", [True, False])
+    @pytest.mark.parametrize(
+        "payload",
+        [
+            successful_coinbase_response(),
+            successful_gemini_response(),
+            successful_kraken_response(),
+        ],
+    )
+    def test_loads_matches_json(self, mocker, payload, orjson_installed):
+        if not orjson_installed:
+            mocker.patch("orderbooks.integrations.decoding.orjson", None)
+        content = json.dumps(payload).encode()
+
+        assert loads(content) == json.loads(content) == payload
+
+    @pytest.mark.parametrize("orjson_installed", [True, False])
+    def test_loads_invalid_json(self, mocker, gc_enabled, orjson_installed):
+        if not orjson_installed:
+            mocker.patch("orderbooks.integrations.decoding.orjson", None)
+
+        with pytest.raises(json.JSONDecodeError):
+            loads(b'{"bids": [')
+
+        assert gc.isenabled()
+
+    def test_loads_pauses_gc(self, mocker, gc_enabled):
+        states = []
+        mocker.patch("orderbooks.integrations.decoding.orjson", None)
+        mocker.patch(
+            "orderbooks.integrations.decoding.json.loads",
+            side_effect=lambda content: states.append(gc.isenabled()),
+        )
+
+        loads(b"{}")
+
+        assert states == [False]
+        assert gc.isenabled()
+
+    def test_gc_paused_keeps_disabled_gc(self, gc_enabled):
+        gc.disable()
+
+        with gc_paused():
+            assert not gc.isenabled()
+
+        assert not gc.isenabled()
+
+    def test_overlapping_decodes_restore_gc(self, mocker, gc_enabled):
+        first_decoding = threading.Event()
+        second_decoding = threading.Event()
+        first_done = threading.Event()
+        states = {}
+
+        def decode(content):
+            if content == b"1":
+                first_decoding.set()
+                second_decoding.wait(5)
+            else:
+                second_decoding.set()
+                first_done.wait(5)
+                states["after first"] = gc.isenabled()
+            return content
+
+        mocker.patch("orderbooks.integrations.decoding.orjson", None)
+        mocker.patch("orderbooks.integrations.decoding.json.loads", side_effect=decode)
+
+        def first():
+            loads(b"1")
+            first_done.set()
+
+        first_thread = threading.Thread(target=first)
+        first_thread.start()
+        first_decoding.wait(5)
+        second_thread = threading.Thread(target=loads, args=(b"2",))
+        second_thread.start()
+        first_thread.join(5)
+        second_thread.join(5)
+
+        assert states == {"after first": False}
+        assert gc.isenabled()
@@ -1,3 +1,4 @@
+import json
 from contextlib import nullcontext as does_not_raise
 from http import HTTPStatus
 from unittest.mock import Mock
@@ -6,8 +7,11 @@ import pytest
 from requests.exceptions import (ConnectionError, HTTPError, RequestException,
                                  Timeout)
 
+from orderbooks.integrations.constants import (COINBASE, GEMINI, KRAKEN,
+                                               REQUEST_TIMEOUT)
 from orderbooks.integrations.exchanges import (CoinBaseClient, GeminiClient,
                                                KrakenClient)
+from orderbooks.integrations.sessions import get_session
 from orderbooks.tests.helpers import (successful_coinbase_response,
                                       successful_gemini_response,
                                       successful_kraken_response)
@@ -51,18 +55,17 @@ class TestGeminiClient:
         expected_exception,
         expected_response,
         product,
-        mocker,
         status_code,
         reason,
     ):
-        client = GeminiClient()
         mock = Mock()
         mock.status_code = status_code
-        mock.json.return_value = response["json"]
+        mock.content = json.dumps(response["json"]).encode()
+        mock.headers = {}
         mock.reason = reason
-        mocker.patch(
-            "orderbooks.integrations.exchanges.requests.get", return_value=mock
-        )
+        session = Mock()
+        session.get.return_value = mock
+        client = GeminiClient(session=session)
         with expected_exception:
             resp = client.get_order_book(product=product)
             assert resp == expected_response
@@ -102,12 +105,11 @@ class TestGeminiClient:
         ],
     )
     def test_request_exceptions(
-        self, exception, expected_exception, exception_message, product, mocker
+        self, exception, expected_exception, exception_message, product
     ):
-        client = GeminiClient()
-        mocker.patch(
-            "orderbooks.integrations.exchanges.requests.get", side_effect=exception
-        )
+        session = Mock()
+        session.get.side_effect = exception
+        client = GeminiClient(session=session)
         with expected_exception as err:
             client.get_order_book(product=product)
 
@@ -152,17 +154,16 @@ class TestCoinBaseClient:
         expected_exception,
         expected_response,
         product,
-        mocker,
         status_code,
         reason,
     ):
-        client = CoinBaseClient()
         mock = Mock()
         mock.status_code = status_code
-        mock.json.return_value = response["json"]
-        mocker.patch(
-            "orderbooks.integrations.exchanges.requests.get", return_value=mock
-        )
+        mock.content = json.dumps(response["json"]).encode()
+        mock.headers = {}
+        session = Mock()
+        session.get.return_value = mock
+        client = CoinBaseClient(session=session)
         with expected_exception:
             resp = client.get_order_book(product=product)
             assert resp == expected_response
@@ -202,12 +203,11 @@ class TestCoinBaseClient:
         ],
     )
     def test_request_exceptions(
-        self, exception, expected_exception, exception_message, product, mocker
+        self, exception, expected_exception, exception_message, product
     ):
-        client = CoinBaseClient()
-        mocker.patch(
-            "orderbooks.integrations.exchanges.requests.get", side_effect=exception
-        )
+        session = Mock()
+        session.get.side_effect = exception
+        client = CoinBaseClient(session=session)
         with expected_exception as err:
             client.get_order_book(product=product)
 
@@ -252,17 +252,16 @@ class TestKrakenClient:
         expected_exception,
         expected_response,
         product,
-        mocker,
         status_code,
         reason,
     ):
-        client = KrakenClient()
         mock = Mock()
         mock.status_code = status_code
-        mock.json.return_value = response["json"]
-        mocker.patch(
-            "orderbooks.integrations.exchanges.requests.get", return_value=mock
-        )
+        mock.content = json.dumps(response["json"]).encode()
+        mock.headers = {}
+        session = Mock()
+        session.get.return_value = mock
+        client = KrakenClient(session=session)
         with expected_exception:
             resp = client.get_order_book(product=product)
             assert resp == expected_response
@@ -302,13 +301,84 @@ class TestKrakenClient:
         ],
     )
     def test_request_exceptions(
-        self, exception, expected_exception, exception_message, product, mocker
+        self, exception, expected_exception, exception_message, product
     ):
-        client = KrakenClient()
-        mocker.patch(
-            "orderbooks.integrations.exchanges.requests.get", side_effect=exception
-        )
+        session = Mock()
+        session.get.side_effect = exception
+        client = KrakenClient(session=session)
         with expected_exception as err:
             client.get_order_book(product=product)
 
         assert err.value.args[0] == exception_message
+
+
+class TestExchangeClient:
+    @pytest.mark.parametrize(
+        ["client_class", "product", "expected_url", "expected_params"],
+        [
+            (
+                CoinBaseClient,
+                "BTC-USD",
+                "https://api.exchange.coinbase.com/products/BTC-USD/book",
+                {"level": "3"},
+            ),
+            (
+                GeminiClient,
+                "BTCUSD",
+                "https://api.gemini.com/v1/book/BTCUSD",
+                {"level": "3"},
+            ),
+            (
+                KrakenClient,
+                "XBTUSD",
+                "https://api.kraken.com/0/public/Depth",
+                {"level": "3", "pair": "XBTUSD"},
+            ),
+        ],
+    )
+    def test_get_order_book_uses_session_with_timeout(
+        self, client_class, product, expected_url, expected_params
+    ):
+        session = Mock()
+        session.get.return_value.status_code = HTTPStatus.OK
+        session.get.return_value.content = b"{}"
+        session.get.return_value.headers = {}
+        client = client_class(session=session)
+
+        client.get_order_book(product, params={"level": "3"})
+
+        session.get.assert_called_once_with(
+            expected_url, params=expected_params, timeout=REQUEST_TIMEOUT
+        )
+
+    @pytest.mark.parametrize(
+        ["client_class", "exchange"],
+        [(CoinBaseClient, COINBASE), (GeminiClient, GEMINI), (KrakenClient, KRAKEN)],
+    )
+    def test_clients_share_exchange_session(self, client_class, exchange):
+        assert client_class().session is client_class().session
+        assert client_class().session is get_session(exchange)
+
+    @pytest.mark.parametrize(
+        ["headers", "expected_bytes"],
+        [
+            ({}, 48),
+            ({"Content-Length": "24"}, 48),
+            ({"Content-Length": "10", "Content-Encoding": "gzip"}, 20),
+            ({"Content-Length": "invalid"}, 48),
+        ],
+    )
+    def test_bytes_transferred(self, headers, expected_bytes):
+        session = Mock()
+        session.get.return_value.status_code = HTTPStatus.OK
+        session.get.return_value.content = b'{"bids": [], "asks": []}'
+        session.get.return_value.headers = headers
+        client = GeminiClient(session=session)
+
+        client.get_order_book("BTCUSD")
+        client.get_order_book("BTCUSD")
+
+        assert client.bytes_transferred == expected_bytes
+
+    def test_exchanges_use_separate_sessions(self):
+        assert CoinBaseClient().session is not GeminiClient().session
@@ -0,0 +1,89 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from orderbooks.integrations.ratelimit import SharedTokenBucket, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def take_tokens(bucket, taken, tries):
+    for _ in range(tries):
+        if bucket.try_acquire():
+            with taken.get_lock():
+                taken.value += 1
+
+
+class TestTokenBucket:
+    def test_burst_then_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=3, clock=clock, sleep=clock.sleep)
+
+        waits = [bucket.acquire() for _ in range(5)]
+
+        assert waits == [0.0, 0.0, 0.0, 0.5, 0.5]
+        assert clock.now == pytest.approx(1.0)
+
+    def test_refills_up_to_capacity(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1, capacity=2, clock=clock, sleep=clock.sleep)
+        bucket.acquire(2)
+        clock.now = 60
+
+        assert bucket.try_acquire(2)
+        assert not bucket.try_acquire()
+        assert clock.sleeps == []
+
+    def test_default_capacity(self):
+        assert TokenBucket(rate=0.5).capacity == 1
+        assert TokenBucket(rate=10).capacity == 10
+
+    def test_threads_share_the_rate(self):
+        bucket = TokenBucket(rate=100, capacity=1)
+        threads = [threading.Thread(target=bucket.acquire) for _ in range(5)]
+
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert time.monotonic() - start >= 0.04 - 1e-3
+
+    def test_shared_bucket_keeps_processes_under_one_capacity(self):
+        bucket = SharedTokenBucket(rate=0.001, capacity=3)
+        taken = multiprocessing.Value("i", 0)
+        processes = [
+            multiprocessing.Process(target=take_tokens, args=(bucket, taken, 2))
+            for _ in range(4)
+        ]
+
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(10)
+
+        assert taken.value == 3
+        assert not bucket.try_acquire()
+
+    def test_shared_bucket_refills(self):
+        clock = FakeClock()
+        bucket = SharedTokenBucket(rate=2, capacity=3, clock=clock, sleep=clock.sleep)
+
+        waits = [bucket.acquire() for _ in range(5)]
+
+        assert waits == [0.0, 0.0, 0.0, 0.5, 0.5]
+        assert bucket.tokens == 0
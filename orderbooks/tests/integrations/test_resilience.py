@@ -0,0 +1,384 @@
+import email.utils
+import threading
+import time
+from http import HTTPStatus
+from json import dumps
+from unittest.mock import Mock
+
+import pytest
+from requests.exceptions import ConnectionError, HTTPError, Timeout
+
+from orderbooks.integrations.constants import GEMINI, KRAKEN
+from orderbooks.integrations.errors import (CircuitOpenError,
+                                            ExchangeConnectionError,
+                                            ExchangeDeadlineError,
+                                            ExchangeError, ExchangeHTTPError,
+                                            ExchangeResponseError,
+                                            ExchangeTimeoutError)
+from orderbooks.integrations.exchanges import (GeminiClient, KrakenClient,
+                                               retry_after)
+from orderbooks.integrations.resilience import (CircuitBreaker,
+                                                ExchangePolicy, LatencyTracker,
+                                                enable_hedging, get_policy)
+from orderbooks.tests.helpers import (successful_gemini_response,
+                                      successful_kraken_response)
+
+
+def response(json=None, status_code=HTTPStatus.OK, reason="", headers=None):
+    mock = Mock()
+    mock.status_code = status_code
+    mock.content = dumps(json).encode()
+    mock.headers = headers or {}
+    mock.reason = reason
+    return mock
+
+
+def no_wait_policy(name, **kwargs):
+    return ExchangePolicy(name, base_delay=0, **kwargs)
+
+
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(GEMINI, failure_threshold=3)
+
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        assert not breaker.open
+        breaker.record_failure()
+
+        assert breaker.open
+        with pytest.raises(CircuitOpenError, match="Circuit open for GEMINI"):
+            breaker.check()
+
+    def test_lets_requests_through_after_reset_timeout(self, mocker):
+        mock_monotonic = mocker.patch(
+            "orderbooks.integrations.resilience.time.monotonic", return_value=100.0
+        )
+        breaker = CircuitBreaker(GEMINI, failure_threshold=1, reset_timeout=30)
+        breaker.record_failure()
+        assert breaker.open
+
+        mock_monotonic.return_value = 130.0
+        breaker.check()
+        breaker.record_failure()
+        assert breaker.open
+
+        mock_monotonic.return_value = 160.0
+        breaker.record_success()
+        assert not breaker.open
+        assert breaker.failures == 0
+
+
+class TestExchangePolicy:
+    @pytest.mark.parametrize(["attempt", "max_backoff"], [(0, 0.1), (1, 0.2), (5, 1.0)])
+    def test_backoff_is_jittered_and_capped(self, attempt, max_backoff):
+        policy = ExchangePolicy(GEMINI, base_delay=0.1, max_delay=1.0)
+
+        backoffs = [policy.backoff(attempt) for _ in range(200)]
+
+        assert all(0 <= backoff <= max_backoff for backoff in backoffs)
+        assert len(set(backoffs)) > 1
+
+    def test_latency_percentile(self):
+        tracker = LatencyTracker(samples=100)
+        assert tracker.percentile(0.95, min_samples=1) is None
+
+        for latency in range(1, 101):
+            tracker.record(latency / 1000)
+
+        assert tracker.percentile(0.95, min_samples=100) == 0.096
+        assert tracker.percentile(0.95, min_samples=101) is None
+
+    def test_hedge_delay(self):
+        policy = ExchangePolicy(GEMINI)
+        for _ in range(30):
+            policy.latency.record(0.01)
+
+        assert policy.hedge_delay() is None
+        policy.hedge = True
+        assert policy.hedge_delay() == 0.01
+
+    def test_hedged_call_returns_the_first_success(self):
+        policy = ExchangePolicy(GEMINI, hedge=True)
+        for _ in range(30):
+            policy.latency.record(0.01)
+        released = threading.Event()
+        calls = []
+
+        def send():
+            calls.append(len(calls))
+            if len(calls) == 1:
+                released.wait(5)
+                return "slow"
+            return "hedged"
+
+        try:
+            assert policy.call(send) == "hedged"
+        finally:
+            released.set()
+        assert len(calls) == 2
+
+    @pytest.mark.parametrize(
+        ["retry_after", "expected_delay"],
+        [(None, 0.05), (0.01, 0.05), (3.0, 3.0), (90.0, None)],
+    )
+    def test_retry_delay_honours_retry_after(self, mocker, retry_after, expected_delay):
+        policy = ExchangePolicy(GEMINI)
+        mocker.patch.object(policy, "backoff", return_value=0.05)
+        error = ExchangeResponseError("rate limited", 429, retry_after=retry_after)
+
+        assert policy.retry_delay(0, error) == expected_delay
+
+    def test_call_without_hedge_samples_sends_once(self):
+        policy = ExchangePolicy(GEMINI, hedge=True)
+        send = Mock(return_value="response")
+
+        assert policy.call(send) == "response"
+        send.assert_called_once_with()
+        assert len(policy.latency.latencies) == 1
+
+    def test_enable_hedging(self):
+        policy = get_policy(KRAKEN)
+
+        enable_hedging()
+
+        assert policy.hedge
+        assert get_policy(GEMINI).hedge
+        enable_hedging(False)
+        assert not policy.hedge
+
+
+class TestExchangeClientResilience:
+    @pytest.mark.parametrize(
+        ["exception", "expected_exception", "retryable"],
+        [
+            (Timeout, ExchangeTimeoutError, True),
+            (ConnectionError, ExchangeConnectionError, True),
+            (HTTPError, ExchangeHTTPError, False),
+        ],
+    )
+    def test_typed_exceptions(self, exception, expected_exception, retryable):
+        session = Mock()
+        session.get.side_effect = exception
+        client = GeminiClient(session=session, policy=no_wait_policy(GEMINI))
+
+        with pytest.raises(expected_exception) as err:
+            client.get_order_book(product="BTCUSD")
+
+        assert isinstance(err.value, ExchangeError)
+        assert err.value.retryable is retryable
+        assert session.get.call_count == (3 if retryable else 1)
+
+    @pytest.mark.parametrize(
+        ["status_code", "expected_calls"],
+        [
+            (HTTPStatus.SERVICE_UNAVAILABLE, 3),
+            (HTTPStatus.TOO_MANY_REQUESTS, 3),
+            (HTTPStatus.BAD_REQUEST, 1),
+        ],
+    )
+    def test_retries_retryable_status(self, status_code, expected_calls):
+        session = Mock()
+        session.get.return_value = response(status_code=status_code, reason="error")
+        client = GeminiClient(session=session, policy=no_wait_policy(GEMINI))
+
+        with pytest.raises(ExchangeResponseError) as err:
+            client.get_order_book(product="BTCUSD")
+
+        assert err.value.status_code == status_code
+        assert err.value.args[1] == status_code
+        assert session.get.call_count == expected_calls
+
+    def test_retry_succeeds(self):
+        session = Mock()
+        session.get.side_effect = [
+            Timeout("read timed out"),
+            response(status_code=HTTPStatus.BAD_GATEWAY),
+            response(successful_kraken_response()),
+        ]
+        policy = no_wait_policy(KRAKEN)
+        client = KrakenClient(session=session, policy=policy)
+
+        assert client.get_order_book(product="XBTUSD") == successful_kraken_response()
+        assert session.get.call_count == 3
+        assert policy.breaker.failures == 0
+        for call in session.get.call_args_list:
+            assert call.kwargs["params"] == {"pair": "XBTUSD"}
+
+    def test_open_circuit_fails_fast(self):
+        session = Mock()
+        session.get.side_effect = Timeout("read timed out")
+        policy = no_wait_policy(
+            GEMINI, max_retries=0, breaker=CircuitBreaker(GEMINI, failure_threshold=2)
+        )
+        client = GeminiClient(session=session, policy=policy)
+        for _ in range(2):
+            with pytest.raises(ExchangeTimeoutError):
+                client.get_order_book(product="BTCUSD")
+
+        with pytest.raises(CircuitOpenError):
+            client.get_order_book(product="BTCUSD")
+        assert session.get.call_count == 2
+
+    def test_retries_stop_once_circuit_opens(self):
+        session = Mock()
+        session.get.side_effect = ConnectionError("refused")
+        policy = no_wait_policy(
+            GEMINI, max_retries=5, breaker=CircuitBreaker(GEMINI, failure_threshold=2)
+        )
+        client = GeminiClient(session=session, policy=policy)
+
+        with pytest.raises(ExchangeConnectionError):
+            client.get_order_book(product="BTCUSD")
+
+        assert session.get.call_count == 2
+
+    def test_every_attempt_takes_a_rate_limiter_token(self):
+        session = Mock()
+        session.get.side_effect = [
+            Timeout("read timed out"),
+            response(status_code=HTTPStatus.TOO_MANY_REQUESTS),
+            response(successful_gemini_response()),
+        ]
+        rate_limiter = Mock()
+        client = GeminiClient(
+            session=session, policy=no_wait_policy(GEMINI), rate_limiter=rate_limiter
+        )
+
+        client.get_order_book(product="BTCUSD")
+
+        assert rate_limiter.acquire.call_count == session.get.call_count == 3
+
+    def test_hedged_requests_take_a_rate_limiter_token(self):
+        released = threading.Event()
+        calls = []
+
+        def get(*args, **kwargs):
+            calls.append(len(calls))
+            if len(calls) == 1:
+                released.wait(5)
+            return response(successful_gemini_response())
+
+        session = Mock()
+        session.get.side_effect = get
+        policy = no_wait_policy(GEMINI, hedge=True)
+        for _ in range(30):
+            policy.latency.record(0.01)
+        rate_limiter = Mock()
+        client = GeminiClient(session=session, policy=policy, rate_limiter=rate_limiter)
+
+        try:
+            assert client.get_order_book(product="BTCUSD") == successful_gemini_response()
+        finally:
+            released.set()
+
+        assert rate_limiter.acquire.call_count == 2
+
+    @pytest.mark.parametrize(
+        ["headers", "expected_sleep"],
+        [({"Retry-After": "3"}, 3.0), ({"Retry-After": "120"}, None)],
+    )
+    def test_too_many_requests_honours_retry_after(self, mocker, headers, expected_sleep):
+        session = Mock()
+        session.get.side_effect = [
+            response(status_code=HTTPStatus.TOO_MANY_REQUESTS, headers=headers),
+            response(successful_gemini_response()),
+        ]
+        mock_sleep = mocker.patch("orderbooks.integrations.exchanges.time.sleep")
+        client = GeminiClient(session=session, policy=no_wait_policy(GEMINI))
+
+        if expected_sleep is None:
+            with pytest.raises(ExchangeResponseError) as err:
+                client.get_order_book(product="BTCUSD")
+            assert err.value.retry_after == 120
+            mock_sleep.assert_not_called()
+        else:
+            assert client.get_order_book(product="BTCUSD") == successful_gemini_response()
+            mock_sleep.assert_called_once_with(expected_sleep)
+
+    @pytest.mark.parametrize(
+        ["value", "expected_seconds"],
+        [
+            (None, None),
+            ("5", 5.0),
+            (" 0 ", 0.0),
+            ("soon", None),
+            ("Wed, 21 Oct 2015 07:28:00 GMT", 0.0),
+        ],
+    )
+    def test_retry_after(self, value, expected_seconds):
+        headers = {} if value is None else {"Retry-After": value}
+
+        assert retry_after(response(headers=headers)) == expected_seconds
+
+    def test_retry_after_http_date(self):
+        date = email.utils.formatdate(time.time() + 30, usegmt=True)
+
+        assert 28 <= retry_after(response(headers={"Retry-After": date})) <= 30
+
+    @pytest.mark.parametrize(
+        ["timeout", "max_timeout"], [((3.05, 10), 1), ((0.5, 10), 1), (10, 1), (None, 1)]
+    )
+    def test_deadline_cuts_the_request_timeout(self, timeout, max_timeout):
+        session = Mock()
+        session.get.return_value = response(successful_gemini_response())
+        client = GeminiClient(
+            session=session,
+            timeout=timeout,
+            policy=no_wait_policy(GEMINI),
+            deadline=time.monotonic() + max_timeout,
+        )
+
+        client.get_order_book(product="BTCUSD")
+
+        sent_timeout = session.get.call_args.kwargs["timeout"]
+        if isinstance(timeout, tuple):
+            assert sent_timeout[0] <= timeout[0]
+            assert all(0 < value <= max_timeout for value in sent_timeout)
+        else:
+            assert 0 < sent_timeout <= max_timeout
+
+    def test_no_request_past_the_deadline(self):
+        session = Mock()
+        policy = no_wait_policy(GEMINI)
+        client = GeminiClient(
+            session=session, policy=policy, deadline=time.monotonic() - 1
+        )
+
+        with pytest.raises(ExchangeDeadlineError) as err:
+            client.get_order_book(product="BTCUSD")
+
+        assert not err.value.retryable
+        session.get.assert_not_called()
+        assert policy.breaker.failures == 0
+
+    def test_no_retry_past_the_deadline(self, mocker):
+        session = Mock()
+        session.get.side_effect = Timeout("read timed out")
+        policy = no_wait_policy(GEMINI)
+        mocker.patch.object(policy, "backoff", return_value=5)
+        mock_sleep = mocker.patch("orderbooks.integrations.exchanges.time.sleep")
+        client = GeminiClient(
+            session=session, policy=policy, deadline=time.monotonic() + 1
+        )
+
+        with pytest.raises(ExchangeTimeoutError):
+            client.get_order_book(product="BTCUSD")
+
+        assert session.get.call_count == 1
+        mock_sleep.assert_not_called()
+
+    def test_clients_share_the_exchange_policy(self):
+        session = Mock()
+        session.get.return_value = response(successful_gemini_response())
+
+        client = GeminiClient(session=session)
+
+        assert client.policy is get_policy(GEMINI)
+        assert GeminiClient(session=session).policy is client.policy
+        start = time.perf_counter()
+        client.get_order_book(product="BTCUSD")
+        assert client.policy.latency.latencies[0] <= time.perf_counter() - start
@@ -0,0 +1,46 @@
+from unittest.mock import Mock
+
+import pytest
+
+from orderbooks.integrations.constants import (COINBASE, EXCHANGE_POOL_SIZES,
+                                               KRAKEN)
+from orderbooks.integrations.exchanges import CoinBaseClient
+from orderbooks.integrations.sessions import (close_sessions, create_session,
+                                              get_session, set_session)
+
+
+class TestSessions:
+    @pytest.fixture(autouse=True)
+    def reset_sessions(self):
+        close_sessions()
+        yield
+        close_sessions()
+
+    def test_create_session_pool_size(self):
+        session = create_session(pool_size=7)
+
+        adapter = session.get_adapter("https://api.exchange.coinbase.com")
+        assert adapter._pool_maxsize == 7
+
+    @pytest.mark.parametrize("exchange", [COINBASE, KRAKEN])
+    def test_get_session_uses_exchange_pool_size(self, exchange):
+        session = get_session(exchange)
+
+        assert session is get_session(exchange)
+        adapter = session.get_adapter("https://example.com")
+        assert adapter._pool_maxsize == EXCHANGE_POOL_SIZES[exchange]
+
+    def test_set_session_is_used_by_clients(self):
+        session = Mock()
+        set_session(COINBASE, session)
+
+        assert CoinBaseClient().session is session
+
+    def test_close_sessions(self):
+        session = Mock()
+        set_session(COINBASE, session)
+
+        close_sessions()
+
+        session.close.assert_called_once_with()
+        assert get_session(COINBASE) is not session
@@ -0,0 +1,145 @@
+import threading
+
+import pytest
+
+from orderbooks.batch import parse_batch, quote_batch
+from orderbooks.integrations.adapters import enabled_adapters
+from orderbooks.integrations.constants import COINBASE, GEMINI, KRAKEN
+from orderbooks.integrations.ratelimit import TokenBucket
+from orderbooks.tests.helpers import (successful_coinbase_response,
+                                      successful_gemini_response,
+                                      successful_kraken_response)
+from orderbooks.utils import (execute_market_order, get_buy_and_sell_prices,
+                              transform_exchange_data)
+
+
+@pytest.fixture(autouse=True)
+def rate_limiters(mocker):
+    """Give every adapter a fresh, unlimited rate limiter."""
+    limiters = {}
+    for adapter in enabled_adapters(optional=[KRAKEN]):
+        limiters[adapter.EXCHANGE] = mocker.patch.object(
+            adapter, "rate_limiter", TokenBucket(rate=1000, capacity=1000)
+        )
+    return limiters
+
+
+@pytest.fixture
+def exchange_responses(mocker):
+    kraken_response = successful_kraken_response()
+    for symbol in ("XETHZUSD", "XLTCZUSD"):
+        kraken_response["result"][symbol] = kraken_response["result"]["XXBTZUSD"]
+    return {
+        GEMINI: mocker.patch(
+            "orderbooks.integrations.exchanges.GeminiClient.get_order_book",
+            return_value=successful_gemini_response(),
+        ),
+        COINBASE: mocker.patch(
+            "orderbooks.integrations.exchanges.CoinBaseClient.get_order_book",
+            return_value=successful_coinbase_response(),
+        ),
+        KRAKEN: mocker.patch(
+            "orderbooks.integrations.exchanges.KrakenClient.get_order_book",
+            return_value=kraken_response,
+        ),
+    }
+
+
+class TestParseBatch:
+    def test_parse_batch(self):
+        lines = [
+            "BTCUSD 1,5\n",
+            "\n",
+            "# comment\n",
+            "ETHUSD 10  # trailing comment\n",
+            "BTCUSD 5,10\n",
+        ]
+
+        assert parse_batch(lines) == {"BTCUSD": [1.0, 5.0, 10.0], "ETHUSD": [10.0]}
+
+    @pytest.mark.parametrize(
+        ["line", "message"],
+        [
+            ("BTCUSD", "Line 2: expected PRODUCT QUANTITY"),
+            ("BTCUSD 1 2", "Line 2: expected PRODUCT QUANTITY"),
+            ("BTCUSD one", "Line 2: expected PRODUCT QUANTITY"),
+            ("DOGEUSD 1", "Line 2: unsupported product DOGEUSD"),
+        ],
+    )
+    def test_parse_batch_invalid_line(self, line, message):
+        with pytest.raises(ValueError, match=message):
+            parse_batch(["BTCUSD 1", line])
+
+
+class TestQuoteBatch:
+    def test_quote_batch(self, exchange_responses, mocker):
+        create_clients = {
+            adapter.EXCHANGE: mocker.spy(adapter, "create_client")
+            for adapter in enabled_adapters(optional=[KRAKEN])
+        }
+        requests = {"BTCUSD": [1.0, 5.0], "ETHUSD": [2.0], "LTCUSD": [0.5]}
+
+        results = list(quote_batch(requests, kraken=True))
+
+        assert sorted(product for product, _, _, _ in results) == sorted(requests)
+        for product, quantities, prices, missing in results:
+            assert quantities == requests[product]
+            assert missing == {}
+            assert prices == get_buy_and_sell_prices(
+                quantities, "BTCUSD", kraken_exchange=True
+            )
+        for exchange, mock_get_order_book in exchange_responses.items():
+            # One request per exchange book, plus the reference quotes above.
+            assert mock_get_order_book.call_count == len(requests) * 2
+            # Only the batch requests take rate limiter tokens.
+            rate_limited = [
+                call.kwargs["rate_limit"]
+                for call in create_clients[exchange].call_args_list
+            ]
+            assert rate_limited.count(True) == len(requests)
+        symbols = [call.args[0] for call in exchange_responses[COINBASE].call_args_list]
+        assert sorted(set(symbols)) == ["BTC-USD", "ETH-USD", "LTC-USD"]
+
+    def test_quote_batch_missing_exchange(self, exchange_responses):
+        exchange_responses[COINBASE].side_effect = Exception("Http Error: 503")
+
+        ((product, quantities, prices, missing),) = quote_batch({"BTCUSD": [1.0]})
+
+        bids, offers = transform_exchange_data(
+            successful_gemini_response(), GEMINI, dict_datatype=True
+        )
+        assert missing == {COINBASE: "Http Error: 503"}
+        assert prices == [
+            (
+                *execute_market_order(1.0, list(offers)),
+                *execute_market_order(1.0, list(bids), bid=True),
+            )
+        ]
+        exchange_responses[KRAKEN].assert_not_called()
+
+    def test_quote_batch_no_exchange(self, exchange_responses):
+        for mock_get_order_book in exchange_responses.values():
+            mock_get_order_book.side_effect = Exception("Connection Error: refused")
+
+        ((product, quantities, prices, missing),) = quote_batch({"ETHUSD": [1.0]})
+
+        assert product == "ETHUSD"
+        assert prices is None
+        assert set(missing) == {GEMINI, COINBASE}
+
+    def test_quote_batch_streams_completed_products(self, exchange_responses):
+        released = threading.Event()
+
+        def gemini_order_book(symbol, params=None):
+            if symbol == "BTCUSD":
+                released.wait(5)
+            return successful_gemini_response()
+
+        exchange_responses[GEMINI].side_effect = gemini_order_book
+        results = quote_batch({"BTCUSD": [1.0], "ETHUSD": [1.0]})
+
+        try:
+            assert next(results)[0] == "ETHUSD"
+        finally:
+            released.set()
+        assert next(results)[0] == "BTCUSD"
@@ -0,0 +1,255 @@
+import random
+from decimal import Decimal
+
+import pytest
+
+from orderbooks.books import (EXCHANGES, MergedBook, MergedSide,
+                              OrderBookSide, exchange_id, merge_runs,
+                              product_decimals, to_ticks)
+from orderbooks.integrations.constants import (COINBASE,
+                                               COINROUTES_GET_PRICE_CHOICES,
+                                               GEMINI, KRAKEN,
+                                               PRODUCT_PRICE_DECIMALS,
+                                               PRODUCT_SIZE_DECIMALS)
+from orderbooks.tests.helpers import random_run, tick_runs
+from orderbooks.utils import (execute_market_order,
+                              execute_market_order_fixed_point)
+
+
+class TestTicks:
+    @pytest.mark.parametrize(
+        ["value", "decimals", "expected_ticks"],
+        [
+            ("39163.70000", 5, 3916370000),
+            ("40071.98", 5, 4007198000),
+            ("0.2", 8, 20000000),
+            ("7", 2, 700),
+            ("-0.5", 2, -50),
+            (100, 5, 10000000),
+            (Decimal("1.539"), 3, 1539),
+            ("1E-8", 8, 1),
+        ],
+    )
+    def test_to_ticks(self, value, decimals, expected_ticks):
+        assert to_ticks(value, decimals) == expected_ticks
+
+    @pytest.mark.parametrize("value", ["0.123", Decimal("0.123"), 0.5])
+    def test_to_ticks_inexact(self, value):
+        with pytest.raises(ValueError):
+            to_ticks(value, 0 if value == 0.5 else 2)
+
+    @pytest.mark.parametrize("product", COINROUTES_GET_PRICE_CHOICES)
+    def test_product_decimals_cover_supported_products(self, product):
+        assert product in PRODUCT_PRICE_DECIMALS
+        assert product in PRODUCT_SIZE_DECIMALS
+        price_decimals, size_decimals = product_decimals(product)
+        # The finest increments the exchanges quote, e.g. Kraken's padded prices.
+        assert to_ticks("39163.70000", price_decimals)
+        assert to_ticks("0.00000001", size_decimals) == 1
+
+    def test_exchange_id(self):
+        assert EXCHANGES[exchange_id(GEMINI)] == GEMINI
+        assert exchange_id("TEST_EXCHANGE") == exchange_id("TEST_EXCHANGE")
+        assert EXCHANGES[exchange_id("TEST_EXCHANGE")] == "TEST_EXCHANGE"
+
+
+class TestOrderBookSide:
+    @pytest.mark.parametrize(
+        ["records", "dict_datatype"],
+        [
+            ([["39163.70000", "1.539", 1], ["39166.6", "0.02", 2]], False),
+            (
+                [
+                    {"price": "39163.70000", "amount": "1.539"},
+                    {"price": "39166.6", "amount": "0.02"},
+                ],
+                True,
+            ),
+        ],
+    )
+    def test_from_records(self, records, dict_datatype):
+        side = OrderBookSide.from_records(
+            records, KRAKEN, dict_datatype, price_decimals=5, size_decimals=8
+        )
+
+        assert list(side.prices) == [3916370000, 3916660000]
+        assert list(side.sizes) == [153900000, 2000000]
+        assert list(side) == [
+            (KRAKEN, Decimal("39163.7"), Decimal("1.539")),
+            (KRAKEN, Decimal("39166.6"), Decimal("0.02")),
+        ]
+        assert side[1] == (KRAKEN, Decimal("39166.6"), Decimal("0.02"))
+        assert len(side) == 2
+        assert side.nbytes() == 2 * 8 + 2 * 8 + 2
+
+    @pytest.mark.parametrize(
+        ["records", "dict_datatype"],
+        [
+            (
+                [["100.5", "1", "a"], ["100.5", "0.25", "b"], ["101", "2", "c"], ["100.5", "1", "d"]],
+                False,
+            ),
+            (
+                [
+                    {"price": "100.5", "amount": "1"},
+                    {"price": "100.5", "amount": "0.25"},
+                    {"price": "101", "amount": "2"},
+                    {"price": "100.5", "amount": "1"},
+                ],
+                True,
+            ),
+        ],
+    )
+    def test_from_records_aggregate(self, records, dict_datatype):
+        side = OrderBookSide.from_records(
+            records, COINBASE, dict_datatype, price_decimals=2, size_decimals=2, aggregate=True
+        )
+
+        # Only consecutive records quoting the same price are merged.
+        assert list(side) == [
+            (COINBASE, Decimal("100.50"), Decimal("1.25")),
+            (COINBASE, Decimal("101.00"), Decimal("2.00")),
+            (COINBASE, Decimal("100.50"), Decimal("1.00")),
+        ]
+
+    def test_append(self):
+        side = OrderBookSide(price_decimals=2, size_decimals=2)
+
+        side.append(exchange_id(COINBASE), 101, 250)
+
+        assert list(side) == [(COINBASE, Decimal("1.01"), Decimal("2.5"))]
+
+    @pytest.mark.parametrize("bid", [True, False])
+    def test_fills_match_tuple_list(self, bid):
+        rng = random.Random(1)
+        runs = [
+            random_run(rng, exchange, bid, 30) for exchange in (GEMINI, COINBASE, KRAKEN)
+        ]
+        sides = [
+            OrderBookSide.from_records(
+                [(price, amount) for _, price, amount in run], run[0][0]
+            )
+            for run in runs
+        ]
+
+        expected = execute_market_order(40, MergedSide(runs, bid=bid), bid=bid)
+        result = execute_market_order(40, MergedSide(sides, bid=bid), bid=bid)
+
+        assert result == expected
+
+
+class TestMergedSide:
+    def test_iter_merges_runs_in_price_order(self):
+        side = MergedSide(
+            [
+                [(GEMINI, Decimal("1"), Decimal("1")), (GEMINI, Decimal("3"), Decimal("1"))],
+                [(COINBASE, Decimal("2"), Decimal("1"))],
+            ]
+        )
+
+        assert [price for _, price, _ in side] == [1, 2, 3]
+        assert len(side) == 3
+
+    @pytest.mark.parametrize("bid", [True, False])
+    def test_equal_prices_keep_run_order(self, bid):
+        side = MergedSide(
+            [
+                [(GEMINI, Decimal("1"), Decimal("1"))],
+                [(COINBASE, Decimal("1"), Decimal("2"))],
+                [(KRAKEN, Decimal("1"), Decimal("3"))],
+            ],
+            bid=bid,
+        )
+
+        assert [exchange for exchange, _, _ in side] == [GEMINI, COINBASE, KRAKEN]
+
+    def test_market_order_only_consumes_needed_levels(self):
+        consumed = []
+
+        def run(exchange):
+            for price in range(1, 1000):
+                consumed.append(exchange)
+                yield exchange, Decimal(price), Decimal("1")
+
+        side = MergedSide([run(GEMINI), run(COINBASE)])
+
+        cost, remaining = execute_market_order(3, side)
+
+        assert (str(cost), remaining) == ("4.00", 0)
+        assert len(consumed) < 10
+
+    @pytest.mark.parametrize("seed", range(20))
+    @pytest.mark.parametrize("bid", [True, False])
+    def test_fills_match_sort_based_path(self, seed, bid):
+        rng = random.Random(seed)
+        runs = [
+            random_run(rng, exchange, bid, rng.randint(1, 40))
+            for exchange in (GEMINI, COINBASE, KRAKEN)
+        ]
+        quantity = rng.choice([0.5, 1, 10, 25.5, 1000])
+
+        flat_order_book = [level for run in runs for level in run]
+        expected = execute_market_order(quantity, flat_order_book, bid=bid)
+
+        merged = execute_market_order(quantity, MergedSide(runs, bid=bid), bid=bid)
+
+        assert merged == expected
+        assert str(merged.fills) == str(expected.fills)
+
+
+class TestMergedBook:
+    @pytest.mark.parametrize("seed", range(10))
+    @pytest.mark.parametrize("bid", [True, False])
+    def test_merge_runs_matches_heap_merge(self, seed, bid):
+        side = MergedSide(tick_runs(random.Random(seed), bid), bid=bid)
+
+        merged = merge_runs(side)
+
+        assert list(merged.iter_ticks()) == list(side.iter_ticks())
+        assert (merged.price_decimals, merged.size_decimals) == (
+            side.price_decimals,
+            side.size_decimals,
+        )
+
+    def test_sides_are_read_only(self):
+        rng = random.Random(0)
+        book = MergedBook.prepare(
+            MergedSide(tick_runs(rng, True), bid=True), MergedSide(tick_runs(rng, False))
+        )
+
+        with pytest.raises(TypeError):
+            book.offers.prices[0] = 1
+        with pytest.raises(AttributeError):
+            book.offers.append(0, 1, 1)
+        with pytest.raises(AttributeError):
+            book.spread = 1
+
+    def test_quotes_reuse_the_prepared_sides(self):
+        rng = random.Random(1)
+        bids = MergedSide(tick_runs(rng, True), bid=True)
+        offers = MergedSide(tick_runs(rng, False))
+        book = MergedBook.prepare(bids, offers)
+        prices = book.offers.prices
+
+        for quantity in (0.5, 10, 25.5, 1000):
+            assert execute_market_order_fixed_point(
+                quantity, book.offers
+            ) == execute_market_order(quantity, offers)
+            assert execute_market_order_fixed_point(
+                quantity, book.bids, bid=True
+            ) == execute_market_order(quantity, bids, bid=True)
+        assert book.offers.prices is prices
+
+    def test_single_side(self):
+        side = OrderBookSide.from_records([["1", "2"], ["3", "4"]], GEMINI)
+
+        merged = merge_runs(side)
+
+        assert list(merged) == list(side)
+        assert merged.prices.readonly
+
+    def test_lazy_runs_are_rejected(self):
+        lazy = MergedSide([iter([(GEMINI, Decimal("1"), Decimal("1"))])])
+
+        with pytest.raises(TypeError):
+            merge_runs(lazy)
@@ -0,0 +1,76 @@
+import pytest
+
+from orderbooks.cache import FULL_DEPTH, SnapshotCache, depth_key
+from orderbooks.integrations.constants import COINBASE, GEMINI, KRAKEN
+from orderbooks.tests.helpers import successful_gemini_response
+
+
+class TestCache:
+    @pytest.mark.parametrize(
+        ["params", "expected_depth"],
+        [
+            (None, FULL_DEPTH),
+            ({}, FULL_DEPTH),
+            ({"level": "2"}, "level=2"),
+            ({"limit_bids": "50", "limit_asks": "50"}, "limit_asks=50&limit_bids=50"),
+        ],
+    )
+    def test_depth_key(self, params, expected_depth):
+        assert depth_key(params) == expected_depth
+
+    def test_get_fresh_snapshot(self, mocker):
+        mock_time = mocker.patch("orderbooks.cache.time.time", return_value=100.0)
+        cache = SnapshotCache(max_age=5)
+        key = (GEMINI, "BTCUSD", FULL_DEPTH)
+
+        assert cache.get(key) is None
+        cache.put(key, successful_gemini_response())
+        mock_time.return_value = 103.0
+
+        assert cache.get(key) == (successful_gemini_response(), 3.0)
+
+    def test_get_stale_snapshot(self, mocker):
+        mock_time = mocker.patch("orderbooks.cache.time.time", return_value=100.0)
+        cache = SnapshotCache(max_age=5)
+        key = (GEMINI, "BTCUSD", FULL_DEPTH)
+        cache.put(key, successful_gemini_response())
+        mock_time.return_value = 105.5
+
+        assert cache.get(key) is None
+        assert cache.get(key, max_age=10) == (successful_gemini_response(), 5.5)
+
+    def test_least_recently_used_snapshot_evicted(self):
+        cache = SnapshotCache(max_age=60, max_entries=2)
+        cache.put((COINBASE, "BTCUSD", FULL_DEPTH), {"bids": [], "asks": []})
+        cache.put((GEMINI, "BTCUSD", FULL_DEPTH), {"bids": [], "asks": []})
+        cache.get((COINBASE, "BTCUSD", FULL_DEPTH))
+        cache.put((KRAKEN, "BTCUSD", FULL_DEPTH), {"bids": [], "asks": []})
+
+        assert cache.get((GEMINI, "BTCUSD", FULL_DEPTH)) is None
+        assert cache.get((COINBASE, "BTCUSD", FULL_DEPTH)) is not None
+        assert cache.get((KRAKEN, "BTCUSD", FULL_DEPTH)) is not None
+
+    def test_disk_tier_shared_between_caches(self, tmp_path, mocker):
+        mock_time = mocker.patch("orderbooks.cache.time.time", return_value=100.0)
+        key = (COINBASE, "BTCUSD", "level=2")
+        SnapshotCache(max_age=5, directory=str(tmp_path)).put(
+            key, {"bids": [["1.5", "2"]], "asks": []}
+        )
+        mock_time.return_value = 101.0
+
+        assert SnapshotCache(max_age=5, directory=str(tmp_path)).get(key) == (
+            {"bids": [["1.5", "2"]], "asks": []},
+            1.0,
+        )
+        assert SnapshotCache(max_age=5).get(key) is None
+        assert [path.name for path in tmp_path.iterdir()] == [
+            "COINBASE_BTCUSD_level%3D2.json"
+        ]
+
+    def test_corrupt_disk_snapshot_ignored(self, tmp_path):
+        cache = SnapshotCache(max_age=5, directory=str(tmp_path))
+        key = (GEMINI, "BTCUSD", FULL_DEPTH)
+        with open(cache.path(key), "w") as snapshot_file:
+            snapshot_file.write("{not json")
+
+        assert cache.get(key) is None
@@ -0,0 +1,152 @@
+import random
+from decimal import Decimal
+
+import pytest
+
+from orderbooks.books import MergedSide, OrderBookSide
+from orderbooks.integrations.constants import KRAKEN
+from orderbooks.tests.helpers import random_book, random_quantity
+from orderbooks.utils import (DepthIndex, execute_market_order,
+                              execute_market_order_fixed_point,
+                              market_order_cost, ticks_floor)
+
+
+class TestFixedPoint:
+    @pytest.mark.parametrize(
+        ["value", "decimals", "expected"],
+        [
+            (Decimal("1.5"), 8, (150000000, True)),
+            (Decimal("10"), 2, (1000, True)),
+            (Decimal("1E+2"), 0, (100, True)),
+            (Decimal("0.123456789"), 8, (12345678, False)),
+            (Decimal(9.2), 8, (919999999, False)),
+            (Decimal("-0.5"), 0, (-1, False)),
+        ],
+    )
+    def test_ticks_floor(self, value, decimals, expected):
+        assert ticks_floor(value, decimals) == expected
+
+    @pytest.mark.parametrize("seed", range(200))
+    def test_matches_decimal_path(self, seed):
+        rng = random.Random(seed)
+        order_book, bid = random_book(rng)
+        quantity = random_quantity(rng)
+
+        expected = execute_market_order(quantity, order_book, bid=bid)
+        report = execute_market_order_fixed_point(quantity, order_book, bid=bid)
+        cost, remaining = report
+
+        assert (type(cost), str(cost)) == (
+            type(expected.total_cost),
+            str(expected.total_cost),
+        )
+        assert (type(remaining), str(remaining)) == (
+            type(expected.remaining),
+            str(expected.remaining),
+        )
+        assert str(report.fills) == str(expected.fills)
+        assert report.levels_consumed == expected.levels_consumed
+        assert report.vwap == expected.vwap
+
+    @pytest.mark.parametrize(
+        ["quantity", "expected_cost", "expected_remaining"],
+        [
+            (4, "65090.54", "2.33800000"),
+            (1.5, "58745.55", "0"),
+            (1.539, "60272.93", "0"),
+            (1.559, "61056.27", "0"),
+            (Decimal("1.559"), "61056.27", "0"),
+        ],
+    )
+    def test_execute_market_order_fixed_point(
+        self, quantity, expected_cost, expected_remaining
+    ):
+        order_book = OrderBookSide.from_records(
+            [["39163.70000", "1.539"], ["39166.60000", "0.020"], ["39167.70000", "0.103"]],
+            KRAKEN,
+            price_decimals=5,
+        )
+
+        cost, remaining = execute_market_order_fixed_point(quantity, order_book)
+
+        assert (str(cost), str(remaining)) == (expected_cost, expected_remaining)
+
+    def test_defers_to_decimal_path_beyond_precision(self, mocker):
+        order_book = OrderBookSide.from_records(
+            [["9" + "0" * 18, "1" + "0" * 10]], KRAKEN, price_decimals=0, size_decimals=0
+        )
+        decimal_path = mocker.patch(
+            "orderbooks.utils.execute_market_order", return_value=(Decimal(1), 0)
+        )
+
+        assert execute_market_order_fixed_point(10**11, order_book) == (Decimal(1), 0)
+        decimal_path.assert_called_once_with(10**11, order_book, bid=False)
+
+
+class TestDepthIndex:
+    @pytest.mark.parametrize("seed", range(100))
+    def test_matches_decimal_path(self, seed, capsys):
+        rng = random.Random(seed)
+        order_book, bid = random_book(rng)
+        index = DepthIndex(order_book)
+
+        for quantity in [random_quantity(rng) for _ in range(10)]:
+            expected_cost, expected_remaining = execute_market_order(
+                quantity, order_book, bid=bid
+            )
+            cost, remaining = index.quote(quantity)
+
+            assert str(cost) == str(expected_cost)
+            assert (type(remaining), str(remaining)) == (
+                type(expected_remaining),
+                str(expected_remaining),
+            )
+
+    def test_prefix_sums(self):
+        order_book = OrderBookSide.from_records(
+            [["10", "1"], ["11", "2"], ["12", "3"]],
+            KRAKEN,
+            price_decimals=0,
+            size_decimals=0,
+        )
+
+        index = DepthIndex(order_book)
+
+        assert len(index) == 3
+        assert index.cumulative_sizes == [0, 1, 3, 6]
+        assert index.cumulative_notionals == [0, 10, 32, 68]
+        assert index.quote(2) == (Decimal("21.00"), 0)
+        assert index.quote(7) == (Decimal("68.00"), Decimal("1"))
+
+    def test_empty_book(self):
+        index = DepthIndex(OrderBookSide())
+
+        assert index.quote(0) == (Decimal("0.00"), Decimal("0"))
+        assert index.quote(10) == (Decimal("0.00"), Decimal("10"))
+
+
+class TestMarketOrderCost:
+    @pytest.mark.parametrize("seed", range(100))
+    def test_matches_decimal_path(self, seed, capsys):
+        rng = random.Random(seed)
+        order_book, bid = random_book(rng)
+        quantity = random_quantity(rng)
+
+        expected_cost, expected_remaining = execute_market_order(
+            quantity, order_book, bid=bid
+        )
+        cost, remaining = market_order_cost(quantity, order_book)
+
+        assert (type(cost), str(cost)) == (type(expected_cost), str(expected_cost))
+        assert (type(remaining), str(remaining)) == (
+            type(expected_remaining),
+            str(expected_remaining),
+        )
+
+    def test_stops_once_filled(self):
+        levels = iter([(0, 10, 1), (0, 11, 2)])
+        order_book = MergedSide([OrderBookSide(price_decimals=0, size_decimals=0)])
+        order_book.iter_ticks = lambda: levels
+
+        assert market_order_cost(1, order_book) == (Decimal("10.00"), 0)
+        assert next(levels) == (0, 11, 2)
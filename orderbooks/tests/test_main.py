@@ -1,9 +1,17 @@
+import subprocess
+import sys
 from decimal import Decimal
+from pathlib import Path
+from unittest.mock import ANY
 
 import pytest
 from click.testing import CliRunner
 
+from orderbooks.integrations.constants import DEFAULT_MAX_WORKERS
 from orderbooks.main import get_prices
+from orderbooks.recording import get_recorder
+from orderbooks.utils import DepthIndex, FillReport
+from orderbooks.vectorized import quote_index
 
 
 class TestMain:
@@ -18,7 +26,7 @@ class TestMain:
         ],
         [
             (
-                (200, 0, 210, 0),
+                ((200, 0), (210, 0)),
                 ["--add-kraken-exchange"],
                 "10.0",
                 "BTCUSD",
@@ -26,7 +34,7 @@ class TestMain:
                 "Sell price for {} {} is",
             ),
             (
-                (300.0, Decimal(5.0), 310.0, Decimal(3.0)),
+                ((300.0, Decimal(5.0)), (310.0, Decimal(3.0))),
                 ["--add-kraken-exchange"],
                 "100.0",
                 "BTCUSD",
@@ -34,7 +42,7 @@ class TestMain:
                 "Sell order of {} {} partially filled",
             ),
             (
-                (300.0, Decimal(5.0), 310.0, 0),
+                ((300.0, Decimal(5.0)), (310.0, 0)),
                 [],
                 "100.0",
                 "BTCUSD",
@@ -42,7 +50,7 @@ class TestMain:
                 "Sell price for {} {} is",
             ),
             (
-                (300.0, 0, 310.0, Decimal(3.0)),
+                ((300.0, 0), (310.0, Decimal(3.0))),
                 [],
                 "100.0",
                 "BTCUSD",
@@ -78,8 +86,76 @@ class TestMain:
             quantity=float(quantity),
             product=product,
             kraken_exchange=bool(add_kraken_exchange),
+            max_workers=DEFAULT_MAX_WORKERS,
+            adaptive_depth=False,
+            stats=ANY,
+            cache=None,
+            deadline=None,
+            fixed_point=False,
+        )
+
+    def test_get_prices_max_workers(self, mocker):
+        runner = CliRunner()
+        mock_get_prices = mocker.patch(
+            "orderbooks.main.get_buy_and_sell_price", return_value=((200, 0), (210, 0))
+        )
+
+        result = runner.invoke(
+            get_prices, ["--quantity", "10", "--product", "BTCUSD", "--max-workers", "1"]
         )
 
+        assert result.exit_code == 0
+        mock_get_prices.assert_called_with(
+            quantity=10.0,
+            product="BTCUSD",
+            kraken_exchange=False,
+            max_workers=1,
+            adaptive_depth=False,
+            stats=ANY,
+            cache=None,
+            deadline=None,
+            fixed_point=False,
+        )
+
+    def test_get_prices_adaptive_depth(self, mocker):
+        runner = CliRunner()
+
+        def get_buy_and_sell_price(stats, **kwargs):
+            stats.record(bytes_transferred=2048, escalations=1)
+            return (200, 0), (210, 0)
+
+        mock_get_prices = mocker.patch(
+            "orderbooks.main.get_buy_and_sell_price", side_effect=get_buy_and_sell_price
+        )
+
+        result = runner.invoke(get_prices, ["--quantity", "10", "--adaptive-depth"])
+
+        assert result.exit_code == 0
+        assert "Fetched 2048 bytes with 1 depth escalations." in result.output
+        assert mock_get_prices.call_args.kwargs["adaptive_depth"]
+
+    def test_get_prices_without_adaptive_depth_omits_bytes(self, mocker):
+        runner = CliRunner()
+        mocker.patch(
+            "orderbooks.main.get_buy_and_sell_price", return_value=((200, 0), (210, 0))
+        )
+
+        result = runner.invoke(get_prices, ["--quantity", "10"])
+
+        assert result.exit_code == 0
+        assert "Fetched" not in result.output
+
+    def test_get_prices_fixed_point(self, mocker):
+        runner = CliRunner()
+        mock_get_prices = mocker.patch(
+            "orderbooks.main.get_buy_and_sell_price", return_value=((200, 0), (210, 0))
+        )
+
+        result = runner.invoke(get_prices, ["--quantity", "10", "--fixed-point"])
+
+        assert result.exit_code == 0
+        assert mock_get_prices.call_args.kwargs["fixed_point"]
+
     def test_get_prices_unsupported_product(self, mocker):
         runner = CliRunner()
         mock_get_prices = mocker.patch("orderbooks.main.get_buy_and_sell_price")
@@ -90,3 +166,593 @@ class TestMain:
         )
         assert "Unsupported product XYZ submitted" in result.output
         mock_get_prices.assert_not_called()
+
+    def test_get_prices_displays_amounts_without_tick_padding(self, mocker):
+        runner = CliRunner()
+        mocker.patch(
+            "orderbooks.main.get_buy_and_sell_price",
+            return_value=(
+                (Decimal("1000.00"), Decimal("38.82202000")),
+                (Decimal("990.00"), Decimal("40.00000000")),
+            ),
+        )
+
+        result = runner.invoke(get_prices, ["--quantity", "40"])
+
+        assert result.exit_code == 0
+        assert result.output.splitlines()[:2] == [
+            "Buy order of 40.0 BTCUSD partially filled. Remaining: 38.82202 BTCUSD."
+            " Price of 1.17798 BTCUSD is 1000.00.",
+            "Sell order of 40.0 BTCUSD partially filled. Remaining: 40 BTCUSD."
+            " Price of 0 BTCUSD is 990.00.",
+        ]
+
+    def test_get_prices_quantity_ladder(self, mocker):
+        runner = CliRunner()
+        mock_get_prices = mocker.patch(
+            "orderbooks.main.get_buy_and_sell_prices",
+            return_value=[
+                (200, 0, 210, 0),
+                (1000, 0, 1050, 0),
+                (2000, Decimal("2.5"), 2100, 0),
+            ],
+        )
+        mock_get_price = mocker.patch("orderbooks.main.get_buy_and_sell_price")
+
+        result = runner.invoke(get_prices, ["--quantity", "1,5,10"])
+
+        assert result.exit_code == 0
+        assert "Buy price for 1.0 BTCUSD is 200." in result.output
+        assert "Sell price for 5.0 BTCUSD is 1050." in result.output
+        assert "Buy order of 10.0 BTCUSD partially filled" in result.output
+        assert "Sell price for 10.0 BTCUSD is 2100." in result.output
+        mock_get_price.assert_not_called()
+        mock_get_prices.assert_called_once_with(
+            quantities=[1.0, 5.0, 10.0],
+            product="BTCUSD",
+            kraken_exchange=False,
+            max_workers=DEFAULT_MAX_WORKERS,
+            adaptive_depth=False,
+            stats=ANY,
+            cache=None,
+            deadline=None,
+            index=DepthIndex,
+        )
+
+    def test_main_imports_numpy_on_demand(self):
+        # A fresh interpreter, as the vectorized tests import NumPy in this one.
+        imported = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, orderbooks.main; print('numpy' in sys.modules)",
+            ],
+            capture_output=True,
+            check=True,
+            cwd=Path(__file__).parents[2],
+            text=True,
+        )
+
+        assert imported.stdout.strip() == "False"
+
+    def test_get_prices_vectorized(self, mocker):
+        runner = CliRunner()
+        mock_get_prices = mocker.patch(
+            "orderbooks.main.get_buy_and_sell_prices", return_value=[(200, 0, 210, 0)]
+        )
+        mock_get_price = mocker.patch("orderbooks.main.get_buy_and_sell_price")
+
+        result = runner.invoke(get_prices, ["--quantity", "1", "--vectorized"])
+
+        assert result.exit_code == 0
+        assert "Buy price for 1.0 BTCUSD is 200." in result.output
+        assert "Sell price for 1.0 BTCUSD is 210." in result.output
+        mock_get_price.assert_not_called()
+        mock_get_prices.assert_called_once_with(
+            quantities=[1.0],
+            product="BTCUSD",
+            kraken_exchange=False,
+            max_workers=DEFAULT_MAX_WORKERS,
+            adaptive_depth=False,
+            stats=ANY,
+            cache=None,
+            deadline=None,
+            index=quote_index,
+        )
+
+    @pytest.mark.parametrize(
+        ["fill_report", "expected_output"],
+        [
+            (
+                "text",
+                [
+                    "Buy fills: Filled 1.5 for 150.00 at a VWAP of 100.00 over 2 levels."
+                    " Per exchange: GEMINI 1 up to 99, KRAKEN 0.5 up to 102.",
+                    "Sell fills: Nothing filled, 1.5 remaining.",
+                ],
+            ),
+            (
+                "json",
+                [
+                    '{"side": "buy", "product": "BTCUSD", "quantity": 1.5,'
+                    ' "total_cost": "150.00", "remaining": "0", "vwap": "100.00",'
+                    ' "levels_consumed": 2, "fills": {"GEMINI": {"amount": "1",'
+                    ' "last_price": "99"}, "KRAKEN": {"amount": "0.5", "last_price": "102"}}}',
+                    '{"side": "sell", "product": "BTCUSD", "quantity": 1.5,'
+                    ' "total_cost": "0.00", "remaining": "1.5", "vwap": null,'
+                    ' "levels_consumed": 0, "fills": {}}',
+                ],
+            ),
+        ],
+    )
+    def test_get_prices_fill_report(self, mocker, fill_report, expected_output):
+        runner = CliRunner()
+        buy_report = FillReport(
+            Decimal("150.00"),
+            0,
+            {
+                "GEMINI": [Decimal("1"), Decimal("99")],
+                "COINBASE": [0, 0],
+                "KRAKEN": [Decimal("0.5"), Decimal("102")],
+            },
+            levels_consumed=2,
+            vwap=Decimal("100"),
+        )
+        sell_report = FillReport(Decimal("0.00"), Decimal("1.5"), {"GEMINI": [0, 0]})
+        mocker.patch(
+            "orderbooks.main.get_buy_and_sell_price",
+            return_value=(buy_report, sell_report),
+        )
+
+        result = runner.invoke(
+            get_prices, ["--quantity", "1.5", "--fill-report", fill_report]
+        )
+
+        assert result.exit_code == 0
+        assert "Buy price for 1.5 BTCUSD is 150.00." in result.output
+        for line in expected_output:
+            assert line in result.output.splitlines()
+
+    def test_get_prices_fill_report_needs_single_quantity(self, mocker):
+        runner = CliRunner()
+        mock_get_prices = mocker.patch("orderbooks.main.get_buy_and_sell_prices")
+
+        result = runner.invoke(get_prices, ["--quantity", "1,5", "--fill-report", "text"])
+
+        assert result.exit_code == 2
+        assert "fill reports are only available" in result.output
+        mock_get_prices.assert_not_called()
+
+    @pytest.mark.parametrize(
+        ["quantity", "expected_error"],
+        [
+            ("1,five", "is not a comma separated list of quantities"),
+            ("-1", "holds a quantity that is not positive"),
+            ("0", "holds a quantity that is not positive"),
+            ("nan", "holds a quantity that is not positive"),
+            ("inf", "holds a quantity that is not positive"),
+        ],
+    )
+    def test_get_prices_invalid_quantity(self, mocker, quantity, expected_error):
+        runner = CliRunner()
+        mock_get_price = mocker.patch("orderbooks.main.get_buy_and_sell_price")
+        mock_get_prices = mocker.patch("orderbooks.main.get_buy_and_sell_prices")
+
+        result = runner.invoke(get_prices, ["--quantity", quantity])
+
+        assert result.exit_code == 2
+        assert expected_error in result.output
+        mock_get_price.assert_not_called()
+        mock_get_prices.assert_not_called()
+
+    def test_get_prices_max_fillable_quantities(self, mocker):
+        runner = CliRunner()
+        mock_get_quantities = mocker.patch(
+            "orderbooks.main.get_max_fillable_quantities",
+            return_value=(
+                (Decimal("2.5"), Decimal("100000.00"), {"GEMINI": [Decimal("2.5"), 40000]}),
+                None,
+            ),
+        )
+        mock_get_price = mocker.patch("orderbooks.main.get_buy_and_sell_price")
+
+        result = runner.invoke(get_prices, ["--buy-limit-price", "40000"])
+
+        assert result.exit_code == 0
+        assert (
+            "Can buy 2.5 BTCUSD within the price limits for 100000.00."
+            " Per exchange: GEMINI 2.5 up to 40000."
+        ) in result.output
+        assert "Can sell" not in result.output
+        mock_get_price.assert_not_called()
+        mock_get_quantities.assert_called_once_with(
+            product="BTCUSD",
+            kraken_exchange=False,
+            buy_limit_price=Decimal("40000"),
+            sell_limit_price=None,
+            max_slippage_bps=None,
+            max_workers=DEFAULT_MAX_WORKERS,
+            stats=ANY,
+            cache=None,
+            deadline=None,
+        )
+
+    @pytest.mark.parametrize(
+        ["option", "value", "expected_error"],
+        [
+            ("--buy-limit-price", "abc", "is not a decimal price"),
+            ("--sell-limit-price", "1,5", "is not a decimal price"),
+            ("--buy-limit-price", "0", "is not a positive price"),
+            ("--sell-limit-price", "NaN", "is not a positive price"),
+            ("--buy-limit-price", "Infinity", "is not a positive price"),
+        ],
+    )
+    def test_get_prices_invalid_limit_price(self, mocker, option, value, expected_error):
+        runner = CliRunner()
+        mock_get_quantities = mocker.patch("orderbooks.main.get_max_fillable_quantities")
+
+        result = runner.invoke(get_prices, [option, value])
+
+        assert result.exit_code == 2
+        assert expected_error in result.output
+        mock_get_quantities.assert_not_called()
+
+    def test_get_prices_max_fillable_quantities_sell(self, mocker):
+        runner = CliRunner()
+        mocker.patch(
+            "orderbooks.main.get_max_fillable_quantities",
+            return_value=(
+                None,
+                (
+                    Decimal("1.50000000"),
+                    Decimal("58745.55"),
+                    {
+                        "GEMINI": [Decimal("0.14939000"), Decimal("39170.00000")],
+                        "KRAKEN": [0, 0],
+                        "COINBASE": [Decimal("1.35061000"), Decimal("39163.70000")],
+                    },
+                ),
+            ),
+        )
+
+        result = runner.invoke(get_prices, ["--sell-limit-price", "39000.5"])
+
+        assert result.exit_code == 0
+        assert (
+            "Can sell 1.5 BTCUSD within the price limits for 58745.55."
+            " Per exchange: GEMINI 0.14939 up to 39170, COINBASE 1.35061 up to 39163.7."
+        ) in result.output
+
+    def test_get_prices_from_server(self, mocker):
+        runner = CliRunner()
+        mock_client = mocker.patch("orderbooks.main.QuoteClient")
+        mock_client.return_value.get_buy_and_sell_prices.return_value = [
+            (200, 0, 210, 0),
+            (1000, 0, 1050, Decimal("1.5")),
+        ]
+        mock_get_price = mocker.patch("orderbooks.main.get_buy_and_sell_price")
+
+        result = runner.invoke(
+            get_prices, ["--quantity", "1,5", "--server", "http://127.0.0.1:8765"]
+        )
+
+        assert result.exit_code == 0
+        assert "Buy price for 1.0 BTCUSD is 200." in result.output
+        assert "Sell order of 5.0 BTCUSD partially filled" in result.output
+        mock_client.assert_called_once_with("http://127.0.0.1:8765")
+        mock_client.return_value.get_buy_and_sell_prices.assert_called_once_with(
+            [1.0, 5.0], "BTCUSD"
+        )
+        mock_get_price.assert_not_called()
+
+    def test_get_prices_snapshot_cache(self, mocker, tmp_path):
+        runner = CliRunner()
+
+        def get_buy_and_sell_price(**kwargs):
+            kwargs["stats"].record_cache_hit("GEMINI", 2.25)
+            return (200, 0), (210, 0)
+
+        mock_get_prices = mocker.patch(
+            "orderbooks.main.get_buy_and_sell_price", side_effect=get_buy_and_sell_price
+        )
+
+        result = runner.invoke(
+            get_prices,
+            ["--quantity", "10", "--cache-max-age", "5", "--cache-dir", str(tmp_path)],
+        )
+
+        assert result.exit_code == 0
+        assert "Used the cached GEMINI order book, 2.2 seconds old." in result.output
+        cache = mock_get_prices.call_args.kwargs["cache"]
+        assert cache.max_age == 5
+        assert cache.directory == str(tmp_path)
+
+    def test_get_prices_memory_snapshot_cache(self, mocker):
+        runner = CliRunner()
+        mock_get_prices = mocker.patch(
+            "orderbooks.main.get_buy_and_sell_price", return_value=((200, 0), (210, 0))
+        )
+
+        result = runner.invoke(
+            get_prices, ["--quantity", "10", "--cache-max-age", "5", "--no-disk-cache"]
+        )
+
+        assert result.exit_code == 0
+        assert "Used the cached" not in result.output
+        assert mock_get_prices.call_args.kwargs["cache"].directory is None
+
+    def test_get_prices_deadline(self, mocker):
+        runner = CliRunner()
+
+        def get_buy_and_sell_price(**kwargs):
+            kwargs["stats"].record_missing("KRAKEN", "no response within 250 ms")
+            return (300.0, Decimal(5.0)), (310.0, 0)
+
+        mock_get_prices = mocker.patch(
+            "orderbooks.main.get_buy_and_sell_price", side_effect=get_buy_and_sell_price
+        )
+
+        result = runner.invoke(
+            get_prices,
+            ["--quantity", "100", "--add-kraken-exchange", "--deadline-ms", "250"],
+        )
+
+        assert result.exit_code == 0
+        assert mock_get_prices.call_args.kwargs["deadline"] == 0.25
+        assert "Buy order of 100.0 BTCUSD partially filled" in result.output
+        assert (
+            "Quoted without the KRAKEN order book: no response within 250 ms."
+            in result.output
+        )
+
+    def test_get_prices_hedge_requests(self, mocker):
+        runner = CliRunner()
+        mocker.patch(
+            "orderbooks.main.quote_batch",
+            return_value=iter([("BTCUSD", [1.0], [(200, 0, 210, 0)], {})]),
+        )
+        mock_enable_hedging = mocker.patch("orderbooks.main.enable_hedging")
+
+        result = runner.invoke(
+            get_prices, ["--batch", "-", "--hedge-requests"], input="BTCUSD 1\n"
+        )
+
+        assert result.exit_code == 0
+        mock_enable_hedging.assert_called_once_with()
+
+    def test_get_prices_hedge_requests_without_batch(self, mocker):
+        runner = CliRunner()
+        mock_get_price = mocker.patch("orderbooks.main.get_buy_and_sell_price")
+        mock_enable_hedging = mocker.patch("orderbooks.main.enable_hedging")
+
+        result = runner.invoke(get_prices, ["--quantity", "10", "--hedge-requests"])
+
+        assert result.exit_code == 2
+        assert "hedged requests are only available with --batch" in result.output
+        mock_get_price.assert_not_called()
+        mock_enable_hedging.assert_not_called()
+
+    def test_get_prices_batch(self, mocker):
+        runner = CliRunner()
+        mock_quote_batch = mocker.patch(
+            "orderbooks.main.quote_batch",
+            return_value=iter(
+                [
+                    ("ETHUSD", [2.0], [(7000, 0, 6900, 0)], {}),
+                    ("BTCUSD", [1.0], None, {"GEMINI": "Http Error: 503"}),
+                ]
+            ),
+        )
+
+        result = runner.invoke(
+            get_prices,
+            ["--batch", "-", "--add-kraken-exchange"],
+            input="BTCUSD 1\nETHUSD 2\n",
+        )
+
+        assert result.exit_code == 0
+        assert result.output.splitlines()[:4] == [
+            "Buy price for 2.0 ETHUSD is 7000.",
+            "Sell price for 2.0 ETHUSD is 6900.",
+            "Quoted BTCUSD without the GEMINI order book: Http Error: 503.",
+            "No order book fetched for BTCUSD.",
+        ]
+        mock_quote_batch.assert_called_once_with(
+            {"BTCUSD": [1.0], "ETHUSD": [2.0]}, kraken=True, stats=ANY, cache=None
+        )
+
+    def test_get_prices_batch_invalid(self, mocker):
+        runner = CliRunner()
+        mock_quote_batch = mocker.patch("orderbooks.main.quote_batch")
+
+        result = runner.invoke(get_prices, ["--batch", "-"], input="DOGEUSD 1\n")
+
+        assert result.exit_code == 2
+        assert "Line 1: unsupported product DOGEUSD" in result.output
+        mock_quote_batch.assert_not_called()
+
+    def test_get_prices_batch_processes(self, mocker):
+        runner = CliRunner()
+        mock_quote_batch = mocker.patch("orderbooks.main.quote_batch")
+        mock_quote_sharded = mocker.patch(
+            "orderbooks.main.quote_sharded",
+            return_value=iter([("BTCUSD", [1.0], [(200, 0, 210, 0)], {})]),
+        )
+
+        result = runner.invoke(
+            get_prices, ["--batch", "-", "--processes", "4"], input="BTCUSD 1\n"
+        )
+
+        assert result.exit_code == 0
+        assert "Buy price for 1.0 BTCUSD is 200." in result.output
+        mock_quote_sharded.assert_called_once_with(
+            {"BTCUSD": [1.0]}, processes=4, kraken=False, stats=ANY, hedge=False
+        )
+        mock_quote_batch.assert_not_called()
+
+    @pytest.mark.parametrize(
+        ["args", "option"],
+        [
+            (["--adaptive-depth"], "--adaptive-depth"),
+            (["--deadline-ms", "100"], "--deadline-ms"),
+            (["--fixed-point"], "--fixed-point"),
+            (["--vectorized"], "--vectorized"),
+            (["--buy-limit-price", "100"], "--buy-limit-price"),
+            (["--sell-limit-price", "100"], "--sell-limit-price"),
+            (["--max-slippage-bps", "10"], "--max-slippage-bps"),
+            (["--server", "http://127.0.0.1:8080"], "--server"),
+        ],
+    )
+    def test_get_prices_batch_unsupported_options(self, mocker, args, option):
+        runner = CliRunner()
+        mock_quote_batch = mocker.patch("orderbooks.main.quote_batch")
+
+        result = runner.invoke(get_prices, ["--batch", "-", *args], input="BTCUSD 1\n")
+
+        assert result.exit_code == 2
+        assert f"{option} is not supported with --batch" in result.output
+        mock_quote_batch.assert_not_called()
+
+    @pytest.mark.parametrize(
+        ["args", "option"],
+        [
+            (["--add-kraken-exchange"], "--add-kraken-exchange"),
+            (["--max-workers", "1"], "--max-workers"),
+            (["--adaptive-depth"], "--adaptive-depth"),
+            (["--fixed-point"], "--fixed-point"),
+            (["--vectorized"], "--vectorized"),
+            (["--buy-limit-price", "100"], "--buy-limit-price"),
+            (["--max-slippage-bps", "10"], "--max-slippage-bps"),
+            (["--cache-max-age", "5"], "--cache-max-age"),
+            (["--deadline-ms", "100"], "--deadline-ms"),
+            (["--processes", "2"], "--processes"),
+            (["--record", "snapshots.jsonl.gz"], "--record"),
+        ],
+    )
+    def test_get_prices_server_unsupported_options(self, mocker, args, option):
+        runner = CliRunner()
+        mock_client = mocker.patch("orderbooks.main.QuoteClient")
+
+        result = runner.invoke(
+            get_prices, ["--server", "http://127.0.0.1:8080", "--quantity", "1", *args]
+        )
+
+        assert result.exit_code == 2
+        assert f"{option} is not supported with --server" in result.output
+        mock_client.assert_not_called()
+        assert get_recorder() is None
+
+    def test_get_prices_cache_processes(self, mocker):
+        runner = CliRunner()
+        mock_quote_sharded = mocker.patch("orderbooks.main.quote_sharded")
+
+        result = runner.invoke(
+            get_prices,
+            ["--batch", "-", "--processes", "2", "--cache-max-age", "5"],
+            input="BTCUSD 1\n",
+        )
+
+        assert result.exit_code == 2
+        assert "the snapshot cache is not supported with --processes" in result.output
+        mock_quote_sharded.assert_not_called()
+
+    def test_get_prices_record(self, mocker, tmp_path):
+        runner = CliRunner()
+        path = tmp_path / "snapshots.jsonl.gz"
+        mocker.patch(
+            "orderbooks.main.get_buy_and_sell_price", return_value=((200, 0), (210, 0))
+        )
+
+        result = runner.invoke(get_prices, ["--quantity", "10", "--record", str(path)])
+
+        assert result.exit_code == 0
+        assert f"Recorded 0 order book snapshots to {path}." in result.output
+        assert get_recorder() is None
+
+    def test_get_prices_record_processes(self, mocker, tmp_path):
+        runner = CliRunner()
+        mock_quote_sharded = mocker.patch("orderbooks.main.quote_sharded")
+
+        result = runner.invoke(
+            get_prices,
+            ["--batch", "-", "--processes", "2", "--record", str(tmp_path / "a.gz")],
+            input="BTCUSD 1\n",
+        )
+
+        assert result.exit_code == 2
+        assert "recording is not supported with --processes" in result.output
+        mock_quote_sharded.assert_not_called()
+        assert get_recorder() is None
+
+    def test_get_prices_aggregated_levels(self, mocker):
+        runner = CliRunner()
+
+        def get_buy_and_sell_price(**kwargs):
+            kwargs["stats"].record_aggregation("COINBASE", 1200, 300)
+            kwargs["stats"].record_aggregation("GEMINI", 100, 100)
+            return (200, 0), (210, 0)
+
+        mocker.patch(
+            "orderbooks.main.get_buy_and_sell_price", side_effect=get_buy_and_sell_price
+        )
+
+        result = runner.invoke(get_prices, ["--quantity", "10", "--fixed-point"])
+
+        assert result.exit_code == 0
+        assert (
+            "Aggregated 1200 COINBASE order book records into 300 price levels."
+            in result.output
+        )
+        assert "GEMINI order book records" not in result.output
+
+    def test_get_prices_preparation_timings(self, mocker):
+        runner = CliRunner()
+
+        def get_buy_and_sell_prices(**kwargs):
+            kwargs["stats"].record_preparation(0.0125)
+            kwargs["stats"].record_quotes(4, 0.0002)
+            return [(200, 0, 210, 0), (2000, 0, 2100, 0)]
+
+        mocker.patch(
+            "orderbooks.main.get_buy_and_sell_prices", side_effect=get_buy_and_sell_prices
+        )
+
+        result = runner.invoke(get_prices, ["--quantity", "1,10"])
+
+        assert result.exit_code == 0
+        assert (
+            "Prepared the merged order book in 12.50 ms,"
+            " then priced 4 orders in 0.20 ms (50.0 us per order)." in result.output
+        )
+
+    def test_get_prices_without_preparation(self, mocker):
+        runner = CliRunner()
+        mocker.patch(
+            "orderbooks.main.get_buy_and_sell_price", return_value=((200, 0), (210, 0))
+        )
+
+        result = runner.invoke(get_prices, ["--quantity", "1"])
+
+        assert result.exit_code == 0
+        assert "Prepared the merged order book" not in result.output
+
+    def test_get_prices_truncated_records(self, mocker):
+        runner = CliRunner()
+
+        def get_buy_and_sell_prices(**kwargs):
+            kwargs["stats"].record_truncation("KRAKEN", 200, 20)
+            kwargs["stats"].record_truncation("GEMINI", 10, 10)
+            return [(200, 0, 210, 0), (2000, 0, 2100, 0)]
+
+        mocker.patch(
+            "orderbooks.main.get_buy_and_sell_prices", side_effect=get_buy_and_sell_prices
+        )
+
+        result = runner.invoke(get_prices, ["--quantity", "1,10"])
+
+        assert result.exit_code == 0
+        assert (
+            "Pruned 180 of 200 KRAKEN order book records beyond the reach of the quantity."
+            in result.output
+        )
+        assert "GEMINI order book records" not in result.output
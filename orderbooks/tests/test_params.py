@@ -0,0 +1,49 @@
+from decimal import Decimal
+
+import click
+import pytest
+
+from orderbooks.params import LimitPrice, QuantityList
+
+
+class TestParams:
+    @pytest.mark.parametrize(
+        ["value", "expected_quantities"],
+        [("16", [16.0]), ("1,5,10.5", [1.0, 5.0, 10.5]), ([2.0], [2.0])],
+    )
+    def test_quantity_list(self, value, expected_quantities):
+        assert QuantityList().convert(value, None, None) == expected_quantities
+
+    @pytest.mark.parametrize(
+        ["value", "expected_error"],
+        [
+            ("1,five", "is not a comma separated list"),
+            ("-1", "holds a quantity that is not positive"),
+            ("1,0", "holds a quantity that is not positive"),
+            ("nan", "holds a quantity that is not positive"),
+            ("5,inf", "holds a quantity that is not positive"),
+        ],
+    )
+    def test_quantity_list_invalid(self, value, expected_error):
+        with pytest.raises(click.BadParameter, match=expected_error):
+            QuantityList().convert(value, None, None)
+
+    @pytest.mark.parametrize(
+        ["value", "expected_price"],
+        [("40000.50", Decimal("40000.50")), (Decimal("1"), Decimal("1"))],
+    )
+    def test_limit_price(self, value, expected_price):
+        assert LimitPrice().convert(value, None, None) == expected_price
+
+    @pytest.mark.parametrize(
+        ["value", "expected_error"],
+        [
+            ("cheap", "is not a decimal price"),
+            ("0", "is not a positive price"),
+            ("-5", "is not a positive price"),
+            ("NaN", "is not a positive price"),
+        ],
+    )
+    def test_limit_price_invalid(self, value, expected_error):
+        with pytest.raises(click.BadParameter, match=expected_error):
+            LimitPrice().convert(value, None, None)
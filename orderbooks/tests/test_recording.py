@@ -0,0 +1,122 @@
+import gzip
+
+import pytest
+
+from orderbooks.integrations.adapters import get_adapter
+from orderbooks.integrations.constants import COINBASE, GEMINI, KRAKEN
+from orderbooks.recording import (SnapshotRecorder, get_recorder,
+                                  read_snapshots, start_recording,
+                                  stop_recording)
+from orderbooks.tests.helpers import (successful_coinbase_response,
+                                      successful_gemini_response,
+                                      successful_kraken_response)
+from orderbooks.utils import get_exchange_data
+
+
+@pytest.fixture
+def exchange_responses(mocker):
+    for client, response in (
+        ("GeminiClient", successful_gemini_response()),
+        ("CoinBaseClient", successful_coinbase_response()),
+        ("KrakenClient", successful_kraken_response()),
+    ):
+        mocker.patch(
+            f"orderbooks.integrations.exchanges.{client}.get_order_book",
+            return_value=response,
+        )
+
+
+class TestRecording:
+    @pytest.mark.parametrize(
+        ["exchange", "payload", "expected_fields"],
+        [
+            (
+                COINBASE,
+                successful_coinbase_response(),
+                (72012524197, "2024-01-24T15:47:18.850950Z"),
+            ),
+            (GEMINI, successful_gemini_response(), (None, 1706044291)),
+            (KRAKEN, successful_kraken_response(), (None, 1706044375)),
+            (KRAKEN, {"error": ["EGeneral:Too many requests"]}, (None, None)),
+        ],
+    )
+    def test_snapshot_fields(self, exchange, payload, expected_fields):
+        assert get_adapter(exchange).snapshot_fields(payload) == expected_fields
+
+    def test_recorder_appends_batches(self, tmp_path):
+        path = tmp_path / "snapshots.jsonl.gz"
+        for fetched_at in (1.0, 2.0):
+            recorder = SnapshotRecorder(path, batch_size=2).start()
+            for exchange in (GEMINI, COINBASE, GEMINI):
+                payload = (
+                    successful_gemini_response()
+                    if exchange == GEMINI
+                    else successful_coinbase_response()
+                )
+                recorder.record(exchange, "BTCUSD", None, payload, fetched_at, 0.25)
+            recorder.stop()
+            assert recorder.recorded == 3
+
+        records = list(read_snapshots(path))
+        assert [(record["exchange"], record["fetched_at"]) for record in records] == [
+            (GEMINI, 1.0),
+            (COINBASE, 1.0),
+            (GEMINI, 1.0),
+            (GEMINI, 2.0),
+            (COINBASE, 2.0),
+            (GEMINI, 2.0),
+        ]
+        assert records[1] == {
+            "exchange": COINBASE,
+            "product": "BTCUSD",
+            "params": None,
+            "fetched_at": 1.0,
+            "latency": 0.25,
+            "sequence": 72012524197,
+            "exchange_time": "2024-01-24T15:47:18.850950Z",
+            "payload": successful_coinbase_response(),
+        }
+        assert [record["fetched_at"] for record in read_snapshots(path, COINBASE)] == [
+            1.0,
+            2.0,
+        ]
+        # Two recordings of two batches each, every batch its own gzip member.
+        assert path.read_bytes().count(b"\x1f\x8b\x08") == 4
+
+    def test_recorder_flushes_after_interval(self, tmp_path):
+        path = tmp_path / "snapshots.jsonl.gz"
+        recorder = SnapshotRecorder(path, flush_interval=0.01).start()
+        recorder.record(GEMINI, "BTCUSD", None, successful_gemini_response(), 1.0, 0.1)
+
+        for _ in range(500):
+            if recorder.recorded:
+                break
+            recorder._thread.join(0.01)
+
+        assert recorder.recorded == 1
+        assert len(list(read_snapshots(path))) == 1
+        recorder.stop()
+
+    def test_record_fetched_order_books(self, tmp_path, exchange_responses):
+        path = tmp_path / "snapshots.jsonl.gz"
+        start_recording(path)
+
+        get_exchange_data(product="BTCUSD", kraken=True, quantity=1)
+        recorder = stop_recording()
+
+        assert get_recorder() is None
+        assert recorder.recorded == 3
+        records = {record["exchange"]: record for record in read_snapshots(path)}
+        assert records[KRAKEN]["payload"] == successful_kraken_response()
+        assert records[KRAKEN]["params"] == {"count": "100"}
+        assert records[COINBASE]["sequence"] == 72012524197
+        assert all(record["latency"] >= 0 for record in records.values())
+        with gzip.open(path, "rt") as store:
+            assert len(store.read().splitlines()) == 3
+
+    def test_not_recording(self, exchange_responses):
+        assert stop_recording() is None
+
+        get_exchange_data(product="BTCUSD")
+
+        assert get_recorder() is None
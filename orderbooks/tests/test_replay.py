@@ -0,0 +1,209 @@
+from decimal import Decimal
+
+import pytest
+from click.testing import CliRunner
+
+from orderbooks.books import MergedSide, OrderBookSide
+from orderbooks.integrations.constants import COINBASE, GEMINI, KRAKEN
+from orderbooks.recording import SnapshotRecorder
+from orderbooks.replay import (SnapshotFile, SnapshotWriter, cli,
+                               convert_recording, replay, replay_file,
+                               replay_files)
+from orderbooks.tests.helpers import (successful_coinbase_response,
+                                      successful_gemini_response,
+                                      successful_kraken_response)
+from orderbooks.utils import get_buy_and_sell_prices
+
+
+def side(records, exchange):
+    return OrderBookSide.from_records(records, exchange, price_decimals=5)
+
+
+BIDS = MergedSide(
+    [
+        side([["100", "1"], ["99", "2"]], GEMINI),
+        side([["100", "0.5"], ["98", "3"]], KRAKEN),
+    ],
+    bid=True,
+)
+OFFERS = MergedSide(
+    [side([["101", "1"], ["103", "2"]], GEMINI), side([["102", "0.25"]], KRAKEN)]
+)
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    path = tmp_path / "btcusd.obs"
+    with SnapshotWriter(path, "BTCUSD") as writer:
+        writer.write(10.0, BIDS.iter_ticks(), OFFERS.iter_ticks())
+        writer.write(20.0, [], OFFERS.iter_ticks())
+        writer.write(30.0, BIDS.iter_ticks(), [])
+    return path
+
+
+@pytest.fixture
+def recording_path(tmp_path, mocker):
+    path = tmp_path / "snapshots.jsonl.gz"
+    recorder = SnapshotRecorder(path).start()
+    for exchange, payload, fetched_at in (
+        (GEMINI, successful_gemini_response(), 1.0),
+        (COINBASE, successful_coinbase_response(), 1.5),
+        (KRAKEN, successful_kraken_response(), 1.25),
+    ):
+        recorder.record(exchange, "BTCUSD", None, payload, fetched_at, 0.5)
+    recorder.stop()
+    for client, response in (
+        ("GeminiClient", successful_gemini_response()),
+        ("CoinBaseClient", successful_coinbase_response()),
+        ("KrakenClient", successful_kraken_response()),
+    ):
+        mocker.patch(
+            f"orderbooks.integrations.exchanges.{client}.get_order_book",
+            return_value=response,
+        )
+    return path
+
+
+class TestReplay:
+    def test_read_snapshots(self, snapshot_path):
+        with SnapshotFile(snapshot_path) as snapshots:
+            assert len(snapshots) == 3
+            assert (snapshots.product, snapshots.price_decimals) == ("BTCUSD", 5)
+
+            timestamp, bids, offers = snapshots[0]
+            assert timestamp == 10.0
+            assert list(bids) == list(BIDS)
+            assert list(offers) == list(OFFERS)
+            assert isinstance(bids.prices, memoryview)
+
+            timestamp, bids, offers = snapshots[1]
+            assert (timestamp, len(bids), list(offers)) == (20.0, 0, list(OFFERS))
+            timestamp, bids, offers = snapshots[2]
+            assert (timestamp, list(bids), len(offers)) == (30.0, list(BIDS), 0)
+            del bids, offers
+
+    @pytest.mark.parametrize(
+        ["start", "end", "expected_times"],
+        [
+            (None, None, [10.0, 20.0, 30.0]),
+            (20.0, None, [20.0, 30.0]),
+            (None, 20.0, [10.0]),
+            (15.0, 30.5, [20.0, 30.0]),
+            (40.0, None, []),
+        ],
+    )
+    def test_between(self, snapshot_path, start, end, expected_times):
+        with SnapshotFile(snapshot_path) as snapshots:
+            times = [timestamp for timestamp, _, _ in snapshots.between(start, end)]
+
+        assert times == expected_times
+
+    def test_translates_exchange_ids(self, tmp_path, mocker):
+        path = tmp_path / "btcusd.obs"
+        # A writer numbering GEMINI 0 and KRAKEN 1.
+        mocker.patch("orderbooks.replay.EXCHANGES", [GEMINI, KRAKEN])
+        with SnapshotWriter(path, "BTCUSD") as writer:
+            writer.write(1.0, [(0, 10000000, 100000000)], [(1, 10100000, 100000000)])
+
+        with SnapshotFile(path) as snapshots:
+            _, bids, offers = snapshots[0]
+            assert list(bids) == [(GEMINI, Decimal("100.00000"), Decimal("1.00000000"))]
+            assert list(offers) == [(KRAKEN, Decimal("101.00000"), Decimal("1.00000000"))]
+            del bids, offers
+
+    def test_writer_rejects_unordered_snapshots(self, tmp_path):
+        with SnapshotWriter(tmp_path / "btcusd.obs", "BTCUSD") as writer:
+            writer.write(2.0, [], [])
+            with pytest.raises(ValueError, match="written after one at 2.0"):
+                writer.write(1.0, [], [])
+
+    @pytest.mark.parametrize(
+        ["content", "error"],
+        [
+            (b"", "is not a columnar snapshot file"),
+            (b"not a snapshot file" * 10, "is not a columnar snapshot file"),
+            (b"OBSNAP1\x00" + b"\x00" * 64, "is truncated"),
+        ],
+    )
+    def test_invalid_file(self, tmp_path, content, error):
+        path = tmp_path / "invalid.obs"
+        path.write_bytes(content)
+
+        with pytest.raises(ValueError, match=error):
+            SnapshotFile(path)
+
+    def test_replay(self, snapshot_path):
+        with SnapshotFile(snapshot_path) as snapshots:
+            results = list(replay(snapshots, [1, 2]))
+
+        assert results == [
+            (
+                10.0,
+                [
+                    (Decimal("101.00"), 0, Decimal("100.00"), 0),
+                    (Decimal("203.75"), 0, Decimal("199.50"), 0),
+                ],
+            ),
+            (
+                20.0,
+                [
+                    (Decimal("101.00"), 0, Decimal("0.00"), Decimal("1")),
+                    (Decimal("203.75"), 0, Decimal("0.00"), Decimal("2")),
+                ],
+            ),
+            (
+                30.0,
+                [
+                    (Decimal("0.00"), Decimal("1"), Decimal("100.00"), 0),
+                    (Decimal("0.00"), Decimal("2"), Decimal("199.50"), 0),
+                ],
+            ),
+        ]
+        assert replay_file(snapshot_path, [1, 2], start=20.0, end=30.0) == results[1:2]
+
+    def test_replay_files(self, snapshot_path, tmp_path):
+        other_path = tmp_path / "other.obs"
+        with SnapshotWriter(other_path, "BTCUSD") as writer:
+            writer.write(40.0, BIDS.iter_ticks(), OFFERS.iter_ticks())
+
+        results = list(
+            replay_files([snapshot_path, other_path], [1], processes=2, start=20.0)
+        )
+
+        assert results == [
+            (snapshot_path, replay_file(snapshot_path, [1], start=20.0)),
+            (other_path, [(40.0, [(Decimal("101.00"), 0, Decimal("100.00"), 0)])]),
+        ]
+
+    def test_convert_recording(self, recording_path, tmp_path, capsys):
+        path = tmp_path / "btcusd.obs"
+
+        assert convert_recording(recording_path, path, "BTCUSD") == 3
+
+        quantities = [0.1, 1, 5, 10.5]
+        expected_prices = get_buy_and_sell_prices(
+            quantities=quantities, product="BTCUSD", kraken_exchange=True
+        )
+        with SnapshotFile(path) as snapshots:
+            assert [timestamp for timestamp, _, _ in snapshots] == [1.5, 2.0, 2.0]
+            assert [len(bids) for _, bids, _ in snapshots] == [2, 4, 6]
+            assert list(replay(snapshots, quantities))[-1] == (2.0, expected_prices)
+
+    def test_cli(self, recording_path, tmp_path):
+        runner = CliRunner()
+        path = tmp_path / "btcusd.obs"
+
+        result = runner.invoke(cli, ["convert", str(recording_path), str(path)])
+
+        assert result.exit_code == 0
+        assert result.output == f"Wrote 3 BTCUSD snapshots to {path}.\n"
+
+        result = runner.invoke(
+            cli, ["run", str(path), "--quantity", "0.1,1", "--processes", "1"]
+        )
+
+        assert result.exit_code == 0
+        lines = result.output.splitlines()
+        assert len(lines) == 7
+        assert lines[0] == "1.5,0.1,3915.50,0,3915.06,0"
+        assert lines[-1].startswith("Replayed 6 snapshot quotes in ")
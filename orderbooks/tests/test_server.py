@@ -0,0 +1,332 @@
+import threading
+import time
+from decimal import Decimal
+
+import pytest
+import requests
+from click.testing import CliRunner
+
+from orderbooks.books import MergedSide
+from orderbooks.cache import SnapshotCache
+from orderbooks.integrations.constants import (COINBASE, GEMINI, KRAKEN,
+                                               QUOTE_SERVER_REFRESH_INTERVAL)
+from orderbooks.server import (BookUnavailableError, QuoteClient,
+                               QuoteServer, QuoteService, serve)
+from orderbooks.streaming import ReplayConnection
+from orderbooks.tests.helpers import (coinbase_level2_stream,
+                                      gemini_market_data_stream,
+                                      successful_coinbase_response,
+                                      successful_gemini_response,
+                                      successful_kraken_response)
+from orderbooks.utils import execute_market_order, transform_exchange_data
+
+
+def fetch_order_books(product, kraken, **options):
+    books = [
+        transform_exchange_data(successful_gemini_response(), GEMINI, dict_datatype=True),
+        transform_exchange_data(successful_coinbase_response(), COINBASE),
+    ]
+    if kraken:
+        books.append(
+            transform_exchange_data(
+                successful_kraken_response()["result"]["XXBTZUSD"], KRAKEN
+            )
+        )
+    return (
+        MergedSide((bids for bids, _ in books), bid=True),
+        MergedSide((offers for _, offers in books), bid=False),
+    )
+
+
+class HeldConnection(ReplayConnection):
+    """A replay kept open once its messages are consumed, like a quiet feed."""
+
+    def __init__(self, messages):
+        super().__init__(messages)
+        self._closed = threading.Event()
+
+    def recv(self):
+        if not self.messages:
+            self._closed.wait()
+        return super().recv()
+
+    def close(self):
+        super().close()
+        self._closed.set()
+
+
+def stream_connections(gemini_stream, coinbase_stream):
+    """Connection factory of the Gemini and Coinbase feeds, each connected once.
+    A feed without a stream ends at once."""
+    connections = {
+        url: [] if stream is None else [HeldConnection(stream)]
+        for url, stream in (
+            ("wss://api.gemini.com/v1/marketdata/BTCUSD", gemini_stream),
+            ("wss://ws-feed.exchange.coinbase.com", coinbase_stream),
+        )
+    }
+
+    def connect(url):
+        return connections[url].pop(0) if connections[url] else ReplayConnection([])
+
+    return connect
+
+
+@pytest.fixture
+def quote_server():
+    fetches = []
+
+    def fetch(product, kraken, **options):
+        fetches.append(product)
+        return fetch_order_books(product, kraken)
+
+    service = QuoteService(kraken=True, refresh_interval=60, fetch=fetch)
+    server = QuoteServer(service, port=0)
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    thread.start()
+    server.fetches = fetches
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestQuoteServer:
+    def test_quotes_match_market_orders(self, quote_server):
+        client = QuoteClient(f"http://127.0.0.1:{quote_server.server_port}")
+        quantities = [Decimal("0.1"), Decimal("1"), Decimal("20")]
+
+        quotes = client.get_buy_and_sell_prices(quantities, "BTCUSD")
+
+        bids, offers = fetch_order_books("BTCUSD", kraken=True)
+        assert quotes == [
+            (
+                *execute_market_order(quantity, offers),
+                *execute_market_order(quantity, bids, bid=True),
+            )
+            for quantity in quantities
+        ]
+        assert client.get_buy_and_sell_price(Decimal("1"), "BTCUSD") == quotes[1]
+        # The book is fetched once and then served from memory.
+        assert quote_server.fetches == ["BTCUSD"]
+
+    @pytest.mark.parametrize(
+        ["path", "expected_status"],
+        [
+            ("/quote?product=XYZ&quantity=1", 400),
+            ("/quote?product=BTCUSD", 400),
+            ("/quote?product=BTCUSD&quantity=one", 400),
+            ("/quote?product=BTCUSD&quantity=-1", 400),
+            ("/quote?product=BTCUSD&quantity=1,0", 400),
+            ("/quote?product=BTCUSD&quantity=NaN", 400),
+            ("/quote?product=BTCUSD&quantity=Infinity", 400),
+            ("/prices", 404),
+        ],
+    )
+    def test_invalid_requests(self, quote_server, path, expected_status):
+        response = requests.get(f"http://127.0.0.1:{quote_server.server_port}{path}")
+
+        assert response.status_code == expected_status
+        assert "error" in response.json()
+
+    def test_client_raises_on_error(self, quote_server):
+        client = QuoteClient(f"http://127.0.0.1:{quote_server.server_port}")
+
+        with pytest.raises(Exception) as err:
+            client.get_buy_and_sell_prices([1], "XYZ")
+
+        assert err.value.args[1] == 400
+
+    def test_unavailable_book_is_a_bad_gateway(self):
+        def fetch(product, kraken, **options):
+            raise BookUnavailableError("The BTCUSD order book streams are not ready")
+
+        server = QuoteServer(QuoteService(fetch=fetch), port=0)
+        thread = threading.Thread(
+            target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+        )
+        thread.start()
+        client = QuoteClient(f"http://127.0.0.1:{server.server_port}")
+        try:
+            with pytest.raises(Exception) as err:
+                client.get_buy_and_sell_prices([1], "BTCUSD")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert err.value.args[1] == 502
+        assert "streams are not ready" in err.value.args[0]
+
+
+class TestQuoteService:
+    def test_refresh(self):
+        fetches = []
+
+        def fetch(product, kraken, **options):
+            fetches.append(product)
+            return fetch_order_books(product, kraken)
+
+        service = QuoteService(fetch=fetch)
+        service.quote("BTCUSD", 1)
+        first_book = service.books["BTCUSD"]
+
+        service.refresh()
+
+        assert fetches == ["BTCUSD", "BTCUSD"]
+        assert service.books["BTCUSD"] is not first_book
+
+    def test_quote_reports_book_age(self):
+        service = QuoteService(fetch=fetch_order_books)
+
+        (buy_cost, _, sell_cost, _), age = service.quote("BTCUSD", Decimal("0.1"))
+
+        assert (buy_cost, sell_cost) == (Decimal("3915.50"), Decimal("4007.20"))
+        assert 0 <= age < 60
+
+    def test_refresh_reuses_cached_snapshots(self, mocker):
+        mock_gemini_client = mocker.patch(
+            "orderbooks.integrations.exchanges.GeminiClient.get_order_book",
+            return_value=successful_gemini_response(),
+        )
+        mock_coinbase_client = mocker.patch(
+            "orderbooks.integrations.exchanges.CoinBaseClient.get_order_book",
+            return_value=successful_coinbase_response(),
+        )
+        service = QuoteService(cache=SnapshotCache(max_age=60))
+        service.quote("BTCUSD", 1)
+
+        service.refresh()
+
+        assert mock_gemini_client.call_count == 1
+        assert mock_coinbase_client.call_count == 1
+
+    def test_quote_reports_cached_book_age(self):
+        def fetch(product, kraken, stats, cache):
+            stats.record_cache_hit(GEMINI, 30)
+            return fetch_order_books(product, kraken)
+
+        service = QuoteService(fetch=fetch, cache=SnapshotCache(max_age=60))
+
+        _, age = service.quote("BTCUSD", 1)
+
+        assert 30 <= age < 90
+
+    def test_concurrent_first_quotes_load_once(self):
+        fetches = []
+
+        def fetch(product, kraken, **options):
+            fetches.append(product)
+            time.sleep(0.05)
+            return fetch_order_books(product, kraken)
+
+        service = QuoteService(fetch=fetch)
+        threads = [
+            threading.Thread(target=service.quote, args=("BTCUSD", 1)) for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert fetches == ["BTCUSD"]
+
+    def test_streamed_quotes(self):
+        service = QuoteService(
+            stream=True,
+            connect=stream_connections(
+                gemini_market_data_stream(), coinbase_level2_stream()
+            ),
+        )
+        try:
+            (buy_cost, remaining, _, _), _ = service.quote("BTCUSD", Decimal("0.1"))
+        finally:
+            service.stop()
+
+        assert (buy_cost, remaining) == (Decimal("3915.50"), 0)
+
+    def test_streamed_quote_fails_without_every_snapshot(self):
+        service = QuoteService(
+            stream=True,
+            connect=stream_connections(None, coinbase_level2_stream()),
+        )
+        started = time.monotonic()
+        try:
+            with pytest.raises(BookUnavailableError) as err:
+                service.quote("BTCUSD", 1)
+        finally:
+            service.stop()
+
+        # The ended Gemini stream is not waited for until the timeout.
+        assert time.monotonic() - started < 5
+        assert "GEMINI: no snapshot received" in str(err.value)
+        assert "COINBASE" not in str(err.value)
+        assert "BTCUSD" not in service.books
+
+    def test_refresh_drops_books_of_dropped_streams(self):
+        service = QuoteService(
+            stream=True,
+            connect=stream_connections(
+                gemini_market_data_stream(), coinbase_level2_stream()
+            ),
+        )
+        try:
+            service.quote("BTCUSD", 1)
+            gemini_stream = service.streams["BTCUSD"].streams[0]
+            gemini_stream._connection.close()
+            gemini_stream._thread.join(1)
+
+            with pytest.raises(BookUnavailableError):
+                service.refresh()
+        finally:
+            service.stop()
+
+        assert "BTCUSD" not in service.books
+
+
+class TestServe:
+    @pytest.mark.parametrize(["args", "hedged"], [([], False), (["--hedge-requests"], True)])
+    def test_serve(self, mocker, args, hedged):
+        runner = CliRunner()
+        mock_service = mocker.patch("orderbooks.server.QuoteService")
+        mock_server = mocker.patch("orderbooks.server.QuoteServer")
+        mock_server.return_value.server_port = 8080
+        mock_enable_hedging = mocker.patch("orderbooks.server.enable_hedging")
+
+        result = runner.invoke(serve, ["--stream", *args])
+
+        assert result.exit_code == 0
+        assert "Serving quotes on http://127.0.0.1:8080" in result.output
+        assert mock_enable_hedging.called is hedged
+        mock_service.assert_called_once_with(
+            kraken=False,
+            refresh_interval=QUOTE_SERVER_REFRESH_INTERVAL,
+            stream=True,
+            cache=None,
+        )
+        mock_server.return_value.serve_forever.assert_called_once_with()
+        mock_service.return_value.start.return_value.stop.assert_called_once_with()
+
+    def test_serve_snapshot_cache(self, mocker, tmp_path):
+        runner = CliRunner()
+        mock_service = mocker.patch("orderbooks.server.QuoteService")
+        mock_server = mocker.patch("orderbooks.server.QuoteServer")
+        mock_server.return_value.server_port = 8080
+
+        result = runner.invoke(
+            serve, ["--cache-max-age", "5", "--cache-dir", str(tmp_path)]
+        )
+
+        assert result.exit_code == 0
+        cache = mock_service.call_args.kwargs["cache"]
+        assert (cache.max_age, cache.directory) == (5, str(tmp_path))
+
+    def test_serve_rejects_snapshot_cache_when_streaming(self, mocker):
+        runner = CliRunner()
+        mock_service = mocker.patch("orderbooks.server.QuoteService")
+
+        result = runner.invoke(serve, ["--stream", "--cache-max-age", "5"])
+
+        assert result.exit_code == 2
+        assert "not supported with --stream" in result.output
+        mock_service.assert_not_called()
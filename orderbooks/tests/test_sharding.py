@@ -0,0 +1,102 @@
+import os
+from decimal import Decimal
+
+import pytest
+
+from orderbooks.integrations.adapters import get_adapter
+from orderbooks.integrations.constants import COINBASE, GEMINI, KRAKEN
+from orderbooks.integrations.ratelimit import SharedTokenBucket
+from orderbooks.sharding import (init_worker, quote_shard, quote_sharded,
+                                 shard_requests, shared_rate_limiters)
+from orderbooks.tests.helpers import (successful_coinbase_response,
+                                      successful_gemini_response)
+from orderbooks.utils import FetchStats, get_buy_and_sell_prices
+
+
+def pid_quote_shard(requests, kraken=False):
+    """Quote each product at the pid of the worker process quoting it."""
+    return (
+        [
+            (product, quantities, [(Decimal(os.getpid()), 0, 0, 0)], {})
+            for product, quantities in requests.items()
+        ],
+        10 * len(requests),
+        1,
+    )
+
+
+class TestSharding:
+    @pytest.mark.parametrize(
+        ["shards", "expected_shards"],
+        [
+            (1, [["A", "B", "C", "D", "E"]]),
+            (2, [["A", "C", "E"], ["B", "D"]]),
+            (8, [["A"], ["B"], ["C"], ["D"], ["E"]]),
+        ],
+    )
+    def test_shard_requests(self, shards, expected_shards):
+        requests = {product: [1.0] for product in "ABCDE"}
+
+        assert [list(shard) for shard in shard_requests(requests, shards)] == (
+            expected_shards
+        )
+
+    def test_init_worker_shares_rate_limits(self, mocker):
+        for exchange in (GEMINI, COINBASE, KRAKEN):
+            mocker.patch.object(get_adapter(exchange), "rate_limiter")
+        rate_limiters = shared_rate_limiters()
+
+        init_worker(rate_limiters)
+
+        for exchange in (GEMINI, COINBASE, KRAKEN):
+            rate_limiter = get_adapter(exchange).rate_limiter
+            assert rate_limiter is rate_limiters[exchange]
+            assert isinstance(rate_limiter, SharedTokenBucket)
+        assert rate_limiters[COINBASE].rate == 10
+        assert rate_limiters[COINBASE].capacity == 15
+        assert rate_limiters[KRAKEN].rate == 1
+        assert rate_limiters[KRAKEN].capacity == 2
+
+    @pytest.mark.parametrize("hedge", [True, False])
+    def test_init_worker_hedging(self, mocker, hedge):
+        mock_enable_hedging = mocker.patch("orderbooks.sharding.enable_hedging")
+        for exchange in (GEMINI, COINBASE, KRAKEN):
+            mocker.patch.object(get_adapter(exchange), "rate_limiter")
+
+        init_worker(shared_rate_limiters(), hedge=hedge)
+
+        assert mock_enable_hedging.called is hedge
+
+    def test_quote_shard(self, mocker):
+        mocker.patch(
+            "orderbooks.integrations.exchanges.GeminiClient.get_order_book",
+            return_value=successful_gemini_response(),
+        )
+        mocker.patch(
+            "orderbooks.integrations.exchanges.CoinBaseClient.get_order_book",
+            return_value=successful_coinbase_response(),
+        )
+
+        results, bytes_transferred, escalations = quote_shard({"BTCUSD": [1.0, 2.0]})
+
+        assert results == [
+            ("BTCUSD", [1.0, 2.0], get_buy_and_sell_prices([1.0, 2.0], "BTCUSD", False), {})
+        ]
+        assert escalations == 0
+
+    def test_quote_sharded(self):
+        requests = {f"PRODUCT{index}": [float(index)] for index in range(6)}
+        stats = FetchStats()
+
+        results = list(
+            quote_sharded(
+                requests, processes=2, shard_size=2, stats=stats, quote=pid_quote_shard
+            )
+        )
+
+        assert sorted(product for product, _, _, _ in results) == sorted(requests)
+        for product, quantities, _, _ in results:
+            assert quantities == requests[product]
+        assert os.getpid() not in {prices[0][0] for _, _, prices, _ in results}
+        assert stats.bytes_transferred == 60
+        assert stats.escalations == 3
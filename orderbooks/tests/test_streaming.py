@@ -0,0 +1,350 @@
+import json
+import threading
+import zlib
+from decimal import Decimal
+
+import pytest
+
+from orderbooks.integrations.adapters import (ExchangeAdapter,
+                                              register_adapter,
+                                              unregister_adapter)
+from orderbooks.integrations.constants import COINBASE, GEMINI, KRAKEN
+from orderbooks.integrations.feeds import (ChecksumMismatchError, CoinbaseFeed,
+                                           GeminiFeed, KrakenFeed,
+                                           SequenceGapError)
+from orderbooks.streaming import (BookStream, LiveOrderBook, ReplayConnection,
+                                  StreamingOrderBooks)
+from orderbooks.tests.helpers import (coinbase_level2_stream,
+                                      gemini_market_data_stream,
+                                      kraken_book_stream)
+from orderbooks.utils import execute_market_order
+
+
+def replay(*streams):
+    """Connection factory returning a replay of the next recorded stream on each connect."""
+    connections = [ReplayConnection(stream) for stream in streams]
+
+    def connect(url):
+        connect.urls.append(url)
+        return connections.pop(0) if connections else ReplayConnection([])
+
+    connect.urls = []
+    return connect
+
+
+class DroppedConnection(ReplayConnection):
+    """A replay whose connection is reset once its messages are consumed."""
+
+    def recv(self):
+        if not self.messages:
+            raise ConnectionResetError("Connection reset by peer")
+        return super().recv()
+
+
+def levels(side):
+    return [(exchange, price, size) for exchange, price, size in side]
+
+
+class TestLiveOrderBook:
+    def test_snapshot_and_updates(self):
+        book = LiveOrderBook(COINBASE, price_decimals=2, size_decimals=8)
+
+        book.apply_snapshot([("100", "1"), ("99", "2")], [("101", "3")])
+        book.apply_updates(
+            [(True, "100", "0"), (True, "98.5", "4"), (False, "101", "1")]
+        )
+
+        bids, offers = book.sides()
+        assert levels(bids) == [
+            (COINBASE, Decimal("99"), Decimal("2")),
+            (COINBASE, Decimal("98.5"), Decimal("4")),
+        ]
+        assert levels(offers) == [(COINBASE, Decimal("101"), Decimal("1"))]
+
+    def test_sides_are_cached_until_changed(self):
+        book = LiveOrderBook(COINBASE, price_decimals=2, size_decimals=8)
+        book.apply_snapshot([("100", "1")], [("101", "1")])
+
+        sides = book.sides()
+        assert book.sides() is sides
+
+        book.apply_updates([(True, "100", "2")])
+        assert book.sides() is not sides
+
+    def test_sequence_gap(self):
+        book = LiveOrderBook(GEMINI, price_decimals=2, size_decimals=8)
+        book.apply_snapshot([("100", "1")], [("101", "1")], sequence=0)
+        book.apply_updates([(True, "100", "2")], sequence=1)
+
+        with pytest.raises(SequenceGapError):
+            book.apply_updates([(True, "100", "3")], sequence=3)
+        assert not book.ready
+
+    def test_top_levels(self):
+        book = LiveOrderBook(KRAKEN, price_decimals=2, size_decimals=8)
+        book.apply_snapshot(
+            [("99", "1"), ("100", "2"), ("98", "3")], [("102", "4"), ("101", "5")]
+        )
+
+        asks, bids = book.top_levels(2)
+
+        assert asks == [(10100, 500000000), (10200, 400000000)]
+        assert bids == [(10000, 200000000), (9900, 100000000)]
+
+    def test_max_depth(self):
+        book = LiveOrderBook(KRAKEN, price_decimals=2, size_decimals=8, max_depth=2)
+        book.apply_snapshot([("100", "1"), ("99", "1")], [("101", "1"), ("102", "1")])
+
+        book.apply_updates([(True, "100.5", "1"), (False, "100.8", "1")])
+
+        bids, offers = book.sides()
+        assert [price for _, price, _ in bids] == [Decimal("100.5"), Decimal("100")]
+        assert [price for _, price, _ in offers] == [Decimal("100.8"), Decimal("101")]
+
+
+class TestFeeds:
+    @pytest.mark.parametrize(
+        ["feed_class", "stream", "expected_bids", "expected_offers"],
+        [
+            (
+                CoinbaseFeed,
+                coinbase_level2_stream(),
+                [("40071.97", "1.2")],
+                [("40072.50", "0.1"), ("40072.71", "0.3"), ("40075.55", "2.0")],
+            ),
+            (
+                GeminiFeed,
+                gemini_market_data_stream(),
+                [("39150.97", "0.5"), ("39150.36", "1.5")],
+                [("39155.01", "0.1")],
+            ),
+            (
+                KrakenFeed,
+                kraken_book_stream(),
+                [("39163.65", "1"), ("39163.60", "8.187"), ("39162.80", "0.768")],
+                [("39164", "0.5"), ("39166.60", "0.02")],
+            ),
+        ],
+    )
+    def test_replayed_stream(self, feed_class, stream, expected_bids, expected_offers):
+        connect = replay(stream)
+        feed = feed_class("BTCUSD")
+        book_stream = BookStream(feed, "BTCUSD", connect=connect)
+
+        book_stream.run()
+
+        bids, offers = book_stream.book.sides()
+        exchange = feed_class.EXCHANGE
+        assert levels(bids) == [
+            (exchange, Decimal(price), Decimal(size)) for price, size in expected_bids
+        ]
+        assert levels(offers) == [
+            (exchange, Decimal(price), Decimal(size)) for price, size in expected_offers
+        ]
+        assert connect.urls == [feed.url()]
+
+    def test_subscribe_messages(self):
+        coinbase = ReplayConnection([])
+        BookStream(CoinbaseFeed("BTCUSD"), "BTCUSD", connect=lambda url: coinbase).run()
+        kraken = ReplayConnection([])
+        BookStream(KrakenFeed("BTCUSD"), "BTCUSD", connect=lambda url: kraken).run()
+
+        assert json.loads(coinbase.sent[0])["product_ids"] == ["BTC-USD"]
+        assert json.loads(kraken.sent[0])["pair"] == ["XBT/USD"]
+        assert kraken.closed
+
+    def test_sequence_gap_resubscribes(self):
+        stream = gemini_market_data_stream()
+        gapped_stream = stream[:1] + stream[2:]
+        connect = replay(gapped_stream, stream)
+        book_stream = BookStream(GeminiFeed("BTCUSD"), "BTCUSD", connect=connect)
+
+        book_stream.run()
+
+        assert len(connect.urls) == 2
+        bids, _ = book_stream.book.sides()
+        assert [size for _, _, size in bids] == [Decimal("0.5"), Decimal("1.5")]
+
+    def test_kraken_checksum(self):
+        feed = KrakenFeed("BTCUSD")
+        book = LiveOrderBook(KRAKEN, price_decimals=8, size_decimals=8)
+        stream = kraken_book_stream()
+        feed.handle(stream[2], book)
+
+        # Kraken's formatting, without decimal point nor leading zeros, of the
+        # asks then the bids from the best price.
+        assert feed.wire_decimals == (5, 8)
+        assert feed.checksum(book) == zlib.crc32(
+            b"3916370000153900000" b"39166600002000000"
+            b"3916360000818700000" b"391628000076800000"
+        )
+
+    def test_kraken_checksum_mismatch_resubscribes(self):
+        stream = kraken_book_stream()
+        corrupted_stream = json.loads(json.dumps(stream))
+        corrupted_stream[3][1]["c"] = "1"
+        connect = replay(corrupted_stream, stream)
+        book_stream = BookStream(KrakenFeed("BTCUSD"), "BTCUSD", connect=connect)
+
+        book_stream.run()
+
+        assert len(connect.urls) == 2
+        assert isinstance(book_stream.last_error, ChecksumMismatchError)
+        bids, _ = book_stream.book.sides()
+        assert len(bids) == 3
+
+    def test_kraken_checksum_mismatch(self):
+        feed = KrakenFeed("BTCUSD")
+        book = LiveOrderBook(KRAKEN, price_decimals=5, size_decimals=8)
+        stream = kraken_book_stream()
+        feed.handle(stream[2], book)
+        stream[3][1]["c"] = "1"
+
+        with pytest.raises(ChecksumMismatchError):
+            feed.handle(stream[3], book)
+        assert not book.ready
+
+    @pytest.mark.parametrize(
+        "feed_class, stream",
+        [
+            (GeminiFeed, gemini_market_data_stream()),
+            (CoinbaseFeed, coinbase_level2_stream()),
+            (KrakenFeed, kraken_book_stream()),
+        ],
+    )
+    def test_reconnects_after_transport_errors(self, mocker, feed_class, stream):
+        connections = [DroppedConnection(stream[:2]), ReplayConnection(stream)]
+
+        def connect(url):
+            connect.urls.append(url)
+            if len(connect.urls) == 2:
+                raise OSError("Network is unreachable")
+            return connections.pop(0) if connections else ReplayConnection([])
+
+        connect.urls = []
+        wait = mocker.patch("threading.Event.wait")
+        book_stream = BookStream(feed_class("BTCUSD"), "BTCUSD", connect=connect)
+
+        book_stream.run()
+
+        assert len(connect.urls) == 3
+        assert isinstance(book_stream.last_error, OSError)
+        # The backoff grows with every failed attempt since the last snapshot.
+        first_delay, second_delay = [call.args[0] for call in wait.call_args_list]
+        assert 0 <= first_delay <= 0.5
+        assert 0 <= second_delay <= 1
+        assert len(book_stream.book.sides()[1]) > 0
+
+    def test_backoff(self):
+        book_stream = BookStream(
+            GeminiFeed("BTCUSD"), "BTCUSD", connect=ReplayConnection, max_delay=3
+        )
+
+        assert all(0 <= book_stream.backoff(0) <= 0.5 for _ in range(100))
+        assert all(0 <= book_stream.backoff(10) <= 3 for _ in range(100))
+
+    def test_stop_interrupts_backoff(self):
+        connected = threading.Event()
+
+        def connect(url):
+            connected.set()
+            raise OSError("Network is unreachable")
+
+        book_stream = BookStream(
+            GeminiFeed("BTCUSD"), "BTCUSD", connect=connect, base_delay=60, max_delay=60
+        ).start()
+        connected.wait(1)
+
+        book_stream.stop()
+        book_stream._thread.join(1)
+
+        assert not book_stream._thread.is_alive()
+
+    def test_coinbase_resyncs_keeping_the_book(self, mocker):
+        mocker.patch.object(CoinbaseFeed, "RESYNC_INTERVAL", 0)
+        ready = []
+        connections = [
+            ReplayConnection(coinbase_level2_stream()),
+            ReplayConnection(coinbase_level2_stream()),
+        ]
+
+        def connect(url):
+            ready.append(book_stream.book.ready)
+            return connections.pop(0) if connections else ReplayConnection([])
+
+        book_stream = BookStream(CoinbaseFeed("BTCUSD"), "BTCUSD", connect=connect)
+
+        book_stream.run()
+
+        # Resynced after each snapshot, serving the book until the next one.
+        assert ready == [False, True, True]
+
+    def test_replay_from_file(self, tmp_path):
+        recording = tmp_path / "coinbase.jsonl"
+        recording.write_text(
+            "\n".join(json.dumps(message) for message in coinbase_level2_stream())
+        )
+        book_stream = BookStream(
+            CoinbaseFeed("BTCUSD"),
+            "BTCUSD",
+            connect=lambda url: ReplayConnection(str(recording)),
+        )
+
+        book_stream.run()
+
+        assert len(book_stream.book.sides()[1]) == 3
+
+
+class TestStreamingOrderBooks:
+    def test_get_exchange_data(self):
+        streams = {
+            "wss://api.gemini.com/v1/marketdata/BTCUSD": gemini_market_data_stream(),
+            "wss://ws-feed.exchange.coinbase.com": coinbase_level2_stream(),
+            "wss://ws.kraken.com": kraken_book_stream(),
+        }
+        order_books = StreamingOrderBooks(
+            "BTCUSD", kraken=True, connect=lambda url: ReplayConnection(streams[url])
+        )
+        for stream in order_books.streams:
+            stream.run()
+
+        bids, offers = order_books.get_exchange_data()
+
+        assert [run[0][0] for run in bids.runs] == [GEMINI, COINBASE, KRAKEN]
+        assert len(offers) == 6
+        cost, remaining = execute_market_order(1, offers)
+        assert (str(cost), remaining) == ("39508.44", 0)
+
+    def test_streams_registered_adapters(self):
+        @register_adapter
+        class TestAdapter(ExchangeAdapter):
+            EXCHANGE = "TEST_EXCHANGE"
+            FEED = CoinbaseFeed
+
+        try:
+            order_books = StreamingOrderBooks("BTCUSD", connect=ReplayConnection)
+        finally:
+            unregister_adapter("TEST_EXCHANGE")
+
+        assert [type(stream.feed) for stream in order_books.streams] == [
+            GeminiFeed,
+            CoinbaseFeed,
+            CoinbaseFeed,
+        ]
+
+    def test_adapter_without_feed(self):
+        @register_adapter
+        class TestAdapter(ExchangeAdapter):
+            EXCHANGE = "TEST_EXCHANGE"
+
+        try:
+            with pytest.raises(ValueError, match="TEST_EXCHANGE"):
+                StreamingOrderBooks("BTCUSD")
+        finally:
+            unregister_adapter("TEST_EXCHANGE")
+
+    def test_requires_a_transport(self, mocker):
+        mocker.patch("orderbooks.streaming.websocket_connect", None)
+
+        with pytest.raises(RuntimeError):
+            BookStream(CoinbaseFeed("BTCUSD"), "BTCUSD").run()
@@ -1,10 +1,23 @@
+import json
+import random
+import threading
+from unittest.mock import Mock
+
 import pytest
 
-from orderbooks.tests.helpers import (successful_coinbase_response,
+from orderbooks.cache import SnapshotCache
+from orderbooks.integrations.adapters import get_adapter
+from orderbooks.integrations.constants import COINBASE, GEMINI, KRAKEN
+from orderbooks.tests.helpers import (random_payload,
+                                      successful_coinbase_response,
                                       successful_gemini_response,
                                       successful_kraken_response)
-from orderbooks.utils import (execute_market_order, get_exchange_data,
-                              transform_exchange_data)
+from orderbooks.utils import (DepthIndex, FetchStats, FillReport,
+                              execute_market_order, fetch_to_depth,
+                              get_buy_and_sell_price, get_buy_and_sell_prices,
+                              get_exchange_data, max_fillable_quantity,
+                              render_fill_json, render_fill_text,
+                              transform_exchange_data, truncate_records)
 
 from decimal import Decimal
 
@@ -24,9 +37,9 @@ class TestUtils:
                 4,
                 "65090.54",
                 [
-                    (Decimal("39163.70000"), Decimal("1.539")),
-                    (Decimal("39166.60000"), Decimal("0.020")),
-                    (Decimal("39167.70000"), Decimal("0.103"))
+                    (KRAKEN, Decimal("39163.70000"), Decimal("1.539")),
+                    (KRAKEN, Decimal("39166.60000"), Decimal("0.020")),
+                    (KRAKEN, Decimal("39167.70000"), Decimal("0.103"))
                 ],
                 "2.338",
             ),
@@ -35,9 +48,9 @@ class TestUtils:
                 1.5,
                 "58745.55",
                 [
-                    (Decimal("39163.70000"), Decimal("1.539")),
-                    (Decimal("39166.60000"), Decimal("0.020")),
-                    (Decimal("39167.70000"), Decimal("0.103"))
+                    (KRAKEN, Decimal("39163.70000"), Decimal("1.539")),
+                    (KRAKEN, Decimal("39166.60000"), Decimal("0.020")),
+                    (KRAKEN, Decimal("39167.70000"), Decimal("0.103"))
                 ],
                 "0",
             ),
@@ -46,9 +59,9 @@ class TestUtils:
                 1.6,
                 "62662.14",
                 [
-                    (Decimal("39163.70000"), Decimal("1.539")),
-                    (Decimal("39166.60000"), Decimal("0.020")),
-                    (Decimal("39167.70000"), Decimal("0.103"))
+                    (KRAKEN, Decimal("39163.70000"), Decimal("1.539")),
+                    (KRAKEN, Decimal("39166.60000"), Decimal("0.020")),
+                    (KRAKEN, Decimal("39167.70000"), Decimal("0.103"))
                 ],
                 "0",
             ),
@@ -57,9 +70,9 @@ class TestUtils:
                 1.539,
                 "60272.93",
                 [
-                    (Decimal("39163.70000"), Decimal("1.539")),
-                    (Decimal("39166.60000"), Decimal("0.020")),
-                    (Decimal("39167.70000"), Decimal("0.103"))
+                    (KRAKEN, Decimal("39163.70000"), Decimal("1.539")),
+                    (KRAKEN, Decimal("39166.60000"), Decimal("0.020")),
+                    (KRAKEN, Decimal("39167.70000"), Decimal("0.103"))
                 ],
                 "0",
             ),
@@ -68,9 +81,9 @@ class TestUtils:
                 15,
                 "403970.29",
                 [
-                    (Decimal("39163.60000"), Decimal("8.187")),
-                    (Decimal("39162.80000"), Decimal("0.768")),
-                    (Decimal("39162.40000"), Decimal("1.360"))
+                    (KRAKEN, Decimal("39163.60000"), Decimal("8.187")),
+                    (KRAKEN, Decimal("39162.80000"), Decimal("0.768")),
+                    (KRAKEN, Decimal("39162.40000"), Decimal("1.360"))
                 ],
                 "4.685",
             ),
@@ -79,9 +92,9 @@ class TestUtils:
                 6,
                 "234981.60",
                 [
-                    (Decimal("39163.60000"), Decimal("8.187")),
-                    (Decimal("39162.80000"), Decimal("0.768")),
-                    (Decimal("39162.40000"), Decimal("1.360"))
+                    (KRAKEN, Decimal("39163.60000"), Decimal("8.187")),
+                    (KRAKEN, Decimal("39162.80000"), Decimal("0.768")),
+                    (KRAKEN, Decimal("39162.40000"), Decimal("1.360"))
                 ],
                 "0",
             ),
@@ -90,9 +103,9 @@ class TestUtils:
                 9.2,
                 "360304.21",
                 [
-                    (Decimal("39163.60000"), Decimal("8.187")),
-                    (Decimal("39162.80000"), Decimal("0.768")),
-                    (Decimal("39162.40000"), Decimal("1.360"))
+                    (KRAKEN, Decimal("39163.60000"), Decimal("8.187")),
+                    (KRAKEN, Decimal("39162.80000"), Decimal("0.768")),
+                    (KRAKEN, Decimal("39162.40000"), Decimal("1.360"))
                 ],
                 "0",
             ),
@@ -101,9 +114,9 @@ class TestUtils:
                     8.187,
                     "320632.39",
                     [
-                        (Decimal("39163.60000"), Decimal("8.187")),
-                        (Decimal("39162.80000"), Decimal("0.768")),
-                        (Decimal("39162.40000"), Decimal("1.360"))
+                        (KRAKEN, Decimal("39163.60000"), Decimal("8.187")),
+                        (KRAKEN, Decimal("39162.80000"), Decimal("0.768")),
+                        (KRAKEN, Decimal("39162.40000"), Decimal("1.360"))
                     ],
                     "0",
             ),
@@ -125,6 +138,116 @@ class TestUtils:
         assert str(cost) == expected_total_cost
         assert str(remaining_amount) == expected_remaining_amount
 
+    @pytest.mark.parametrize(
+        ["quantity", "expected_remaining", "expected_levels", "expected_vwap", "expected_fills"],
+        [
+            (2, 0, 2, "100.5", {GEMINI: ["1", "100"], KRAKEN: ["1", "101"]}),
+            (
+                Decimal("1.5"),
+                0,
+                2,
+                "100.3333333333333333333333333",
+                {GEMINI: ["1", "100"], KRAKEN: ["0.5", "101"]},
+            ),
+            (5, Decimal("2"), 3, "101", {GEMINI: ["2", "102"], KRAKEN: ["1", "101"]}),
+            (0, 0, 1, None, {GEMINI: ["0", "100"], KRAKEN: [0, 0]}),
+        ],
+    )
+    def test_execute_market_order_fill_report(
+        self, quantity, expected_remaining, expected_levels, expected_vwap, expected_fills
+    ):
+        order_book = [
+            (GEMINI, Decimal("100"), Decimal("1")),
+            (KRAKEN, Decimal("101"), Decimal("1")),
+            (GEMINI, Decimal("102"), Decimal("1")),
+        ]
+
+        report = execute_market_order(quantity, order_book)
+
+        assert report.remaining == expected_remaining
+        assert report.levels_consumed == expected_levels
+        assert report.vwap == (None if expected_vwap is None else Decimal(expected_vwap))
+        assert {
+            exchange: report.fills[exchange] for exchange in expected_fills
+        } == {
+            exchange: [Decimal(amount), Decimal(price)]
+            for exchange, (amount, price) in expected_fills.items()
+        }
+        assert report.fills[COINBASE] == [0, 0]
+
+    def test_execute_market_order_leaves_list_unsorted(self):
+        order_book = [
+            (KRAKEN, Decimal("101"), Decimal("1")),
+            (GEMINI, Decimal("100"), Decimal("1")),
+        ]
+        levels = list(order_book)
+
+        cost, remaining = execute_market_order(1, order_book)
+
+        assert (cost, remaining) == (Decimal("100.00"), 0)
+        assert order_book == levels
+
+    def test_fill_report(self):
+        report = FillReport(
+            Decimal("251.50"),
+            Decimal("0.5"),
+            {GEMINI: [Decimal("2"), Decimal("126")], COINBASE: [0, 0]},
+            levels_consumed=3,
+            vwap=Decimal("125.75"),
+        )
+
+        cost, remaining = report
+
+        assert (cost, remaining) == (Decimal("251.50"), Decimal("0.5"))
+        assert report == (Decimal("251.50"), Decimal("0.5"))
+        assert report.filled_amount == 2
+        assert not hasattr(report, "__dict__")
+        assert render_fill_text(report) == (
+            "Filled 2 for 251.50 at a VWAP of 125.75 over 3 levels, 0.5 remaining."
+            " Per exchange: GEMINI 2 up to 126."
+        )
+        assert json.loads(render_fill_json(report, side="buy")) == {
+            "side": "buy",
+            "total_cost": "251.50",
+            "remaining": "0.5",
+            "vwap": "125.75",
+            "levels_consumed": 3,
+            "fills": {GEMINI: {"amount": "2", "last_price": "126"}},
+        }
+
+    def test_render_fill_text_trims_tick_padding(self):
+        report = FillReport(
+            Decimal("58745.55"),
+            Decimal("0.50000000"),
+            {KRAKEN: [Decimal("1.50000000"), Decimal("39163.70000")], COINBASE: [0, 0]},
+            levels_consumed=1,
+            vwap=Decimal("39163.7"),
+        )
+
+        assert render_fill_text(report) == (
+            "Filled 1.5 for 58745.55 at a VWAP of 39163.70 over 1 levels, 0.5 remaining."
+            " Per exchange: KRAKEN 1.5 up to 39163.7."
+        )
+
+    def test_render_fill_json_matches_text(self):
+        report = FillReport(
+            Decimal("58745.55"),
+            Decimal("0.50000000"),
+            {KRAKEN: [Decimal("1.50000000"), Decimal("39163.70000")], COINBASE: [0, 0]},
+            levels_consumed=1,
+            vwap=Decimal("58745.55") / Decimal("1.5"),
+        )
+        fields = json.loads(render_fill_json(report))
+        kraken_fill = fields["fills"][KRAKEN]
+
+        assert render_fill_text(report) == (
+            f"Filled {kraken_fill['amount']} for {fields['total_cost']}"
+            f" at a VWAP of {fields['vwap']} over {fields['levels_consumed']} levels,"
+            f" {fields['remaining']} remaining."
+            f" Per exchange: KRAKEN {kraken_fill['amount']} up to {kraken_fill['last_price']}."
+        )
+        assert (fields["remaining"], fields["vwap"]) == ("0.5", "39163.70")
+
     @pytest.mark.parametrize(
         [
             "kraken_enabled",
@@ -194,14 +317,540 @@ class TestUtils:
         assert len(bid_order_book) == expected_bids
         assert len(offer_order_book) == expected_offers
 
+    @pytest.mark.parametrize("max_workers", [1, 2, 3])
+    def test_get_exchange_data_keeps_exchange_order(self, max_workers, mocker):
+        mocker.patch(
+            "orderbooks.integrations.exchanges.KrakenClient.get_order_book",
+            return_value=successful_kraken_response(),
+        )
+        mocker.patch(
+            "orderbooks.integrations.exchanges.GeminiClient.get_order_book",
+            return_value=successful_gemini_response(),
+        )
+        mocker.patch(
+            "orderbooks.integrations.exchanges.CoinBaseClient.get_order_book",
+            return_value=successful_coinbase_response(),
+        )
+
+        bid_order_book, offer_order_book = get_exchange_data(
+            product="BTCUSD", kraken=True, max_workers=max_workers
+        )
+
+        assert [run[0][0] for run in bid_order_book.runs] == [GEMINI, COINBASE, KRAKEN]
+        assert [run[0][0] for run in offer_order_book.runs] == [
+            GEMINI,
+            COINBASE,
+            KRAKEN,
+        ]
+        assert bid_order_book.bid
+        assert not offer_order_book.bid
+
     def test_transform_exchange_data(self):
         test_data = {
             "bids": [[100, 1, "_"], [99, 2, "_"]],
             "asks": [[101, 3, "_"], [102, 4, "_"]],
         }
 
-        bids, offers = transform_exchange_data(test_data)
+        bids, offers = transform_exchange_data(test_data, COINBASE)
+
+        assert list(bids) == [(COINBASE, 100, 1), (COINBASE, 99, 2)]
+        assert list(offers) == [(COINBASE, 101, 3), (COINBASE, 102, 4)]
+
+    @pytest.mark.parametrize(
+        ["records", "dict_datatype"],
+        [
+            ([[100 - i, 1, "_"] for i in range(1000)], False),
+            ([{"price": 100 - i, "amount": 1} for i in range(1000)], True),
+        ],
+    )
+    def test_transform_exchange_data_lazy(self, records, dict_datatype):
+        consumed = []
+
+        def counted(levels):
+            for level in levels:
+                consumed.append(level)
+                yield level
+
+        data = {"bids": counted(records), "asks": counted(records)}
+
+        bids, offers = transform_exchange_data(
+            data, GEMINI, dict_datatype=dict_datatype, lazy=True
+        )
+        cost, remaining = execute_market_order(3, bids, bid=True)
+
+        assert (str(cost), remaining) == ("297.00", 0)
+        assert len(consumed) == 3
+
+    @pytest.mark.parametrize("lazy", [True, False])
+    def test_transform_exchange_data_aggregate(self, lazy):
+        test_data = {
+            "bids": [["100", "1", "a"], ["100", "2", "b"], ["99", "2", "c"]],
+            "asks": [["101", "3", "d"], ["102", "4", "e"], ["102", "0.5", "f"]],
+        }
+
+        bids, offers = transform_exchange_data(
+            test_data, COINBASE, lazy=lazy, price_decimals=2, size_decimals=2, aggregate=True
+        )
+
+        assert list(bids) == [
+            (COINBASE, Decimal("100.00"), Decimal("3.00")),
+            (COINBASE, Decimal("99.00"), Decimal("2.00")),
+        ]
+        assert list(offers) == [
+            (COINBASE, Decimal("101.00"), Decimal("3.00")),
+            (COINBASE, Decimal("102.00"), Decimal("4.50")),
+        ]
+
+    @pytest.mark.parametrize("seed", range(20))
+    @pytest.mark.parametrize("fixed_point", [True, False])
+    def test_aggregated_levels_price_orders_the_same(self, seed, fixed_point, mocker):
+        rng = random.Random(seed)
+        coinbase_response = {"bids": [], "asks": []}
+        for side, step in (("bids", -1), ("asks", 1)):
+            cents = 4000000
+            for order in range(rng.randint(0, 40)):
+                cents += rng.choice([0, 0, 0, 1]) * step
+                coinbase_response[side].append(
+                    [f"{cents // 100}.{cents % 100:02}", f"0.{rng.randint(1, 10**8)}", order]
+                )
+        mocker.patch(
+            "orderbooks.integrations.exchanges.GeminiClient.get_order_book",
+            return_value=successful_gemini_response(),
+        )
+        mocker.patch(
+            "orderbooks.integrations.exchanges.CoinBaseClient.get_order_book",
+            return_value=coinbase_response,
+        )
+        quantity = rng.choice([0.5, 1, 3.3, 100])
+
+        mocker.patch.object(get_adapter(COINBASE), "AGGREGATE_LEVELS", False)
+        expected = get_buy_and_sell_price(
+            quantity=quantity, product="BTCUSD", kraken_exchange=False, fixed_point=fixed_point
+        )
+        mocker.patch.object(get_adapter(COINBASE), "AGGREGATE_LEVELS", True)
+        stats = FetchStats()
+        result = get_buy_and_sell_price(
+            quantity=quantity,
+            product="BTCUSD",
+            kraken_exchange=False,
+            fixed_point=fixed_point,
+            stats=stats,
+        )
+
+        assert [str(value) for report in result for value in report] == [
+            str(value) for report in expected for value in report
+        ]
+        # A partial fill of a merged level can differ in exponent from summing the
+        # orders one by one, but not in value.
+        assert [report.fills for report in result] == [
+            report.fills for report in expected
+        ]
+        if fixed_point:
+            # Only the records left by the truncation to the quantity are aggregated.
+            records = stats.truncated_records[COINBASE][1]
+            assert stats.aggregated_levels[COINBASE][0] == records
+            assert stats.aggregated_levels[COINBASE][1] <= records
+            # The fixed-point engine prices both sides on a prepared merged book.
+            assert stats.quotes == 2
+            assert stats.prepare_seconds > 0
+        else:
+            assert stats.aggregated_levels == {}
+            assert stats.quotes == 0
+
+    def test_get_buy_and_sell_price_lazy_matches_eager(self, mocker):
+        mocker.patch(
+            "orderbooks.integrations.exchanges.KrakenClient.get_order_book",
+            return_value=successful_kraken_response(),
+        )
+        mocker.patch(
+            "orderbooks.integrations.exchanges.GeminiClient.get_order_book",
+            return_value=successful_gemini_response(),
+        )
+        mocker.patch(
+            "orderbooks.integrations.exchanges.CoinBaseClient.get_order_book",
+            return_value=successful_coinbase_response(),
+        )
+
+        bids, offers = get_exchange_data(product="BTCUSD", kraken=True)
+        expected = (
+            execute_market_order(1, list(offers), bid=False),
+            execute_market_order(1, list(bids), bid=True),
+        )
+
+        result = get_buy_and_sell_price(
+            quantity=1, product="BTCUSD", kraken_exchange=True
+        )
+
+        assert result == expected
+        assert [str(report.fills) for report in result] == [
+            str(report.fills) for report in expected
+        ]
+
+    @pytest.mark.parametrize(
+        ["quantity", "expected_kept"],
+        [
+            # The level crossing the quantity is kept for the partial fill.
+            (1.5, 2),
+            # A level ending exactly at the quantity fills it.
+            (3, 2),
+            # A book too thin to fill the quantity is kept whole.
+            (10, 4),
+            (0, 1),
+        ],
+    )
+    @pytest.mark.parametrize("dict_datatype", [True, False])
+    def test_truncate_records(self, quantity, expected_kept, dict_datatype):
+        amounts = ["1", "2", "0.5", "3"]
+        if dict_datatype:
+            records = [{"price": "1", "amount": amount} for amount in amounts]
+        else:
+            records = [["1", amount, "_"] for amount in amounts]
+
+        truncated = truncate_records(records, quantity, dict_datatype)
+
+        assert truncated == records[:expected_kept]
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_truncated_books_quote_the_same(self, seed, mocker):
+        rng = random.Random(seed)
 
-        assert bids == [(100, 1), (99, 2)]
-        assert offers == [(101, 3), (102,4)]
+        coinbase_book = random_payload(rng)
+        for client, book in (
+            ("GeminiClient", random_payload(rng, dict_datatype=True)),
+            ("CoinBaseClient", coinbase_book),
+            ("KrakenClient", {"error": [], "result": {"XXBTZUSD": random_payload(rng)}}),
+        ):
+            mocker.patch(
+                f"orderbooks.integrations.exchanges.{client}.get_order_book",
+                return_value=book,
+            )
+        quantities = [rng.choice([0, 0.5, 1, 7.25, 20, 100]) for _ in range(3)]
+
+        bids, offers = get_exchange_data(product="BTCUSD", kraken=True)
+        bid_index, offer_index = DepthIndex(bids), DepthIndex(offers)
+        expected = [
+            (*offer_index.quote(quantity), *bid_index.quote(quantity))
+            for quantity in quantities
+        ]
+        stats = FetchStats()
+
+        prices = get_buy_and_sell_prices(
+            quantities=quantities, product="BTCUSD", kraken_exchange=True, stats=stats
+        )
+
+        assert [[str(value) for value in quote] for quote in prices] == [
+            [str(value) for value in quote] for quote in expected
+        ]
+        records, kept = stats.truncated_records[COINBASE]
+        assert records == len(coinbase_book["bids"]) + len(coinbase_book["asks"])
+        assert kept == sum(
+            len(truncate_records(coinbase_book[side], max(quantities)))
+            for side in ("bids", "asks")
+        )
+
+    @pytest.mark.parametrize(
+        ["depth_books", "quantity", "expected_escalations"],
+        [
+            # The shallow book is complete, it has less levels than the limit.
+            ([{"bids": [[1, 1]], "asks": [[2, 1]]}], 10, 0),
+            # The shallow book is truncated but deep enough to fill the quantity.
+            ([{"bids": [[1, 5], [0, 5]], "asks": [[2, 5], [3, 5]]}], 10, 0),
+            # The shallow offers are truncated and too thin.
+            (
+                [
+                    {"bids": [[1, 5], [0, 5]], "asks": [[2, 1], [3, 1]]},
+                    {"bids": [[1, 5], [0, 5]], "asks": [[2, 1], [3, 1], [4, 9]]},
+                ],
+                10,
+                1,
+            ),
+            # The deepest depth of the ladder is used even when too thin.
+            (
+                [
+                    {"bids": [[1, 1], [0, 1]], "asks": [[2, 1], [3, 1]]},
+                    {"bids": [[1, 1], [0, 1], [0, 1]], "asks": [[2, 1], [3, 1], [4, 1]]},
+                    {"bids": [[1, 1]], "asks": [[2, 1]]},
+                ],
+                10,
+                2,
+            ),
+        ],
+    )
+    def test_fetch_to_depth(self, depth_books, quantity, expected_escalations):
+        depth_ladder = [({"depth": "2"}, 2), ({"depth": "3"}, 3), ({"depth": "0"}, None)]
+        get_order_book = Mock(side_effect=depth_books)
+
+        order_book, escalations = fetch_to_depth(get_order_book, depth_ladder, quantity)
+
+        assert escalations == expected_escalations
+        assert order_book == depth_books[expected_escalations]
+        assert [c.args[0] for c in get_order_book.call_args_list] == [
+            params for params, _ in depth_ladder[: expected_escalations + 1]
+        ]
+
+    def test_get_exchange_data_adaptive_depth(self, mocker):
+        mock_kraken_client = mocker.patch(
+            "orderbooks.integrations.exchanges.KrakenClient.get_order_book",
+            return_value=successful_kraken_response(),
+        )
+        mock_gemini_client = mocker.patch(
+            "orderbooks.integrations.exchanges.GeminiClient.get_order_book",
+            return_value=successful_gemini_response(),
+        )
+        mock_coinbase_client = mocker.patch(
+            "orderbooks.integrations.exchanges.CoinBaseClient.get_order_book",
+            return_value=successful_coinbase_response(),
+        )
+        stats = FetchStats()
+
+        bids, offers = get_exchange_data(
+            product="BTCUSD", kraken=True, quantity=10, stats=stats
+        )
+
+        mock_coinbase_client.assert_called_once_with("BTC-USD", params={"level": "2"})
+        mock_gemini_client.assert_called_once_with(
+            "BTCUSD", params={"limit_bids": "50", "limit_asks": "50"}
+        )
+        mock_kraken_client.assert_called_once_with("XBTUSD", params={"count": "100"})
+        assert stats.escalations == 0
+        assert len(bids) == 6
+        assert len(offers) == 6
+
+    def test_get_exchange_data_snapshot_cache(self, mocker):
+        mock_kraken_client = mocker.patch(
+            "orderbooks.integrations.exchanges.KrakenClient.get_order_book",
+            return_value=successful_kraken_response(),
+        )
+        mock_gemini_client = mocker.patch(
+            "orderbooks.integrations.exchanges.GeminiClient.get_order_book",
+            return_value=successful_gemini_response(),
+        )
+        mock_coinbase_client = mocker.patch(
+            "orderbooks.integrations.exchanges.CoinBaseClient.get_order_book",
+            return_value=successful_coinbase_response(),
+        )
+        cache = SnapshotCache(max_age=60)
+        fetched = get_exchange_data(product="BTCUSD", kraken=True, cache=cache)
+        stats = FetchStats()
+
+        cached = get_exchange_data(
+            product="BTCUSD", kraken=True, cache=cache, stats=stats
+        )
+
+        assert mock_coinbase_client.call_count == 1
+        assert mock_gemini_client.call_count == 1
+        assert mock_kraken_client.call_count == 1
+        assert list(cached[0]) == list(fetched[0])
+        assert list(cached[1]) == list(fetched[1])
+        assert sorted(stats.cache_ages) == [COINBASE, GEMINI, KRAKEN]
+        assert stats.bytes_transferred == 0
+
+        get_exchange_data(product="BTCUSD", kraken=True, quantity=10, cache=cache)
+        mock_coinbase_client.assert_called_with("BTC-USD", params={"level": "2"})
+        assert mock_coinbase_client.call_count == 2
+
+    def test_get_exchange_data_deadline(self, mocker):
+        released = threading.Event()
+
+        def slow_kraken_response(*args, **kwargs):
+            released.wait(5)
+            return successful_kraken_response()
+
+        mocker.patch(
+            "orderbooks.integrations.exchanges.KrakenClient.get_order_book",
+            side_effect=slow_kraken_response,
+        )
+        mocker.patch(
+            "orderbooks.integrations.exchanges.GeminiClient.get_order_book",
+            return_value=successful_gemini_response(),
+        )
+        mocker.patch(
+            "orderbooks.integrations.exchanges.CoinBaseClient.get_order_book",
+            side_effect=Exception("Timeout Error: read timed out"),
+        )
+        stats = FetchStats()
+
+        try:
+            bids, offers = get_exchange_data(
+                product="BTCUSD", kraken=True, stats=stats, deadline=0.05
+            )
+        finally:
+            released.set()
+
+        assert {exchange for exchange, _, _ in bids} == {GEMINI}
+        assert {exchange for exchange, _, _ in offers} == {GEMINI}
+        assert stats.missing_exchanges == {
+            COINBASE: "Timeout Error: read timed out",
+            KRAKEN: "no response within 50 ms",
+        }
+
+    def test_get_exchange_data_deadline_no_exchange(self, mocker):
+        for client in ("KrakenClient", "GeminiClient", "CoinBaseClient"):
+            mocker.patch(
+                f"orderbooks.integrations.exchanges.{client}.get_order_book",
+                side_effect=Exception("Connection Error: refused"),
+            )
+
+        with pytest.raises(Exception, match="No exchange order book fetched within 50 ms"):
+            get_exchange_data(product="BTCUSD", kraken=True, deadline=0.05)
+
+    def test_get_buy_and_sell_price_deadline_partial_fill(self, mocker):
+        mocker.patch(
+            "orderbooks.integrations.exchanges.GeminiClient.get_order_book",
+            return_value=successful_gemini_response(),
+        )
+        mocker.patch(
+            "orderbooks.integrations.exchanges.CoinBaseClient.get_order_book",
+            side_effect=Exception("Http Error: 503"),
+        )
+        expected_bids, expected_offers = transform_exchange_data(
+            successful_gemini_response(), GEMINI, dict_datatype=True
+        )
+        quantity = sum(amount for _, _, amount in expected_offers) + 1
+
+        (buy_cost, remaining_buy), (sell_cost, remaining_sell) = get_buy_and_sell_price(
+            quantity, "BTCUSD", kraken_exchange=False, deadline=1
+        )
+
+        assert remaining_buy == 1
+        assert buy_cost == execute_market_order(quantity, expected_offers).total_cost
+        assert remaining_sell == quantity - sum(amount for _, _, amount in expected_bids)
+
+    def test_get_buy_and_sell_prices(self, mocker):
+        mocker.patch(
+            "orderbooks.integrations.exchanges.KrakenClient.get_order_book",
+            return_value=successful_kraken_response(),
+        )
+        mocker.patch(
+            "orderbooks.integrations.exchanges.GeminiClient.get_order_book",
+            return_value=successful_gemini_response(),
+        )
+        mocker.patch(
+            "orderbooks.integrations.exchanges.CoinBaseClient.get_order_book",
+            return_value=successful_coinbase_response(),
+        )
+        quantities = [0.1, 1, 5, 10.5]
+
+        ladder = get_buy_and_sell_prices(
+            quantities=quantities, product="BTCUSD", kraken_exchange=True
+        )
+
+        assert ladder == [
+            (*buy_report, *sell_report)
+            for buy_report, sell_report in (
+                get_buy_and_sell_price(
+                    quantity=quantity, product="BTCUSD", kraken_exchange=True
+                )
+                for quantity in quantities
+            )
+        ]
+
+    @pytest.mark.parametrize(
+        [
+            "bid",
+            "limit_price",
+            "max_slippage_bps",
+            "expected_quantity",
+            "expected_cost",
+            "expected_transactions",
+        ],
+        [
+            # Every level of the book averages under the limit.
+            (False, "200", None, "6", "700.00", {GEMINI: ["1", "100"], KRAKEN: ["5", "120"]}),
+            # Averaging 110 needs 1 at 100 and 1 at 120.
+            (False, "110", None, "2", "220.00", {GEMINI: ["1", "100"], KRAKEN: ["1", "120"]}),
+            # The best price is already above the limit.
+            (False, "99", None, "0", "0.00", {}),
+            # 100 bps from 100 is an average of 101, 1 at 100 and 1/19 at 120.
+            (
+                False,
+                None,
+                100,
+                "1.05263157",
+                "106.32",
+                {GEMINI: ["1", "100"], KRAKEN: ["0.05263157", "120"]},
+            ),
+            # The tighter of the limit price and slippage applies.
+            (
+                False,
+                "101",
+                1000,
+                "1.05263157",
+                "106.32",
+                {GEMINI: ["1", "100"], KRAKEN: ["0.05263157", "120"]},
+            ),
+            # Selling keeps the average above the limit, 2 at 90 and 1 at 60 average 80.
+            (True, "80", None, "3", "240.00", {COINBASE: ["2", "90"], KRAKEN: ["1", "60"]}),
+            # 10000 bps allows any average down to 0.
+            (True, None, 10000, "6", "420.00", {COINBASE: ["2", "90"], KRAKEN: ["4", "60"]}),
+        ],
+    )
+    def test_max_fillable_quantity(
+        self,
+        bid,
+        limit_price,
+        max_slippage_bps,
+        expected_quantity,
+        expected_cost,
+        expected_transactions,
+    ):
+        if bid:
+            order_book = [
+                (KRAKEN, Decimal("60"), Decimal("4")),
+                (COINBASE, Decimal("90"), Decimal("2")),
+            ]
+        else:
+            order_book = [
+                (KRAKEN, Decimal("120"), Decimal("5")),
+                (GEMINI, Decimal("100"), Decimal("1")),
+            ]
+
+        quantity, cost, transactions = max_fillable_quantity(
+            order_book, bid=bid, limit_price=limit_price, max_slippage_bps=max_slippage_bps
+        )
+
+        assert quantity == Decimal(expected_quantity)
+        assert str(cost) == expected_cost
+        assert {
+            exchange: [amount, price]
+            for exchange, (amount, price) in transactions.items()
+            if amount
+        } == {
+            exchange: [Decimal(amount), Decimal(price)]
+            for exchange, (amount, price) in expected_transactions.items()
+        }
+
+    @pytest.mark.parametrize("seed", range(30))
+    def test_max_fillable_quantity_is_largest(self, seed):
+        rng = random.Random(seed)
+        bid = rng.choice([True, False])
+        side = -1 if bid else 1
+        order_book = sorted(
+            (
+                (
+                    rng.choice([GEMINI, COINBASE, KRAKEN]),
+                    Decimal(rng.randint(39000, 39500)),
+                    Decimal(rng.randint(1, 10**8)).scaleb(-8),
+                )
+                for _ in range(rng.randint(1, 50))
+            ),
+            key=lambda level: level[1],
+            reverse=bid,
+        )
+        limit_price = order_book[0][1] + side * rng.randint(0, 300)
+
+        def notional(quantity):
+            cost = Decimal(0)
+            for _, price, amount in order_book:
+                cost += price * min(amount, quantity)
+                quantity -= min(amount, quantity)
+            return cost
+
+        quantity, _, _ = max_fillable_quantity(
+            order_book, bid=bid, limit_price=limit_price
+        )
 
+        assert side * notional(quantity) <= side * limit_price * quantity
+        if quantity < sum(amount for _, _, amount in order_book):
+            next_quantity = quantity + Decimal("1E-8")
+            assert side * notional(next_quantity) > side * limit_price * next_quantity
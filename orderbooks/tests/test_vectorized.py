@@ -0,0 +1,129 @@
+import random
+from decimal import Decimal
+
+import pytest
+
+from orderbooks.books import MergedSide, OrderBookSide
+from orderbooks.integrations.constants import GEMINI, KRAKEN
+from orderbooks.tests.helpers import random_book, random_quantity
+from orderbooks.utils import (DepthIndex, execute_market_order,
+                              execute_market_order_fixed_point)
+from orderbooks.vectorized import (FLOAT_TOLERANCE, VectorizedIndex,
+                                   execute_market_order_vectorized, quote_index)
+
+np = pytest.importorskip("numpy")
+
+
+class TestVectorized:
+    @pytest.mark.parametrize("seed", range(200))
+    def test_matches_decimal_path(self, seed):
+        rng = random.Random(seed)
+        order_book, bid = random_book(rng)
+        quantity = random_quantity(rng)
+
+        expected = execute_market_order(quantity, order_book, bid=bid)
+        report = execute_market_order_vectorized(quantity, order_book, bid=bid)
+        cost, remaining = report
+
+        assert (type(cost), str(cost)) == (
+            type(expected.total_cost),
+            str(expected.total_cost),
+        )
+        assert (type(remaining), str(remaining)) == (
+            type(expected.remaining),
+            str(expected.remaining),
+        )
+        assert str(report.fills) == str(expected.fills)
+        assert report.levels_consumed == expected.levels_consumed
+        assert report.vwap == expected.vwap
+
+    @pytest.mark.parametrize("seed", range(100))
+    def test_quote_many_matches_depth_index(self, seed):
+        rng = random.Random(seed)
+        order_book, _ = random_book(rng)
+        quantities = [random_quantity(rng) for _ in range(10)]
+        index = DepthIndex(order_book)
+
+        quotes = VectorizedIndex(order_book).quote_many(quantities)
+
+        assert [(str(cost), str(remaining)) for cost, remaining in quotes] == [
+            (str(cost), str(remaining)) for cost, remaining in map(index.quote, quantities)
+        ]
+
+    @pytest.mark.parametrize("seed", range(100))
+    def test_float_mode_within_tolerance(self, seed):
+        rng = random.Random(seed)
+        order_book, _ = random_book(rng)
+        quantities = [random_quantity(rng) for _ in range(10)]
+        index = DepthIndex(order_book)
+
+        quotes = VectorizedIndex(order_book, exact=False).quote_many(quantities)
+
+        for quantity, (cost, remaining) in zip(quantities, quotes):
+            expected_cost, expected_remaining = index.quote(quantity)
+            assert cost == pytest.approx(
+                float(expected_cost), rel=FLOAT_TOLERANCE, abs=0.005
+            )
+            assert remaining == pytest.approx(float(expected_remaining), abs=1e-6)
+
+    def test_merges_runs_in_price_order(self):
+        order_book = MergedSide(
+            [
+                OrderBookSide.from_records([["12", "1"], ["10", "2"]], GEMINI),
+                OrderBookSide.from_records([["11", "3"], ["10", "4"]], KRAKEN),
+            ],
+            bid=True,
+        )
+
+        index = VectorizedIndex(order_book)
+
+        assert list(index.prices) == [price for _, price, _ in order_book.iter_ticks()]
+        assert list(index.exchange_ids) == [
+            exchange for exchange, _, _ in order_book.iter_ticks()
+        ]
+        assert index.quote(5) == (Decimal("55.00"), 0)
+
+    def test_exact_beyond_int64(self):
+        order_book = OrderBookSide.from_records(
+            [["9" + "0" * 12, "1" + "0" * 10]], KRAKEN, price_decimals=0, size_decimals=0
+        )
+
+        index = VectorizedIndex(order_book)
+
+        assert index.cumulative_notionals.dtype == object
+        assert index.quote(10**10) == DepthIndex(order_book).quote(10**10)
+
+    def test_empty_book(self):
+        assert VectorizedIndex(OrderBookSide()).quote_many([0, 10]) == [
+            (Decimal("0.00"), Decimal("0")),
+            (Decimal("0.00"), Decimal("10")),
+        ]
+        assert VectorizedIndex(OrderBookSide(), exact=False).quote_many([10]) == [
+            (0.0, 10.0)
+        ]
+
+    def test_falls_back_without_numpy(self, mocker):
+        mocker.patch("orderbooks.vectorized.np", None)
+        fixed_point = mocker.patch(
+            "orderbooks.vectorized.execute_market_order_fixed_point",
+            return_value=(Decimal(1), 0),
+        )
+        order_book = OrderBookSide()
+
+        assert isinstance(quote_index(order_book), DepthIndex)
+        assert execute_market_order_vectorized(1, order_book, bid=True) == (Decimal(1), 0)
+        fixed_point.assert_called_once_with(1, order_book, bid=True)
+
+    def test_matches_fixed_point_engine(self):
+        order_book = OrderBookSide.from_records(
+            [["39163.70000", "1.539"], ["39166.60000", "0.020"], ["39167.70000", "0.103"]],
+            KRAKEN,
+            price_decimals=5,
+        )
+
+        expected = execute_market_order_fixed_point(1.559, order_book)
+        report = execute_market_order_vectorized(1.559, order_book)
+
+        assert report == expected
+        assert str(report.fills) == str(expected.fills)
+        assert report.levels_consumed == 2
@@ -1,75 +1,587 @@
-from decimal import Decimal
+import json
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from concurrent.futures import (Future, ThreadPoolExecutor, as_completed,
+                                wait)
+from decimal import ROUND_DOWN, Decimal, getcontext
+from itertools import groupby
+from operator import itemgetter
 
-from orderbooks.integrations.constants import (
-    COINROUTES_SYMBOL_TO_COINBASE_SYMBOL, COINROUTES_SYMBOL_TO_GEMINI_SYMBOL,
-    COINROUTES_SYMBOL_TO_KRAKEN_SYMBOL,
-    KRAKEN_REQUEST_SYMBOL_TO_RESULTS_SYMBOL, KRAKEN, COINBASE, GEMINI)
-from orderbooks.integrations.exchanges import (CoinBaseClient, GeminiClient,
-                                               KrakenClient)
+from orderbooks.books import (EXCHANGES, MergedBook, MergedSide, OrderBookSide,
+                              from_ticks, price_key, product_decimals, to_ticks)
+from orderbooks.cache import depth_key
+from orderbooks.integrations.adapters import (ExchangeAdapter,
+                                              enabled_adapters,
+                                              registered_exchanges)
+from orderbooks.integrations.constants import (DEFAULT_MAX_WORKERS,
+                                               DEFAULT_PRICE_DECIMALS,
+                                               DEFAULT_SIZE_DECIMALS, KRAKEN)
+from orderbooks.recording import get_recorder
 
 TWOPLACES = Decimal(10) ** -2
 
 
-def transform_exchange_data(data, exchange, dict_datatype=False):
+def iter_exchange_levels(
+    records,
+    exchange,
+    dict_datatype=False,
+    price_decimals=DEFAULT_PRICE_DECIMALS,
+    size_decimals=DEFAULT_SIZE_DECIMALS,
+    aggregate=False,
+):
+    """Normalize the levels of one side of an exchange order book one at a time.
 
+    Prices and amounts go through the same ticks as an `OrderBookSide` so both
+    normalizations yield identical levels. With `aggregate` consecutive records
+    quoting the same price are merged, a level being yielded once the next
+    price is read.
+    """
     if dict_datatype:
-        bids = [(exchange, Decimal(record.get("price")), Decimal(record.get("amount"))) for record in data["bids"]]
-        offers = [(exchange, Decimal(record.get("price")), Decimal(record.get("amount"))) for record in data["asks"]]
+        records = ((record.get("price"), record.get("amount")) for record in records)
+    if not aggregate:
+        for record in records:
+            yield (
+                exchange,
+                from_ticks(to_ticks(record[0], price_decimals), price_decimals),
+                from_ticks(to_ticks(record[1], size_decimals), size_decimals),
+            )
+        return
 
-        return bids, offers
+    for price, level in groupby(records, key=itemgetter(0)):
+        yield (
+            exchange,
+            from_ticks(to_ticks(price, price_decimals), price_decimals),
+            from_ticks(
+                sum([to_ticks(record[1], size_decimals) for record in level]),
+                size_decimals,
+            ),
+        )
 
-    bids = [(exchange, Decimal(record[0]), Decimal(record[1])) for record in data["bids"]]
-    offers = [(exchange, Decimal(record[0]), Decimal(record[1])) for record in data["asks"]]
-    return bids, offers
 
+def transform_exchange_data(
+    data,
+    exchange,
+    dict_datatype=False,
+    lazy=False,
+    price_decimals=DEFAULT_PRICE_DECIMALS,
+    size_decimals=DEFAULT_SIZE_DECIMALS,
+    aggregate=False,
+):
+    """Normalize an exchange order book into (exchange, price, amount) bids and offers.
 
-def get_exchange_data(product: str, kraken=False):
-    bid_order_book = []
-    offer_order_book = []
-    gemini_c = GeminiClient()
-    coinbase_c = CoinBaseClient()
-    gemini_product_symbol = COINROUTES_SYMBOL_TO_GEMINI_SYMBOL.get(product)
-    coinbase_product_symbol = COINROUTES_SYMBOL_TO_COINBASE_SYMBOL.get(product)
+    Each side is an `OrderBookSide` storing prices and amounts as integers scaled
+    by `price_decimals` and `size_decimals` decimal places. When `lazy` is set
+    each side is instead a generator that only converts a level once it is
+    consumed, so walking the top of a deep book never normalizes the rest.
 
-    gemini_order_book_request = gemini_c.get_order_book(gemini_product_symbol)
-    gemini_bids, gemini_offers = transform_exchange_data(gemini_order_book_request, GEMINI, dict_datatype=True)
-    bid_order_book.extend(gemini_bids)
-    offer_order_book.extend(gemini_offers)
+    With `aggregate` the records at the same price are merged into one level of
+    their total amount, which prices orders the same with fewer levels to merge
+    and walk. Levels are per exchange, so the transactions are unchanged.
+    """
+    if lazy:
+        return (
+            iter_exchange_levels(
+                data["bids"],
+                exchange,
+                dict_datatype,
+                price_decimals,
+                size_decimals,
+                aggregate,
+            ),
+            iter_exchange_levels(
+                data["asks"],
+                exchange,
+                dict_datatype,
+                price_decimals,
+                size_decimals,
+                aggregate,
+            ),
+        )
 
-    coinbase_order_book_request = coinbase_c.get_order_book(
-        coinbase_product_symbol, params={"level": "3"}
+    bids = OrderBookSide.from_records(
+        data["bids"], exchange, dict_datatype, price_decimals, size_decimals, aggregate
     )
-    coinbase_bids, coinbase_offers = transform_exchange_data(
-        coinbase_order_book_request, COINBASE
+    offers = OrderBookSide.from_records(
+        data["asks"], exchange, dict_datatype, price_decimals, size_decimals, aggregate
+    )
+    return bids, offers
+
+
+class FetchStats:
+    """Bytes transferred and depth escalations made while fetching order books,
+    the age in seconds of every exchange book served from the snapshot cache,
+    why the book of an exchange left out of the quote is missing, and per
+    exchange the number of records and of price levels they were aggregated
+    into and the number of records and of those kept by truncation. Pricing
+    from a `MergedBook` records the seconds spent preparing it separately from
+    the number of orders priced on it and the seconds they took."""
+
+    def __init__(self):
+        self.bytes_transferred = 0
+        self.escalations = 0
+        self.cache_ages = {}
+        self.missing_exchanges = {}
+        self.aggregated_levels = {}
+        self.truncated_records = {}
+        self.prepare_seconds = 0.0
+        self.quotes = 0
+        self.quote_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, bytes_transferred=0, escalations=0):
+        with self._lock:
+            self.bytes_transferred += bytes_transferred
+            self.escalations += escalations
+
+    def record_cache_hit(self, exchange, age):
+        with self._lock:
+            self.cache_ages[exchange] = max(age, self.cache_ages.get(exchange, age))
+
+    def record_missing(self, exchange, reason):
+        with self._lock:
+            self.missing_exchanges[exchange] = reason
+
+    def record_aggregation(self, exchange, records, levels):
+        with self._lock:
+            total_records, total_levels = self.aggregated_levels.get(exchange, (0, 0))
+            self.aggregated_levels[exchange] = (
+                total_records + records,
+                total_levels + levels,
+            )
+
+    def record_truncation(self, exchange, records, kept):
+        with self._lock:
+            total_records, total_kept = self.truncated_records.get(exchange, (0, 0))
+            self.truncated_records[exchange] = (total_records + records, total_kept + kept)
+
+    def record_preparation(self, seconds):
+        with self._lock:
+            self.prepare_seconds += seconds
+
+    def record_quotes(self, quotes, seconds):
+        with self._lock:
+            self.quotes += quotes
+            self.quote_seconds += seconds
+
+
+def cached_snapshot(get_order_book, exchange, product, params=None, cache=None, stats=None):
+    """Return the raw order book at the depth of `params` from the snapshot cache,
+    fetching it with `get_order_book(params)` and caching it on a miss."""
+    if cache is None:
+        return get_order_book(params)
+    key = (exchange, product, depth_key(params))
+    cached = cache.get(key)
+    if cached is not None:
+        snapshot, age = cached
+        if stats is not None:
+            stats.record_cache_hit(exchange, age)
+        return snapshot
+    snapshot = get_order_book(params)
+    cache.put(key, snapshot)
+    return snapshot
+
+
+def side_amount(records, dict_datatype=False):
+    if dict_datatype:
+        return sum(Decimal(record.get("amount")) for record in records)
+    return sum(Decimal(record[1]) for record in records)
+
+
+def truncate_records(records, quantity, dict_datatype=False):
+    """Return the shortest prefix of price ordered records whose cumulative amount
+    reaches `quantity`, or every record when they cannot fill it.
+
+    A market order for up to `quantity` walks an exchange's levels in order and
+    never takes more than `quantity` from it, so the levels past the prefix can
+    never be part of its fill, however the exchange books are merged.
+    """
+    quantity_decimal = Decimal(quantity)
+    cumulative_amount = 0
+    for index, record in enumerate(records):
+        cumulative_amount += Decimal(record.get("amount") if dict_datatype else record[1])
+        if cumulative_amount >= quantity_decimal:
+            return records[: index + 1]
+    return records
+
+
+def fetch_to_depth(get_order_book, depth_ladder, quantity, dict_datatype=False):
+    """Fetch an order book at the shallowest depth of the ladder able to fill `quantity`.
+
+    The next depth is only requested while a side came back truncated (as many
+    levels as the depth allows) without enough cumulative amount to fill the
+    quantity. Returns the order book and the number of escalations made.
+    """
+    quantity_decimal = Decimal(quantity)
+    for escalations, (params, max_levels) in enumerate(depth_ladder):
+        order_book = get_order_book(dict(params))
+        if max_levels is None or escalations == len(depth_ladder) - 1:
+            break
+        if all(
+            len(order_book[side]) < max_levels
+            or side_amount(order_book[side], dict_datatype) >= quantity_decimal
+            for side in ("bids", "asks")
+        ):
+            break
+
+    return order_book, escalations
+
+
+def fetch_order_book(
+    adapter: ExchangeAdapter,
+    product: str,
+    lazy=False,
+    quantity=None,
+    stats=None,
+    cache=None,
+    rate_limit=False,
+    max_quantity=None,
+    deadline=None,
+):
+    """Fetch and normalize the order book of a product from the exchange of `adapter`.
+
+    With `rate_limit` every request sent, retries and hedged duplicates
+    included, waits for a token of the adapter's rate limiter first, while
+    books served from the cache cost none. Books
+    received are queued to the snapshot recorder while recording.
+
+    With a `max_quantity` each side is truncated before normalization to the
+    levels that can take part in filling it, see `truncate_records`. Lazy
+    sides are left whole as they only normalize the levels walked anyway.
+
+    With a `deadline`, a `time.monotonic()` time, the requests and their retries
+    are bounded by the time left before it, see `ExchangeClient`.
+    """
+    client = adapter.create_client(deadline=deadline, rate_limit=rate_limit)
+    symbol = adapter.symbol(product)
+    recorder = get_recorder()
+
+    def request_order_book(params):
+        fetched_at = time.time()
+        start = time.perf_counter()
+        payload = adapter.get_order_book(client, symbol, params)
+        if recorder is not None:
+            recorder.record(
+                adapter.EXCHANGE,
+                product,
+                params,
+                payload,
+                fetched_at,
+                time.perf_counter() - start,
+            )
+        return payload
+
+    def get_order_book(params):
+        payload = cached_snapshot(
+            request_order_book,
+            adapter.EXCHANGE,
+            product,
+            params,
+            cache=cache,
+            stats=stats,
+        )
+        return adapter.order_book(payload, symbol)
+
+    escalations = 0
+    with adapter.concurrency:
+        if quantity is None:
+            order_book = get_order_book(adapter.FULL_DEPTH_PARAMS)
+        else:
+            order_book, escalations = fetch_to_depth(
+                get_order_book,
+                adapter.DEPTH_LADDER,
+                quantity,
+                dict_datatype=adapter.DICT_DATATYPE,
+            )
+    if stats is not None:
+        stats.record(client.bytes_transferred, escalations)
+    if max_quantity is not None and not lazy:
+        records = len(order_book["bids"]) + len(order_book["asks"])
+        order_book = {
+            side: truncate_records(order_book[side], max_quantity, adapter.DICT_DATATYPE)
+            for side in ("bids", "asks")
+        }
+        if stats is not None:
+            stats.record_truncation(
+                adapter.EXCHANGE,
+                records,
+                len(order_book["bids"]) + len(order_book["asks"]),
+            )
+    price_decimals, size_decimals = product_decimals(product)
+    bids, offers = transform_exchange_data(
+        order_book,
+        adapter.EXCHANGE,
+        dict_datatype=adapter.DICT_DATATYPE,
+        lazy=lazy,
+        price_decimals=price_decimals,
+        size_decimals=size_decimals,
+        aggregate=adapter.AGGREGATE_LEVELS,
     )
-    bid_order_book.extend(coinbase_bids)
-    offer_order_book.extend(coinbase_offers)
-
-    if kraken:
-        kraken_c = KrakenClient()
-        kraken_product_symbol = COINROUTES_SYMBOL_TO_KRAKEN_SYMBOL.get(product)
-        kraken_order_book_request = kraken_c.get_order_book(kraken_product_symbol)
-        results_symbol = KRAKEN_REQUEST_SYMBOL_TO_RESULTS_SYMBOL.get(
-            kraken_product_symbol
+    if stats is not None and adapter.AGGREGATE_LEVELS and not lazy:
+        # Lazy sides are only aggregated as far as they are walked.
+        stats.record_aggregation(
+            adapter.EXCHANGE,
+            len(order_book["bids"]) + len(order_book["asks"]),
+            len(bids) + len(offers),
         )
-        kraken_bids, kraken_offers = transform_exchange_data(
-            kraken_order_book_request.get("result").get(results_symbol), KRAKEN
+    return bids, offers
+
+
+def get_exchange_data(
+    product: str,
+    kraken=False,
+    max_workers=DEFAULT_MAX_WORKERS,
+    lazy=False,
+    quantity=None,
+    stats=None,
+    cache=None,
+    deadline=None,
+    max_quantity=None,
+):
+    """Fetch and normalize the order books of every enabled exchange concurrently.
+
+    The exchanges are those of the registered adapters, Kraken being optional.
+    Each exchange book is normalized as soon as its response lands, but the
+    books are always combined in the adapters registration order (Gemini,
+    Coinbase, Kraken) so the result is identical to fetching them one after
+    another. Without `max_workers` every exchange is fetched at once.
+    Each side is returned as a `MergedSide` of the per exchange price ordered runs,
+    which are single use generators when `lazy` normalization is requested.
+
+    When a `quantity` is given each book is fetched adaptively, starting shallow
+    and only escalating depth while it cannot fill the quantity. The bytes
+    transferred and escalations made are recorded on `stats` when given.
+
+    When a `SnapshotCache` is given, raw exchange books still younger than its
+    max-age are reused instead of fetched, and their age recorded on `stats`.
+
+    With a `deadline` in seconds the books are combined from the exchanges that
+    answered in time, rather than waiting for the slowest one. An exchange that
+    is too slow or fails is left out and recorded as missing on `stats`.
+
+    With a `max_quantity` every exchange book is truncated to the levels that
+    could fill orders up to it before the books are merged, and the records
+    kept recorded on `stats`.
+    """
+    adapters = enabled_adapters(optional=[KRAKEN] if kraken else [])
+    if max_workers is None:
+        max_workers = len(adapters)
+    fetch_kwargs = dict(
+        product=product,
+        lazy=lazy,
+        quantity=quantity,
+        stats=stats,
+        cache=cache,
+        max_quantity=max_quantity,
+    )
+
+    if deadline is None:
+        exchange_books = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(fetch_order_book, adapter, **fetch_kwargs): adapter.EXCHANGE
+                for adapter in adapters
+            }
+            for future in as_completed(futures):
+                exchange_books[futures[future]] = future.result()
+    else:
+        exchange_books = fetch_within_deadline(
+            adapters, deadline, max_workers, fetch_kwargs, stats
         )
-        bid_order_book.extend(kraken_bids)
-        offer_order_book.extend(kraken_offers)
 
+    books = [
+        exchange_books[adapter.EXCHANGE]
+        for adapter in adapters
+        if adapter.EXCHANGE in exchange_books
+    ]
+    bid_order_book = MergedSide((bids for bids, _ in books), bid=True)
+    offer_order_book = MergedSide((offers for _, offers in books), bid=False)
     return bid_order_book, offer_order_book
 
 
+def fetch_within_deadline(adapters, deadline, max_workers, fetch_kwargs, stats=None):
+    """Return the order books of the exchanges fetched within `deadline` seconds.
+
+    Each exchange is fetched on its own daemon thread, at most `max_workers` at
+    once, as the workers of an executor would be joined at interpreter exit,
+    waiting for the late fetches. Those are left running with their result
+    dropped, but their requests are bounded by the deadline too so they end
+    soon after it, and the fetches not started yet by then are never started.
+    """
+    expires_at = time.monotonic() + deadline
+    slots = threading.BoundedSemaphore(max_workers)
+    futures = {}
+    for adapter in adapters:
+        future = Future()
+        futures[future] = adapter.EXCHANGE
+        threading.Thread(
+            target=_fetch_into,
+            args=(future, slots, adapter, dict(fetch_kwargs, deadline=expires_at)),
+            name=f"fetch-{adapter.EXCHANGE}",
+            daemon=True,
+        ).start()
+    done, _ = wait(futures, timeout=deadline)
+    for future in futures:
+        future.cancel()
+
+    exchange_books = {}
+    for future, exchange in futures.items():
+        if future not in done:
+            reason = f"no response within {deadline * 1000:g} ms"
+        elif future.exception() is not None:
+            reason = str(future.exception())
+        else:
+            exchange_books[exchange] = future.result()
+            continue
+        if stats is not None:
+            stats.record_missing(exchange, reason)
+
+    if not exchange_books:
+        raise Exception(f"No exchange order book fetched within {deadline * 1000:g} ms")
+    return exchange_books
+
+
+def _fetch_into(future, slots, adapter, fetch_kwargs):
+    with slots:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fetch_order_book(adapter, **fetch_kwargs))
+        except Exception as err:
+            future.set_exception(err)
+
+
+def new_transactions(last_price=0):
+    """The product amount filled on and last price of every registered exchange."""
+    return {exchange: [0, last_price] for exchange in registered_exchanges()}
+
+
+class FillReport:
+    """
+    The result of a market order: its total cost rounded to cents, the amount
+    left unfilled, the amount filled on and last price of every registered
+    exchange in `fills`, the number of levels it took from and its volume
+    weighted average price (None when nothing was filled).
+
+    Iterating yields the total cost and remaining amount, so a report unpacks
+    and compares equal like the (cost, remaining) pairs of `DepthIndex.quote`.
+    """
+
+    __slots__ = ("total_cost", "remaining", "fills", "levels_consumed", "vwap")
+
+    def __init__(self, total_cost, remaining, fills, levels_consumed=0, vwap=None):
+        self.total_cost = total_cost
+        self.remaining = remaining
+        self.fills = fills
+        self.levels_consumed = levels_consumed
+        self.vwap = vwap
+
+    @classmethod
+    def from_fill(cls, total_cost, filled_amount, remaining, fills, levels_consumed):
+        """Build a report from the unrounded cost of the `filled_amount`."""
+        vwap = total_cost / filled_amount if filled_amount else None
+        return cls(
+            total_cost.quantize(TWOPLACES), remaining, fills, levels_consumed, vwap
+        )
+
+    def __iter__(self):
+        yield self.total_cost
+        yield self.remaining
+
+    def __eq__(self, other):
+        if isinstance(other, tuple):
+            return tuple(self) == other
+        if not isinstance(other, FillReport):
+            return NotImplemented
+        return all(
+            getattr(self, slot) == getattr(other, slot) for slot in self.__slots__
+        )
+
+    def __repr__(self):
+        fields = ", ".join(f"{slot}={getattr(self, slot)!r}" for slot in self.__slots__)
+        return f"FillReport({fields})"
+
+    @property
+    def filled_amount(self):
+        return sum(amount for amount, _ in self.fills.values())
+
+    def as_dict(self):
+        """The report with its amounts and prices as strings for serializing, shown
+        as by `render_fill_text`: the VWAP rounded to cents like the total cost."""
+        return {
+            "total_cost": str(self.total_cost),
+            "remaining": str(display_amount(self.remaining)),
+            "vwap": None if self.vwap is None else str(self.vwap.quantize(TWOPLACES)),
+            "levels_consumed": self.levels_consumed,
+            "fills": {
+                exchange: {
+                    "amount": str(display_amount(amount)),
+                    "last_price": str(display_amount(price)),
+                }
+                for exchange, (amount, price) in self.fills.items()
+                if amount
+            },
+        }
+
+
+def display_amount(amount):
+    """An amount or price for display, without the trailing zeros of its
+    fractional part that normalizing it to the product's ticks pads it with."""
+    amount = Decimal(amount)
+    if amount == amount.to_integral_value():
+        return amount.quantize(Decimal(1))
+    return amount.normalize()
+
+
+def render_fills(fills):
+    """The amount filled on and last price of every exchange filled on, from
+    transactions shaped like the `fills` of a `FillReport`."""
+    exchanges = ", ".join(
+        f"{exchange} {display_amount(amount)} up to {display_amount(price)}"
+        for exchange, (amount, price) in fills.items()
+        if amount
+    )
+    return exchanges or "none"
+
+
+def render_fill_text(report):
+    """One line describing a `FillReport`, with the exchanges filled on."""
+    if not report.levels_consumed:
+        return f"Nothing filled, {display_amount(report.remaining)} remaining."
+    vwap = "n/a" if report.vwap is None else f"{report.vwap:.2f}"
+    text = (
+        f"Filled {display_amount(report.filled_amount)} for {report.total_cost}"
+        f" at a VWAP of {vwap} over {report.levels_consumed} levels"
+    )
+    if report.remaining:
+        text += f", {display_amount(report.remaining)} remaining"
+    return f"{text}. Per exchange: {render_fills(report.fills)}."
+
+
+def render_fill_json(report, **fields):
+    """A `FillReport` as a JSON object, after any extra `fields` e.g. its side."""
+    return json.dumps({**fields, **report.as_dict()})
+
+
 def execute_market_order(product_amount_target, order_book, bid=False):
+    """Walk the order book from the best price until the product amount is filled,
+    returning a `FillReport`.
+
+    A list of levels is walked in price order, leaving the list itself as it is.
+    Any other order book such as a `MergedSide` or `OrderBookSide` is expected to
+    already be in price order, prepare a `MergedBook` to price many orders.
+    """
     product_amount_decimal = Decimal(product_amount_target)
-    order_book.sort(key=lambda x: x[1], reverse=bid)
+    if isinstance(order_book, list):
+        order_book = sorted(order_book, key=price_key, reverse=bid)
 
     cumulative_amount = 0
-    total_cost = 0
-    transactions = {KRAKEN: [0, 0], GEMINI: [0, 0], COINBASE: [0, 0]}
+    total_cost = Decimal(0)
+    transactions = new_transactions()
+    levels_consumed = 0
 
-    for exchange, price, amount in order_book:
+    for levels_consumed, (exchange, price, amount) in enumerate(order_book, 1):
         previous_cumulative_amount = cumulative_amount
         cumulative_amount += amount
 
@@ -79,36 +591,466 @@ def execute_market_order(product_amount_target, order_book, bid=False):
             total_cost += partial_filled_cost
             transactions[exchange][0] += partial_product_amount
             transactions[exchange][1] = price
-            print(transactions)
-            return total_cost.quantize(TWOPLACES), 0
+            return FillReport.from_fill(
+                total_cost, product_amount_decimal, 0, transactions, levels_consumed
+            )
         elif cumulative_amount == product_amount_decimal:
             total_cost += price * amount
             transactions[exchange][0] += amount
             transactions[exchange][1] = price
-            print(transactions)
-            return total_cost.quantize(TWOPLACES), 0
+            return FillReport.from_fill(
+                total_cost, product_amount_decimal, 0, transactions, levels_consumed
+            )
 
         total_cost += price * amount
         transactions[exchange][0] += amount
         transactions[exchange][1] = price
 
-    print(transactions)
-    return total_cost.quantize(TWOPLACES), product_amount_decimal - cumulative_amount
+    return FillReport.from_fill(
+        total_cost,
+        cumulative_amount,
+        product_amount_decimal - cumulative_amount,
+        transactions,
+        levels_consumed,
+    )
 
 
-def get_buy_and_sell_price(quantity, product, kraken_exchange):
-    bid_order_book, offer_order_book = get_exchange_data(
-        product=product, kraken=kraken_exchange
+def ticks_floor(value: Decimal, decimals: int):
+    """Return floor(value * 10**decimals) and whether that is exactly the scaled value."""
+    sign, digits, exponent = value.as_tuple()
+    coefficient = int("".join(map(str, digits))) * (-1 if sign else 1)
+    exponent += decimals
+    if exponent >= 0:
+        return coefficient * 10**exponent, True
+    scaled, remainder = divmod(coefficient, 10**-exponent)
+    return scaled, remainder == 0
+
+
+def within_precision(*totals):
+    """Whether integer tick totals are below 10**precision of the Decimal context,
+    so that the Decimal path sums them without rounding."""
+    precision_limit = 10 ** getcontext().prec
+    return all(total < precision_limit for total in totals)
+
+
+def tick_fill(
+    product_amount_decimal,
+    target_ticks,
+    target_is_exact,
+    levels_consumed,
+    cumulative_ticks,
+    notional_ticks,
+    next_price,
+    price_decimals,
+    size_decimals,
+):
+    """Return the unrounded total cost, amount of the levels consumed in full and
+    remaining amount of a market order for `product_amount_decimal`, floored to
+    `target_ticks`, that consumed `levels_consumed` levels in full totalling
+    `cumulative_ticks` size and `notional_ticks` notional. The rest is taken at
+    the `next_price` ticks, or left unfilled when the book has no next level (None).
+
+    The totals are converted with the same Decimal operations as
+    `execute_market_order`, so the results equal its own while they are
+    `within_precision`.
+    """
+    # Mirror the Decimal path, whose running amount stays the int 0 until a level
+    # is consumed, so that even the exponents of the results match.
+    total_cost = Decimal(0)
+    cumulative_amount = 0
+    if levels_consumed:
+        total_cost = from_ticks(notional_ticks, price_decimals + size_decimals)
+        cumulative_amount = from_ticks(cumulative_ticks, size_decimals)
+        if target_is_exact and cumulative_ticks == target_ticks:
+            return total_cost, cumulative_amount, 0
+    if next_price is not None:
+        price = from_ticks(next_price, price_decimals)
+        total_cost += (product_amount_decimal - cumulative_amount) * price
+        return total_cost, cumulative_amount, 0
+    return total_cost, cumulative_amount, product_amount_decimal - cumulative_amount
+
+
+def tick_fill_cost(*args):
+    """Return the total cost rounded to cents and remaining amount of the market
+    order described by the arguments of `tick_fill`."""
+    total_cost, _, remaining = tick_fill(*args)
+    return total_cost.quantize(TWOPLACES), remaining
+
+
+def execute_market_order_fixed_point(product_amount_target, order_book, bid=False):
+    """Exact fixed-point version of `execute_market_order`.
+
+    The order book must be a price ordered `OrderBookSide`, or a `MergedSide` of
+    them. Amounts and costs are accumulated as integer ticks and only converted
+    back to Decimal for the final, partially filled level and the report, using
+    the same Decimal operations as `execute_market_order`, so the total cost,
+    remaining amount and fills of its `FillReport` are bit-identical to it.
+    """
+    product_amount_decimal = Decimal(product_amount_target)
+    price_decimals = order_book.price_decimals
+    size_decimals = order_book.size_decimals
+    target_ticks, target_is_exact = ticks_floor(product_amount_decimal, size_decimals)
+
+    cumulative_ticks = 0
+    notional_ticks = 0
+    levels_consumed = 0
+    transactions = new_transactions(last_price=None)
+    filled = False
+    partial_fill = None
+
+    for exchange, price, size in order_book.iter_ticks():
+        exchange_transactions = transactions[EXCHANGES[exchange]]
+        if cumulative_ticks + size > target_ticks:
+            partial_fill = exchange_transactions, price
+            break
+
+        cumulative_ticks += size
+        notional_ticks += price * size
+        levels_consumed += 1
+        exchange_transactions[0] += size
+        exchange_transactions[1] = price
+        if target_is_exact and cumulative_ticks == target_ticks:
+            filled = True
+            break
+
+    if not within_precision(cumulative_ticks, notional_ticks):
+        # The Decimal path would round its running totals, so defer to it.
+        return execute_market_order(product_amount_target, order_book, bid=bid)
+
+    next_price = None if partial_fill is None else partial_fill[1]
+    total_cost, cumulative_amount, remaining = tick_fill(
+        product_amount_decimal,
+        target_ticks,
+        target_is_exact,
+        levels_consumed,
+        cumulative_ticks,
+        notional_ticks,
+        next_price,
+        price_decimals,
+        size_decimals,
     )
-    buy_cost, remaining_buy_amount = execute_market_order(
-        quantity, offer_order_book, bid=False
+    for exchange_transactions in transactions.values():
+        if exchange_transactions[1] is None:
+            exchange_transactions[1] = 0
+        else:
+            exchange_transactions[0] = from_ticks(exchange_transactions[0], size_decimals)
+            exchange_transactions[1] = from_ticks(exchange_transactions[1], price_decimals)
+
+    if partial_fill is not None:
+        exchange_transactions = partial_fill[0]
+        exchange_transactions[0] += product_amount_decimal - cumulative_amount
+        exchange_transactions[1] = from_ticks(next_price, price_decimals)
+        levels_consumed += 1
+        filled = True
+
+    if filled:
+        return FillReport.from_fill(
+            total_cost, product_amount_decimal, 0, transactions, levels_consumed
+        )
+    return FillReport.from_fill(
+        total_cost, cumulative_amount, remaining, transactions, levels_consumed
+    )
+
+
+def market_order_cost(product_amount_target, order_book):
+    """Return the total cost and remaining amount of a market order walking a
+    price ordered `OrderBookSide` (or `MergedSide` of them) only as far as the
+    order fills.
+
+    Like `DepthIndex.quote` the results equal those of `execute_market_order`,
+    without tracking the transactions or building an index of the whole book,
+    which suits pricing each book of a long series once.
+    """
+    product_amount_decimal = Decimal(product_amount_target)
+    target_ticks, target_is_exact = ticks_floor(
+        product_amount_decimal, order_book.size_decimals
+    )
+
+    cumulative_ticks = 0
+    notional_ticks = 0
+    levels_consumed = 0
+    next_price = None
+    for _, price, size in order_book.iter_ticks():
+        if cumulative_ticks + size > target_ticks:
+            next_price = price
+            break
+        cumulative_ticks += size
+        notional_ticks += price * size
+        levels_consumed += 1
+        if target_is_exact and cumulative_ticks == target_ticks:
+            break
+
+    if not within_precision(cumulative_ticks, notional_ticks):
+        # The Decimal path would round its running totals, so defer to it.
+        return tuple(execute_market_order(product_amount_target, order_book))
+    return tick_fill_cost(
+        product_amount_decimal,
+        target_ticks,
+        target_is_exact,
+        levels_consumed,
+        cumulative_ticks,
+        notional_ticks,
+        next_price,
+        order_book.price_decimals,
+        order_book.size_decimals,
+    )
+
+
+def max_fillable_quantity(
+    order_book,
+    bid=False,
+    limit_price=None,
+    max_slippage_bps=None,
+    size_decimals=DEFAULT_SIZE_DECIMALS,
+):
+    """Find the largest amount a market order can fill in a single walk of the book
+    while its average price stays within `limit_price` (at most for a buy, at least
+    for a sell) and within `max_slippage_bps` basis points of the best price.
+
+    The amount is rounded down to `size_decimals` decimal places. Returns the
+    amount, its total cost and the transactions per exchange in the same shape
+    as `execute_market_order`.
+    """
+    if limit_price is None and max_slippage_bps is None:
+        raise ValueError("A limit price or a maximum slippage is required.")
+    if isinstance(order_book, list):
+        order_book = sorted(order_book, key=price_key, reverse=bid)
+
+    # A sell walks the bids keeping its average price above the limit, which is the
+    # buy condition with both sides of the inequality negated.
+    side = -1 if bid else 1
+    tightest = max if bid else min
+    size_quantum = Decimal(10) ** -size_decimals
+    cumulative_amount = Decimal(0)
+    total_cost = Decimal(0)
+    transactions = new_transactions()
+    limit = None if limit_price is None else Decimal(limit_price)
+    best_price = None
+
+    for exchange, price, amount in order_book:
+        if best_price is None:
+            best_price = price
+            if max_slippage_bps is not None:
+                slippage_limit = best_price * (
+                    1 + side * Decimal(max_slippage_bps) / 10000
+                )
+                limit = slippage_limit if limit is None else tightest(limit, slippage_limit)
+
+        if side * (total_cost + price * amount) <= side * limit * (cumulative_amount + amount):
+            cumulative_amount += amount
+            total_cost += price * amount
+            transactions[exchange][0] += amount
+            transactions[exchange][1] = price
+            continue
+
+        partial_amount = (limit * cumulative_amount - total_cost) / (price - limit)
+        partial_amount = partial_amount.quantize(size_quantum, rounding=ROUND_DOWN)
+        if side * (total_cost + price * partial_amount) > side * limit * (
+            cumulative_amount + partial_amount
+        ):
+            partial_amount -= size_quantum
+        if partial_amount > 0:
+            cumulative_amount += partial_amount
+            total_cost += price * partial_amount
+            transactions[exchange][0] += partial_amount
+            transactions[exchange][1] = price
+        break
+
+    return cumulative_amount, total_cost.quantize(TWOPLACES), transactions
+
+
+class DepthIndex:
+    """
+    Prefix sums of the cumulative size and notional of a price ordered
+    `OrderBookSide` (or `MergedSide` of them), built in one walk of the book.
+
+    Any quantity is then priced with a binary search plus one partial level,
+    giving the same total cost and remaining amount as `execute_market_order`.
+    """
+
+    def __init__(self, order_book):
+        self.order_book = order_book
+        self.price_decimals = order_book.price_decimals
+        self.size_decimals = order_book.size_decimals
+        self.prices = array("q")
+        self.cumulative_sizes = [0]
+        self.cumulative_notionals = [0]
+
+        cumulative_size = 0
+        cumulative_notional = 0
+        for _, price, size in order_book.iter_ticks():
+            cumulative_size += size
+            cumulative_notional += price * size
+            self.prices.append(price)
+            self.cumulative_sizes.append(cumulative_size)
+            self.cumulative_notionals.append(cumulative_notional)
+
+        self.exact = within_precision(cumulative_size, cumulative_notional)
+
+    def __len__(self):
+        return len(self.prices)
+
+    def quote(self, product_amount_target):
+        """Return the total cost and remaining amount of a market order."""
+        if not self.exact:
+            # The Decimal path would round its running totals, so walk the book.
+            return tuple(execute_market_order(product_amount_target, self.order_book))
+
+        product_amount_decimal = Decimal(product_amount_target)
+        target_ticks, target_is_exact = ticks_floor(
+            product_amount_decimal, self.size_decimals
+        )
+        # The number of levels that can be consumed in full.
+        levels = bisect_right(self.cumulative_sizes, target_ticks) - 1
+        return tick_fill_cost(
+            product_amount_decimal,
+            target_ticks,
+            target_is_exact,
+            levels,
+            self.cumulative_sizes[levels],
+            self.cumulative_notionals[levels],
+            self.prices[levels] if levels < len(self.prices) else None,
+            self.price_decimals,
+            self.size_decimals,
+        )
+
+    def quote_many(self, quantities):
+        return [self.quote(quantity) for quantity in quantities]
+
+
+def get_buy_and_sell_price(
+    quantity,
+    product,
+    kraken_exchange,
+    max_workers=DEFAULT_MAX_WORKERS,
+    adaptive_depth=False,
+    stats=None,
+    fixed_point=False,
+    cache=None,
+    deadline=None,
+):
+    """Price a market order for `quantity` on each side of a single fetch.
+
+    Returns the `FillReport`s of buying the quantity from the offers and of
+    selling it to the bids. The fixed-point engine prices them on a `MergedBook`
+    prepared from the fetch, recording the preparation and quote times on
+    `stats`, while the Decimal engine walks the lazily normalized sides.
+    """
+    bid_order_book, offer_order_book = get_exchange_data(
+        product=product,
+        kraken=kraken_exchange,
+        max_workers=max_workers,
+        lazy=not fixed_point,
+        quantity=quantity if adaptive_depth else None,
+        stats=stats,
+        cache=cache,
+        deadline=deadline,
+        max_quantity=quantity,
     )
-    sell_cost, remaining_sell_amount = execute_market_order(
-        quantity, bid_order_book, bid=True
+    if not fixed_point:
+        buy_report = execute_market_order(quantity, offer_order_book, bid=False)
+        sell_report = execute_market_order(quantity, bid_order_book, bid=True)
+        return buy_report, sell_report
+
+    started = time.perf_counter()
+    book = MergedBook.prepare(bid_order_book, offer_order_book)
+    prepared = time.perf_counter()
+    buy_report = execute_market_order_fixed_point(quantity, book.offers, bid=False)
+    sell_report = execute_market_order_fixed_point(quantity, book.bids, bid=True)
+    if stats is not None:
+        stats.record_preparation(prepared - started)
+        stats.record_quotes(2, time.perf_counter() - prepared)
+    return buy_report, sell_report
+
+
+def get_buy_and_sell_prices(
+    quantities,
+    product,
+    kraken_exchange,
+    max_workers=DEFAULT_MAX_WORKERS,
+    adaptive_depth=False,
+    stats=None,
+    cache=None,
+    deadline=None,
+    index=DepthIndex,
+):
+    """Price a ladder of quantities from a single fetch, prepared once into a
+    `MergedBook` with a `DepthIndex` per side.
+
+    Returns the buy cost, remaining buy amount, sell cost and remaining sell
+    amount of every quantity, in the order of `quantities`. Another index
+    pricing many quantities with `quote_many`, such as
+    `vectorized.quote_index`, can be given as `index`. The seconds spent
+    preparing the book and indexes and pricing the quantities are recorded on
+    `stats`.
+    """
+    bid_order_book, offer_order_book = get_exchange_data(
+        product=product,
+        kraken=kraken_exchange,
+        max_workers=max_workers,
+        quantity=max(quantities) if adaptive_depth else None,
+        stats=stats,
+        cache=cache,
+        deadline=deadline,
+        max_quantity=max(quantities),
     )
-    return (
-        buy_cost,
-        remaining_buy_amount,
-        sell_cost,
-        remaining_sell_amount,
+    started = time.perf_counter()
+    book = MergedBook.prepare(bid_order_book, offer_order_book)
+    offer_index = index(book.offers)
+    bid_index = index(book.bids)
+    prepared = time.perf_counter()
+    offer_quotes = offer_index.quote_many(quantities)
+    bid_quotes = bid_index.quote_many(quantities)
+    if stats is not None:
+        stats.record_preparation(prepared - started)
+        stats.record_quotes(2 * len(quantities), time.perf_counter() - prepared)
+    return [
+        (*offer_quote, *bid_quote)
+        for offer_quote, bid_quote in zip(offer_quotes, bid_quotes)
+    ]
+
+
+def get_max_fillable_quantities(
+    product,
+    kraken_exchange,
+    buy_limit_price=None,
+    sell_limit_price=None,
+    max_slippage_bps=None,
+    max_workers=DEFAULT_MAX_WORKERS,
+    stats=None,
+    cache=None,
+    deadline=None,
+):
+    """Find the largest amounts that can be bought and sold within the price limits.
+
+    Returns the `max_fillable_quantity` result of the buy and of the sell, or None
+    for a side without a limit price or maximum slippage.
+    """
+    bid_order_book, offer_order_book = get_exchange_data(
+        product=product,
+        kraken=kraken_exchange,
+        max_workers=max_workers,
+        lazy=True,
+        stats=stats,
+        cache=cache,
+        deadline=deadline,
     )
+    size_decimals = product_decimals(product)[1]
+    buy = sell = None
+    if buy_limit_price is not None or max_slippage_bps is not None:
+        buy = max_fillable_quantity(
+            offer_order_book,
+            bid=False,
+            limit_price=buy_limit_price,
+            max_slippage_bps=max_slippage_bps,
+            size_decimals=size_decimals,
+        )
+    if sell_limit_price is not None or max_slippage_bps is not None:
+        sell = max_fillable_quantity(
+            bid_order_book,
+            bid=True,
+            limit_price=sell_limit_price,
+            max_slippage_bps=max_slippage_bps,
+            size_decimals=size_decimals,
+        )
+    return buy, sell
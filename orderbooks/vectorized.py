@@ -0,0 +1,250 @@
+"""
+Vectorized market order engine on NumPy arrays.
+
+A price ordered side is turned into arrays of its price ticks, size ticks and
+exchange ids once, with the cumulative sizes and notionals of its levels.
+Any number of quantities is then priced with one `searchsorted` over the
+cumulative sizes, and the amount taken from each exchange is grouped with
+`np.add.at`. This suits pricing many quantities against deep books.
+
+In exact mode every sum is done on integer ticks, falling back to Python
+integer (object) arrays whenever int64 could overflow, and the results are
+converted with the same Decimal operations as the fixed-point engine, so they
+are identical to those of `execute_market_order`. Otherwise sums are done in
+float64: costs then agree with the Decimal engine within `FLOAT_TOLERANCE` of
+their value, on top of its rounding to cents.
+
+NumPy is an optional dependency. Without it the engine falls back to the
+fixed-point engine and `DepthIndex`, which give the exact results.
+"""
+from decimal import Decimal
+
+from orderbooks.books import EXCHANGES, MergedSide, OrderBookSide, from_ticks
+from orderbooks.utils import (TWOPLACES, DepthIndex, FillReport,
+                              execute_market_order_fixed_point,
+                              new_transactions, ticks_floor, within_precision)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the installed extras
+    np = None
+
+FLOAT_TOLERANCE = 1e-9
+INT64_MAX = 2**63 - 1
+
+
+def tick_arrays(order_book):
+    """Return the (prices, sizes, exchange ids) arrays of a price ordered
+    `OrderBookSide`, `MergedSide` of them or any book with `iter_ticks`."""
+    if isinstance(order_book, OrderBookSide):
+        return (
+            np.asarray(order_book.prices, dtype=np.int64),
+            np.asarray(order_book.sizes, dtype=np.int64),
+            np.asarray(order_book.exchange_ids, dtype=np.uint8),
+        )
+    if isinstance(order_book, MergedSide) and all(
+        isinstance(run, OrderBookSide) for run in order_book.runs
+    ):
+        runs = [tick_arrays(run) for run in order_book.runs]
+        if not runs:
+            return tick_arrays(OrderBookSide())
+        prices, sizes, exchange_ids = (
+            np.concatenate([run[column] for run in runs]) for column in range(3)
+        )
+        # A stable sort keeps equal prices in run order, like the heap merge.
+        order = np.argsort(-prices if order_book.bid else prices, kind="stable")
+        return prices[order], sizes[order], exchange_ids[order]
+
+    levels = list(order_book.iter_ticks())
+    return (
+        np.array([price for _, price, _ in levels], dtype=np.int64),
+        np.array([size for _, _, size in levels], dtype=np.int64),
+        np.array([exchange for exchange, _, _ in levels], dtype=np.uint8),
+    )
+
+
+class VectorizedIndex:
+    """
+    Cumulative sizes and notionals of a price ordered side as NumPy arrays,
+    pricing many quantities at once. Exact unless `exact` is False, see the
+    module documentation.
+    """
+
+    def __init__(self, order_book, exact=True):
+        self.order_book = order_book
+        self.exact = exact
+        self.price_decimals = order_book.price_decimals
+        self.size_decimals = order_book.size_decimals
+        self.prices, self.sizes, self.exchange_ids = tick_arrays(order_book)
+
+        self.cumulative_sizes = np.concatenate(([0], np.cumsum(self.sizes)))
+        if not exact:
+            size_scale = 10.0**-self.size_decimals
+            self.float_prices = self.prices * 10.0**-self.price_decimals
+            self.float_cumulative_sizes = self.cumulative_sizes * size_scale
+            self.float_cumulative_notionals = np.concatenate(
+                ([0.0], np.cumsum(self.float_prices * (self.sizes * size_scale)))
+            )
+            return
+
+        total_size = int(self.cumulative_sizes[-1])
+        max_price = int(np.abs(self.prices).max()) if len(self.prices) else 0
+        notionals = self.prices * self.sizes
+        if max_price * total_size > INT64_MAX:
+            notionals = self.prices.astype(object) * self.sizes.astype(object)
+        self.cumulative_notionals = np.concatenate(
+            (np.zeros(1, dtype=notionals.dtype), np.cumsum(notionals))
+        )
+        self.within_precision = within_precision(
+            total_size, int(self.cumulative_notionals[-1])
+        )
+
+    def __len__(self):
+        return len(self.prices)
+
+    def levels(self, target_ticks):
+        """The number of levels consumed in full by orders of `target_ticks`."""
+        return np.searchsorted(self.cumulative_sizes, target_ticks, side="right") - 1
+
+    def quote_many(self, quantities):
+        """Return the total cost and remaining amount of a market order for each
+        quantity, like `DepthIndex.quote`."""
+        if not self.exact:
+            return self._quote_many_float(quantities)
+        if not self.within_precision:
+            # The Decimal path would round its running totals, so walk the book.
+            index = DepthIndex(self.order_book)
+            return [index.quote(quantity) for quantity in quantities]
+
+        amounts = [Decimal(quantity) for quantity in quantities]
+        targets = [ticks_floor(amount, self.size_decimals) for amount in amounts]
+        levels = self.levels(np.array([target for target, _ in targets]))
+        return [
+            self._quote(amount, target_ticks, target_is_exact, int(level))
+            for amount, (target_ticks, target_is_exact), level in zip(
+                amounts, targets, levels
+            )
+        ]
+
+    def quote(self, quantity):
+        return self.quote_many([quantity])[0]
+
+    def _quote(self, product_amount_decimal, target_ticks, target_is_exact, levels):
+        if not len(self.prices):
+            return Decimal(0).quantize(TWOPLACES), product_amount_decimal - 0
+
+        cumulative_ticks = int(self.cumulative_sizes[levels])
+        cumulative_amount = from_ticks(cumulative_ticks, self.size_decimals)
+        total_cost = from_ticks(
+            int(self.cumulative_notionals[levels]),
+            self.price_decimals + self.size_decimals,
+        )
+        if target_is_exact and cumulative_ticks == target_ticks:
+            return total_cost.quantize(TWOPLACES), 0
+        if levels < len(self.prices):
+            price = from_ticks(int(self.prices[levels]), self.price_decimals)
+            total_cost += (product_amount_decimal - cumulative_amount) * price
+            return total_cost.quantize(TWOPLACES), 0
+        return total_cost.quantize(TWOPLACES), product_amount_decimal - cumulative_amount
+
+    def _quote_many_float(self, quantities):
+        quantities = np.asarray(quantities, dtype=np.float64)
+        if not len(self.prices):
+            return [(0.0, quantity) for quantity in quantities.tolist()]
+        levels = (
+            np.searchsorted(self.float_cumulative_sizes, quantities, side="right") - 1
+        )
+        cumulative_sizes = self.float_cumulative_sizes[levels]
+        costs = self.float_cumulative_notionals[levels]
+        partial = levels < len(self.prices)
+        partial_prices = self.float_prices[np.minimum(levels, len(self.prices) - 1)]
+        costs = costs + np.where(
+            partial, (quantities - cumulative_sizes) * partial_prices, 0.0
+        )
+        remaining = np.where(partial, 0.0, quantities - cumulative_sizes)
+        return list(zip(costs.tolist(), remaining.tolist()))
+
+    def fill_report(self, quantity):
+        """The `FillReport` of a market order for `quantity`, with the values of
+        the one of `execute_market_order_fixed_point`."""
+        product_amount_decimal = Decimal(quantity)
+        target_ticks, target_is_exact = ticks_floor(
+            product_amount_decimal, self.size_decimals
+        )
+        levels = int(self.levels(target_ticks))
+        filled = False
+        if target_is_exact:
+            # The walk stops at the first level after which the order is filled.
+            first = int(
+                np.searchsorted(self.cumulative_sizes[1:], target_ticks, side="left")
+            )
+            if first < len(self.prices) and self.cumulative_sizes[first + 1] == target_ticks:
+                levels = first + 1
+                filled = True
+
+        exchange_count = max(len(EXCHANGES), int(self.exchange_ids.max(initial=0)) + 1)
+        consumed_ids = self.exchange_ids[:levels].astype(np.intp)
+        filled_sizes = np.zeros(exchange_count, dtype=object)
+        np.add.at(filled_sizes, consumed_ids, self.sizes[:levels].astype(object))
+        last_levels = np.full(exchange_count, -1, dtype=np.intp)
+        np.maximum.at(last_levels, consumed_ids, np.arange(levels, dtype=np.intp))
+
+        transactions = new_transactions(last_price=0)
+        for exchange, last_level in enumerate(last_levels.tolist()):
+            if last_level >= 0:
+                transactions[EXCHANGES[exchange]] = [
+                    from_ticks(int(filled_sizes[exchange]), self.size_decimals),
+                    from_ticks(int(self.prices[last_level]), self.price_decimals),
+                ]
+
+        total_cost = Decimal(0)
+        cumulative_amount = 0
+        if levels:
+            total_cost = from_ticks(
+                int(self.cumulative_notionals[levels]),
+                self.price_decimals + self.size_decimals,
+            )
+            cumulative_amount = from_ticks(
+                int(self.cumulative_sizes[levels]), self.size_decimals
+            )
+        if not filled and levels < len(self.prices):
+            price = from_ticks(int(self.prices[levels]), self.price_decimals)
+            partial_product_amount = product_amount_decimal - cumulative_amount
+            total_cost += partial_product_amount * price
+            exchange_transactions = transactions[EXCHANGES[self.exchange_ids[levels]]]
+            exchange_transactions[0] += partial_product_amount
+            exchange_transactions[1] = price
+            levels += 1
+            filled = True
+
+        if filled:
+            return FillReport.from_fill(
+                total_cost, product_amount_decimal, 0, transactions, levels
+            )
+        return FillReport.from_fill(
+            total_cost,
+            cumulative_amount,
+            product_amount_decimal - cumulative_amount,
+            transactions,
+            levels,
+        )
+
+
+def execute_market_order_vectorized(product_amount_target, order_book, bid=False):
+    """Exact vectorized version of `execute_market_order`, for a price ordered
+    `OrderBookSide` or `MergedSide` of them, returning a `FillReport`. Falls back
+    to the fixed-point engine without NumPy."""
+    if np is None:
+        return execute_market_order_fixed_point(product_amount_target, order_book, bid=bid)
+    index = VectorizedIndex(order_book)
+    if not index.within_precision:
+        return execute_market_order_fixed_point(product_amount_target, order_book, bid=bid)
+    return index.fill_report(product_amount_target)
+
+
+def quote_index(order_book, exact=True):
+    """Return a `VectorizedIndex` of a side, or a `DepthIndex` without NumPy.
+    Both price quantities with `quote`."""
+    if np is None:
+        return DepthIndex(order_book)
+    return VectorizedIndex(order_book, exact=exact)